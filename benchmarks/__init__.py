@@ -0,0 +1,16 @@
+"""
+Benchmarks de rendimiento de la aplicación.
+
+Se ejecutan desde la raíz del proyecto, por ejemplo:
+
+    python -m benchmarks.bench_smtp_transport
+"""
+import os
+
+# Valores ficticios para los campos obligatorios de Settings: los benchmarks
+# no se conectan a la base de datos ni a servicios externos.
+for _variable in (
+    "POSTGRES_HOST", "POSTGRES_PORT", "POSTGRES_DB", "POSTGRES_USER",
+    "POSTGRES_PASSWORD", "SECRET_KEY", "ALGORITHM", "URL_API_STORAGE",
+):
+    os.environ.setdefault(_variable, "benchmark")
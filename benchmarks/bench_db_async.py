@@ -0,0 +1,136 @@
+"""
+Benchmark de concurrencia de las consultas del camino de envío.
+
+Cada "petición" hace lo mismo que un envío en la base de datos: carga la
+plantilla y la credencial (caché desactivada, siempre a la BD) e inserta
+un registro en ``logs_envio``. Se comparan dos modos con N peticiones
+concurrentes:
+
+- sync: sesión psycopg2 llamada directamente desde la corrutina, como
+  hacían los servicios de envío (bloquea el event loop en cada consulta).
+- async: ``obtener_contexto_envio_async`` + ``insertar_logs_async`` (asyncpg).
+
+``--latencia`` añade un ``pg_sleep`` por petición para simular el tiempo de
+ida y vuelta a una base de datos remota. Además del throughput se mide el
+mayor retardo del event loop, que es lo que habría esperado /health.
+
+Necesita PostgreSQL (variables POSTGRES_* como la aplicación); crea una
+plantilla ``bench-db`` y borra sus logs (y su resumen por hora) al terminar.
+
+Uso:
+    python -m benchmarks.bench_db_async --peticiones 200 --latencia 0.005
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import delete, text
+
+from src.config.config import Base, async_sessions, cerrar_engines_async, engine, sessions
+from src.models.credenciales_model import CredencialesCorreo
+from src.models.logs_envio import LogsEnvio
+from src.models.logs_envio_hora import LogsEnvioHora
+from src.models.plantilla_model import Plantillas
+from src.services.contexto_envio_cache import contextos_envio, obtener_contexto_envio, obtener_contexto_envio_async
+from src.services.log_writer import _fila, insertar_logs, insertar_logs_async
+
+PLANTILLA = "bench-db"
+
+
+def _preparar() -> None:
+    for base, eng in zip(Base, engine):
+        base.metadata.create_all(bind=eng)
+    db = sessions[0]()
+    try:
+        if not db.query(Plantillas).filter(Plantillas.identifying_name == PLANTILLA).first():
+            creds = CredencialesCorreo(
+                client_id="127.0.0.1", client_secret="25", tenant_id="bench", username="bench@local"
+            )
+            db.add(creds)
+            db.flush()
+            db.add(Plantillas(
+                identifying_name=PLANTILLA, description="benchmark",
+                content_html="<p>{{nombre}}</p>", credenciales_id=creds.id,
+            ))
+            db.commit()
+    finally:
+        db.close()
+
+
+def _limpiar() -> None:
+    db = sessions[0]()
+    try:
+        db.execute(delete(LogsEnvio).where(LogsEnvio.identificador == PLANTILLA))
+        db.execute(delete(LogsEnvioHora).where(LogsEnvioHora.identificador == PLANTILLA))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _log(i: int) -> dict:
+    return _fila({"destinatario": f"{i}@bench.local", "estado": "ENVIADO", "identificador": PLANTILLA})
+
+
+async def _sync(i: int, latencia: float) -> None:
+    db = sessions[0]()
+    try:
+        if latencia:
+            db.execute(text("SELECT pg_sleep(:s)"), {"s": latencia})
+        obtener_contexto_envio(db, PLANTILLA)
+    finally:
+        db.close()
+    insertar_logs([_log(i)])
+
+
+async def _async(i: int, latencia: float) -> None:
+    if latencia:
+        async with async_sessions[0]() as db:
+            await db.execute(text("SELECT pg_sleep(:s)"), {"s": latencia})
+    await obtener_contexto_envio_async(PLANTILLA)
+    await insertar_logs_async([_log(i)])
+
+
+async def _monitor_loop(detener: asyncio.Event, intervalo: float = 0.005) -> float:
+    """Devuelve el mayor retardo observado al despertar el event loop."""
+    maximo = 0.0
+    while not detener.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        maximo = max(maximo, time.perf_counter() - inicio - intervalo)
+    return maximo
+
+
+async def _medir(nombre: str, peticion, peticiones: int, latencia: float) -> None:
+    detener = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_loop(detener))
+    inicio = time.perf_counter()
+    await asyncio.gather(*(peticion(i, latencia) for i in range(peticiones)))
+    total = time.perf_counter() - inicio
+    detener.set()
+    retardo = await monitor
+    print(
+        f"{nombre:>6}: {peticiones / total:8.1f} peticiones/s  {total:6.2f} s  "
+        f"retardo máx. del loop {retardo * 1000:8.1f} ms"
+    )
+
+
+async def main(peticiones: int, latencia: float) -> None:
+    _preparar()
+    # Sin caché: cada petición consulta plantilla y credencial
+    contextos_envio.ttl = 0
+    print(f"{peticiones} peticiones concurrentes, latencia simulada {latencia * 1000:.1f} ms")
+    try:
+        await _medir("sync", _sync, peticiones, latencia)
+        await _medir("async", _async, peticiones, latencia)
+    finally:
+        await cerrar_engines_async()
+        _limpiar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument("--latencia", type=float, default=0.005,
+                        help="pg_sleep por petición para simular una BD remota (segundos)")
+    args = parser.parse_args()
+    asyncio.run(main(args.peticiones, args.latencia))
@@ -0,0 +1,89 @@
+"""
+Benchmark de memoria del envío de adjuntos grandes.
+
+Envía N mensajes concurrentes con un adjunto de M MB contra el sumidero
+SMTP local y mide el pico de memoria (tracemalloc) en dos modos:
+
+- mime: ``MIMEMultipart`` + ``MIMEApplication(f.read())`` serializado
+  completo por ``send_message`` (comportamiento anterior).
+- streaming: ``MensajeStreaming``, adjunto codificado por bloques durante DATA.
+
+Uso:
+    python -m benchmarks.bench_mime_stream --envios 4 --mb 10
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+
+from .smtp_sink import SmtpSink
+from src.services.mime_stream import AdjuntoStreaming, MensajeStreaming
+from src.services.smtp_pool import SmtpConnectionPool
+from src.services.smtp_transport import enviar_mensaje
+
+
+def _mime(ruta: Path) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg["From"] = "bench@local"
+    msg["To"] = "destino@local"
+    msg["Subject"] = "Benchmark"
+    msg.attach(MIMEText("<p>Hola</p>", "html", "utf-8"))
+    with open(ruta, "rb") as f:
+        msg.attach(MIMEApplication(f.read(), Name=ruta.name))
+    return msg
+
+
+def _streaming(ruta: Path) -> MensajeStreaming:
+    return MensajeStreaming(
+        "bench@local", "destino@local", [], "Benchmark", "<p>Hola</p>",
+        [AdjuntoStreaming(ruta, ruta.name)],
+    )
+
+
+async def _medir(nombre: str, sink: SmtpSink, construir, ruta: Path, envios: int) -> None:
+    pool = SmtpConnectionPool(max_por_credencial=envios, usar_starttls=False)
+
+    async def enviar():
+        # El mensaje se construye dentro del envío, como en el servicio
+        await enviar_mensaje(
+            "bench", sink.host, sink.port, "bench", "bench", construir(ruta),
+            from_addr="bench@local", to_addrs=["destino@local"], pool=pool,
+        )
+
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    await asyncio.gather(*(enviar() for _ in range(envios)))
+    total = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    pool.cerrar_todas()
+    print(f"{nombre:>10}: pico {pico / 1e6:8.1f} MB  en {total:6.2f} s")
+
+
+async def main(envios: int, mb: int) -> None:
+    sink = SmtpSink().iniciar()
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = Path(tmp) / "adjunto.bin"
+        with open(ruta, "wb") as f:
+            for _ in range(mb):
+                f.write(os.urandom(1024 * 1024))
+        print(f"{envios} envíos concurrentes con un adjunto de {mb} MB")
+        try:
+            await _medir("mime", sink, _mime, ruta, envios)
+            await _medir("streaming", sink, _streaming, ruta, envios)
+        finally:
+            sink.detener()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--envios", type=int, default=4)
+    parser.add_argument("--mb", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.envios, args.mb))
@@ -0,0 +1,100 @@
+"""
+Benchmark del transporte SMTP contra un sumidero local.
+
+Compara dos modos con N envíos concurrentes:
+
+- bloqueante: smtplib directo en el event loop con una conexión nueva por
+  envío (comportamiento anterior de /send-email-form).
+- transporte: ``enviar_mensaje`` (executor acotado + pool de sesiones).
+
+Además del throughput, mide el retardo máximo del event loop, que indica
+cuánto tiempo habría quedado bloqueado /health durante los envíos.
+
+Uso:
+    python -m benchmarks.bench_smtp_transport --envios 200 --latencia 0.005
+"""
+import argparse
+import asyncio
+import smtplib
+import time
+from email.message import EmailMessage
+
+from .smtp_sink import SmtpSink
+from src.services.smtp_pool import SmtpConnectionPool
+from src.services.smtp_transport import enviar_mensaje
+
+
+def _mensaje(i: int) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "bench@local"
+    msg["To"] = "destino@local"
+    msg["Subject"] = f"Benchmark {i}"
+    msg.set_content("<p>Hola</p>" * 50, subtype="html")
+    return msg
+
+
+async def _monitor_loop(detener: asyncio.Event, intervalo: float = 0.005) -> float:
+    """Devuelve el mayor retardo observado al despertar el event loop."""
+    maximo = 0.0
+    while not detener.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        maximo = max(maximo, time.perf_counter() - inicio - intervalo)
+    return maximo
+
+
+async def _bloqueante(sink: SmtpSink, i: int) -> None:
+    with smtplib.SMTP(sink.host, sink.port) as server:
+        server.login("bench", "bench")
+        server.send_message(_mensaje(i))
+
+
+async def _transporte(sink: SmtpSink, pool: SmtpConnectionPool, i: int) -> None:
+    await enviar_mensaje(
+        1, sink.host, sink.port, "bench", "bench", _mensaje(i),
+        from_addr="bench@local", to_addrs=["destino@local"], pool=pool,
+    )
+
+
+async def _medir(nombre: str, corrutinas) -> None:
+    detener = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_loop(detener))
+    await asyncio.sleep(0)
+    inicio = time.perf_counter()
+    await asyncio.gather(*corrutinas)
+    duracion = time.perf_counter() - inicio
+    detener.set()
+    retardo = await monitor
+    n = len(corrutinas)
+    print(
+        f"{nombre:<12} {n:>6} envíos  {duracion:8.3f} s  "
+        f"{n / duracion:9.1f} envíos/s  retardo máx. loop {retardo * 1000:8.1f} ms"
+    )
+
+
+async def main(envios: int, latencia: float, sesiones: int) -> None:
+    sink = SmtpSink(latencia=latencia).iniciar()
+    try:
+        await _medir("bloqueante", [_bloqueante(sink, i) for i in range(envios)])
+        conexiones = sink.conexiones
+
+        pool = SmtpConnectionPool(max_por_credencial=sesiones, usar_starttls=False)
+        await _medir("transporte", [_transporte(sink, pool, i) for i in range(envios)])
+        print(
+            f"conexiones SMTP abiertas: bloqueante={conexiones} "
+            f"transporte={sink.conexiones - conexiones}"
+        )
+        pool.cerrar_todas()
+    finally:
+        sink.detener()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--envios", type=int, default=200)
+    parser.add_argument("--latencia", type=float, default=0.005,
+                        help="Retardo simulado por comando SMTP (segundos)")
+    parser.add_argument("--sesiones", type=int, default=8,
+                        help="Sesiones máximas por credencial en el pool")
+    args = parser.parse_args()
+    asyncio.run(main(args.envios, args.latencia, args.sesiones))
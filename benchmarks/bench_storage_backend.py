@@ -0,0 +1,153 @@
+"""
+Benchmark de los endpoints de archivos contra un backend sin Azure.
+
+Monta solo el router ``/v1/files`` en una app FastAPI y la llama en proceso
+(``httpx.ASGITransport``), así que mide el endpoint + el servicio + el
+backend, sin red ni servidor. Para cada fase informa operaciones por
+segundo, throughput y latencias p50/p95/p99:
+
+- upload: N archivos de S KB por ``POST /upload`` (multipart), C en paralelo.
+- download: ``GET /download/{container}/{name}`` de cada archivo subido.
+- list: el contenedor completo por páginas con ``page_size``/``continuation_token``.
+
+Backends:
+- local: ``LocalStorageBackend`` en un directorio temporal (aiofiles).
+- fake: ``AzureStorageBackend`` contra ``benchmarks.fake_blob`` con latencia
+  simulada, para comparar el camino de Azure sin cuenta.
+
+Uso:
+    python -m benchmarks.bench_storage_backend --backend local --archivos 500 --kb 256 --concurrencia 16
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from typing import Awaitable, Callable, List
+
+import httpx
+from fastapi import FastAPI
+
+from .fake_blob import FakeBlobService
+from src.api.endpoints import files
+from src.config.azure_config import AzureStorageConfig
+from src.security.auth import verify_jwt_token
+from src.services.azure_storage_backend import AzureStorageBackend
+from src.services.local_storage_backend import LocalStorageBackend
+from src.services.storage_service import usar_backend
+
+CONTENEDOR = "bench"
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(files.router, prefix="/v1/files")
+    app.dependency_overrides[verify_jwt_token] = lambda: "bench"
+    return app
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def _fase(nombre: str, operaciones: List[Callable[[], Awaitable[int]]], concurrencia: int) -> None:
+    """Ejecuta las operaciones con ``concurrencia`` en vuelo e imprime métricas."""
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias: List[float] = []
+    total_bytes = 0
+
+    async def medir(operacion) -> None:
+        nonlocal total_bytes
+        async with semaforo:
+            inicio = time.perf_counter()
+            nbytes = await operacion()
+            latencias.append(time.perf_counter() - inicio)
+            total_bytes += nbytes
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(medir(op) for op in operaciones))
+    total = time.perf_counter() - inicio
+    print(
+        f"{nombre:>9}: {len(latencias) / total:8.1f} op/s  {total_bytes / total / 1e6:8.1f} MB/s  "
+        f"p50 {statistics.median(latencias) * 1000:7.2f} ms  "
+        f"p95 {_percentil(latencias, 0.95) * 1000:7.2f} ms  "
+        f"p99 {_percentil(latencias, 0.99) * 1000:7.2f} ms"
+    )
+
+
+async def main(backend: str, archivos: int, kb: int, concurrencia: int, pagina: int, latencia: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        if backend == "local":
+            usar_backend(LocalStorageBackend(tmp, "/v1/files/download"))
+        else:
+            servicio = FakeBlobService(latencia=latencia)
+
+            async def cliente():
+                return servicio
+
+            AzureStorageConfig.get_blob_service_client = staticmethod(cliente)
+            usar_backend(AzureStorageBackend())
+
+        contenido = bytes(kb * 1024)
+        print(
+            f"Backend {backend}: {archivos} archivos de {kb} KB, "
+            f"{concurrencia} en paralelo, páginas de {pagina}"
+        )
+        transporte = httpx.ASGITransport(app=_app())
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as client:
+            nombres: List[str] = []
+
+            def subir(i: int):
+                async def op() -> int:
+                    r = await client.post(
+                        "/v1/files/upload",
+                        files={"file": (f"f{i}.bin", contenido, "application/octet-stream")},
+                        data={"container": CONTENEDOR},
+                    )
+                    r.raise_for_status()
+                    nombres.append(r.json()["file_name"])
+                    return len(contenido)
+                return op
+
+            def descargar(nombre: str):
+                async def op() -> int:
+                    r = await client.get(f"/v1/files/download/{CONTENEDOR}/{nombre}")
+                    r.raise_for_status()
+                    return len(r.content)
+                return op
+
+            async def listar() -> int:
+                token, vistos, nbytes = None, 0, 0
+                while True:
+                    params = {"container": CONTENEDOR, "page_size": pagina}
+                    if token:
+                        params["continuation_token"] = token
+                    r = await client.get("/v1/files/list", params=params)
+                    r.raise_for_status()
+                    datos = r.json()
+                    vistos += datos["count"]
+                    nbytes += len(r.content)
+                    token = datos["next_token"]
+                    if not token:
+                        assert vistos == archivos, vistos
+                        return nbytes
+
+            await _fase("upload", [subir(i) for i in range(archivos)], concurrencia)
+            await _fase("download", [descargar(n) for n in nombres], concurrencia)
+            await _fase("list", [listar for _ in range(5)], 1)
+        usar_backend(None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backend", choices=["local", "fake"], default="local")
+    parser.add_argument("--archivos", type=int, default=500)
+    parser.add_argument("--kb", type=int, default=256)
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--pagina", type=int, default=100,
+                        help="Tamaño de página del listado")
+    parser.add_argument("--latencia", type=float, default=0.01,
+                        help="Latencia simulada por petición del backend fake (segundos)")
+    args = parser.parse_args()
+    asyncio.run(main(args.backend, args.archivos, args.kb, args.concurrencia, args.pagina, args.latencia))
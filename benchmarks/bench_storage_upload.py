@@ -0,0 +1,85 @@
+"""
+Benchmark de la subida de archivos a Blob Storage contra un sustituto local.
+
+Compara para un archivo de M MB:
+
+- completo: ``file.read()`` + ``StorageService.upload_file`` (una petición
+  Put Blob con todo el contenido en memoria; comportamiento anterior).
+- bloques: ``StorageService.upload_stream`` (stage_block en paralelo desde el
+  archivo + commit_block_list).
+
+El sustituto (``benchmarks.fake_blob``) simula latencia por petición y un
+ancho de banda por conexión; se informa throughput y pico de memoria.
+
+Uso:
+    python -m benchmarks.bench_storage_upload --mb 64 --latencia 0.02 --ancho-banda 50
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from .fake_blob import FakeBlobService
+from src.config.azure_config import AzureStorageConfig
+from src.config.settings import settings
+from src.services.storage_service import StorageService
+
+
+def _instalar(servicio: FakeBlobService) -> None:
+    async def cliente():
+        return servicio
+
+    AzureStorageConfig.get_blob_service_client = staticmethod(cliente)
+
+
+async def _medir(nombre: str, servicio: FakeBlobService, subir, mb: int) -> None:
+    servicio.peticiones = 0
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = await subir()
+    total = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert resultado.file_size == mb * 1024 * 1024
+    print(
+        f"{nombre:>9}: {mb / total:8.1f} MB/s  {total:6.2f} s  "
+        f"{servicio.peticiones:4d} peticiones  pico {pico / 1e6:7.1f} MB"
+    )
+
+
+async def main(mb: int, latencia: float, ancho_banda: float) -> None:
+    servicio = FakeBlobService(latencia=latencia, ancho_banda=ancho_banda * 1e6)
+    _instalar(servicio)
+    print(
+        f"Archivo de {mb} MB, latencia {latencia * 1000:.0f} ms, "
+        f"{ancho_banda:.0f} MB/s por conexión, bloques de "
+        f"{settings.storage_upload_bloque // (1024 * 1024)} MB x{settings.storage_upload_concurrencia}"
+    )
+    with tempfile.TemporaryFile() as f:
+        for _ in range(mb):
+            f.write(os.urandom(1024 * 1024))
+
+        async def completo():
+            f.seek(0)
+            contenido = f.read()
+            return await StorageService.upload_file(contenido, "bench.bin", "application/octet-stream")
+
+        async def bloques():
+            f.seek(0)
+            return await StorageService.upload_stream(f, "bench.bin", "application/octet-stream")
+
+        await _medir("completo", servicio, completo, mb)
+        await _medir("bloques", servicio, bloques, mb)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mb", type=int, default=64)
+    parser.add_argument("--latencia", type=float, default=0.02,
+                        help="Latencia simulada por petición (segundos)")
+    parser.add_argument("--ancho-banda", type=float, default=50,
+                        help="Ancho de banda simulado por conexión (MB/s)")
+    args = parser.parse_args()
+    asyncio.run(main(args.mb, args.latencia, args.ancho_banda))
@@ -0,0 +1,109 @@
+"""
+Microbenchmark del motor de plantillas.
+
+Compara, para plantillas grandes con muchos marcadores:
+
+- regex: ``re.sub`` sobre todo el HTML en cada render, con las closures
+  recreadas en cada llamada (comportamiento anterior de ambos servicios).
+- compilada: ``renderizar_plantilla`` con la plantilla ya analizada en la
+  caché por ``(plantilla.id, updated_at)``.
+
+Uso:
+    python -m benchmarks.bench_template_engine --marcadores 500 --renders 2000
+"""
+import argparse
+import re
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from src.services.template_engine import cache_compiladas, compilar_plantilla, renderizar_plantilla
+
+
+def _render_regex(template: str, variables: dict) -> str:
+    """Copia del render anterior basado en re.sub."""
+
+    def dict_to_html(data: dict) -> str:
+        html = "<ul>"
+        for k, v in data.items():
+            if isinstance(v, dict):
+                html += f"<li><strong>{k}:</strong> {dict_to_html(v)}</li>"
+            else:
+                html += f"<li><strong>{k}:</strong> {v}</li>"
+        html += "</ul>"
+        return html
+
+    def resolve_path(data: dict, path: str):
+        value = data
+        for part in path.split("."):
+            if isinstance(value, dict) and part in value:
+                value = value[part]
+            else:
+                return None
+        return value
+
+    def replace_var(match):
+        expr = match.group(1).strip()
+        if expr == "etiqueta":
+            return dict_to_html(variables)
+        if expr.startswith("etiqueta."):
+            val = resolve_path(variables, expr.split(".", 1)[1])
+            return str(val) if val is not None else f"{{{{{expr}}}}}"
+        if expr in variables:
+            return str(variables[expr])
+        return f"{{{{{expr}}}}}"
+
+    return re.sub(r"{{\s*(.*?)\s*}}", replace_var, template)
+
+
+def _plantilla(marcadores: int, relleno: int) -> SimpleNamespace:
+    bloques = []
+    for i in range(marcadores):
+        bloques.append("<p>" + "x" * relleno + "</p>")
+        if i % 10 == 0:
+            bloques.append("{{ etiqueta.cliente.nombre }}")
+        elif i % 10 == 1:
+            bloques.append("{{desconocido}}")
+        else:
+            bloques.append(f"{{{{campo{i}}}}}")
+    bloques.append("{{etiqueta}}")
+    return SimpleNamespace(id=1, updated_at=datetime(2025, 1, 1), content_html="".join(bloques))
+
+
+def _medir(nombre: str, funcion, renders: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(renders):
+        funcion()
+    total = time.perf_counter() - inicio
+    print(f"{nombre:>10}: {renders / total:10.0f} renders/s  ({total * 1e6 / renders:8.1f} µs/render)")
+    return total
+
+
+def main(marcadores: int, renders: int, relleno: int) -> None:
+    plantilla = _plantilla(marcadores, relleno)
+    variables = {f"campo{i}": f"valor {i}" for i in range(marcadores)}
+    variables["cliente"] = {"nombre": "Ana", "ciudad": "Bogotá"}
+
+    # Ambos caminos deben producir el mismo HTML
+    assert _render_regex(plantilla.content_html, variables) == renderizar_plantilla(plantilla, variables)
+
+    print(f"Plantilla: {len(plantilla.content_html)} caracteres, {marcadores + 1} marcadores")
+    inicio = time.perf_counter()
+    for _ in range(100):
+        compilar_plantilla(plantilla.content_html)
+    print(f"{'análisis':>10}: {(time.perf_counter() - inicio) * 1e6 / 100:8.1f} µs (una vez por versión)")
+
+    cache_compiladas.limpiar()
+    t_regex = _medir("regex", lambda: _render_regex(plantilla.content_html, variables), renders)
+    t_comp = _medir("compilada", lambda: renderizar_plantilla(plantilla, variables), renders)
+    print(f"Aceleración: x{t_regex / t_comp:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--marcadores", type=int, default=500)
+    parser.add_argument("--renders", type=int, default=2000)
+    parser.add_argument("--relleno", type=int, default=200,
+                        help="Caracteres de HTML literal entre marcadores")
+    args = parser.parse_args()
+    main(args.marcadores, args.renders, args.relleno)
@@ -0,0 +1,239 @@
+"""
+Sustituto en memoria de ``azure.storage.blob.aio`` para benchmarks.
+
+Implementa el subconjunto de BlobServiceClient / ContainerClient /
+BlobClient que usa ``StorageService`` y simula el coste de red de cada
+petición: una latencia fija más el tiempo de transferir los bytes a un
+ancho de banda por conexión. Así el paralelismo de bloques se nota igual
+que contra Azure, sin necesitar una cuenta.
+"""
+import asyncio
+import itertools
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from azure.core.exceptions import HttpResponseError, ResourceExistsError, ResourceNotFoundError
+from azure.storage.blob import StorageErrorCode
+
+
+_versiones = itertools.count(1)
+
+
+def _error_http(status: int, mensaje: str) -> HttpResponseError:
+    error = HttpResponseError(mensaje)
+    error.status_code = status
+    return error
+
+
+class _Propiedades:
+    def __init__(self, size: int, content_type: Optional[str], name: str = ""):
+        self.name = name
+        self.size = size
+        self.content_settings = type("CS", (), {"content_type": content_type})()
+        self.etag = f'"0x{next(_versiones):016X}"'
+        self.last_modified = datetime.now(timezone.utc)
+        self.creation_time = self.last_modified
+        self.content_range: Optional[str] = None
+
+
+class FakeDownloader:
+    """Equivalente a ``StorageStreamDownloader``: entrega ceros por trozos."""
+
+    def __init__(self, cliente: "FakeBlobClient", props: _Propiedades, inicio: int, size: int):
+        self._cliente = cliente
+        self.size = size
+        self.properties = _Propiedades(size, props.content_settings.content_type)
+        self.properties.etag = props.etag
+        self.properties.last_modified = props.last_modified
+        self.properties.content_range = f"bytes {inicio}-{inicio + size - 1}/{props.size}"
+
+    async def chunks(self):
+        restante = self.size
+        while restante > 0:
+            trozo = min(restante, 4 * 1024 * 1024)
+            await self._cliente._red(trozo)
+            restante -= trozo
+            yield bytes(trozo)
+
+    async def readall(self) -> bytes:
+        return b"".join([c async for c in self.chunks()])
+
+
+class FakeBlobClient:
+    def __init__(self, servicio: "FakeBlobService", contenedor: str, nombre: str):
+        self._servicio = servicio
+        self.container_name = contenedor
+        self.blob_name = nombre
+        self.url = f"https://fake.blob.core.windows.net/{contenedor}/{nombre}"
+
+    async def _red(self, nbytes: int = 0) -> None:
+        self._servicio.peticiones += 1
+        await asyncio.sleep(self._servicio.latencia + nbytes / self._servicio.ancho_banda)
+        if self.container_name not in self._servicio.contenedores:
+            error = ResourceNotFoundError("The specified container does not exist.")
+            error.error_code = StorageErrorCode.CONTAINER_NOT_FOUND
+            raise error
+
+    async def upload_blob(self, data, overwrite: bool = False, content_settings=None, **kwargs) -> dict:
+        contenido = data if isinstance(data, (bytes, bytearray)) else data.read()
+        await self._red(len(contenido))
+        self._servicio.blobs[(self.container_name, self.blob_name)] = _Propiedades(
+            len(contenido), getattr(content_settings, "content_type", None) or "application/octet-stream",
+            self.blob_name,
+        )
+        return {}
+
+    async def stage_block(self, block_id: str, data, length: Optional[int] = None, **kwargs) -> dict:
+        await self._red(length or len(data))
+        self._servicio.bloques[(self.container_name, self.blob_name, block_id)] = length or len(data)
+        return {}
+
+    async def commit_block_list(self, block_list: List, content_settings=None, **kwargs) -> dict:
+        await self._red()
+        tamano = sum(
+            self._servicio.bloques.pop((self.container_name, self.blob_name, b.id))
+            for b in block_list
+        )
+        self._servicio.blobs[(self.container_name, self.blob_name)] = _Propiedades(
+            tamano, getattr(content_settings, "content_type", None) or "application/octet-stream",
+            self.blob_name,
+        )
+        return {}
+
+    def _propiedades(self) -> _Propiedades:
+        props = self._servicio.blobs.get((self.container_name, self.blob_name))
+        if props is None:
+            raise ResourceNotFoundError("The specified blob does not exist.")
+        return props
+
+    async def get_blob_properties(self, **kwargs) -> _Propiedades:
+        await self._red()
+        return self._propiedades()
+
+    async def delete_blob(self, **kwargs) -> None:
+        await self._red()
+        self._propiedades()
+        del self._servicio.blobs[(self.container_name, self.blob_name)]
+
+    async def download_blob(self, offset: Optional[int] = None, length: Optional[int] = None,
+                            etag: Optional[str] = None, match_condition=None, **kwargs) -> FakeDownloader:
+        # La primera petición devuelve cabeceras; el contenido llega al iterar
+        await self._red()
+        props = self._propiedades()
+        if etag is not None and etag in ("*", props.etag):
+            raise _error_http(304, "Not modified")
+        inicio = offset or 0
+        if offset is not None and inicio >= props.size:
+            raise _error_http(416, "The range specified is invalid for the current size of the resource.")
+        fin = props.size if length is None else min(props.size, inicio + length)
+        return FakeDownloader(self, props, inicio, fin - inicio)
+
+
+class _Paginas:
+    """Equivalente a ``AsyncItemPaged.by_page()``: una petición por página."""
+
+    def __init__(self, contenedor: "FakeContainerClient", nombres: List[str], por_pagina: int,
+                 token: Optional[str]):
+        self._contenedor = contenedor
+        self._nombres = nombres
+        self._por_pagina = por_pagina
+        self._inicio = int(token) if token else 0
+        self.continuation_token: Optional[str] = token
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._inicio >= len(self._nombres):
+            raise StopAsyncIteration
+        await self._contenedor._red()
+        fin = self._inicio + self._por_pagina
+        blobs = self._contenedor._servicio.blobs
+        pagina = [blobs[(self._contenedor.container_name, n)] for n in self._nombres[self._inicio:fin]]
+        self._inicio = fin
+        self.continuation_token = str(fin) if fin < len(self._nombres) else None
+
+        async def items():
+            for blob in pagina:
+                yield blob
+        return items()
+
+
+class _Listado:
+    def __init__(self, contenedor: "FakeContainerClient", nombres: List[str], por_pagina: int):
+        self._args = (contenedor, nombres, por_pagina)
+
+    def by_page(self, continuation_token: Optional[str] = None) -> _Paginas:
+        return _Paginas(*self._args, continuation_token)
+
+    async def __aiter__(self):
+        async for pagina in self.by_page():
+            async for blob in pagina:
+                yield blob
+
+
+class FakeContainerClient:
+    def __init__(self, servicio: "FakeBlobService", nombre: str):
+        self._servicio = servicio
+        self.container_name = nombre
+        self.url = f"https://fake.blob.core.windows.net/{nombre}"
+
+    def list_blobs(self, name_starts_with: Optional[str] = None, results_per_page: int = 5000,
+                   **kwargs) -> _Listado:
+        nombres = sorted(
+            n for (c, n) in self._servicio.blobs
+            if c == self.container_name and n.startswith(name_starts_with or "")
+        )
+        return _Listado(self, nombres, results_per_page)
+
+    def get_blob_client(self, nombre: str) -> FakeBlobClient:
+        return FakeBlobClient(self._servicio, self.container_name, nombre)
+
+    async def delete_blobs(self, *blobs, raise_on_any_failure: bool = True, **kwargs):
+        """Borrado batch: una petición para hasta 256 blobs."""
+        if len(blobs) > 256:
+            raise ValueError("The batch can contain at most 256 sub-requests.")
+        await self._red()
+        respuestas = []
+        for blob in blobs:
+            nombre = blob["name"] if isinstance(blob, dict) else blob
+            corte = blob.get("if_unmodified_since") if isinstance(blob, dict) else None
+            props = self._servicio.blobs.get((self.container_name, nombre))
+            if props is None:
+                estado = 404
+            elif corte and props.last_modified > corte:
+                estado = 412
+            else:
+                del self._servicio.blobs[(self.container_name, nombre)]
+                estado = 202
+            respuestas.append(type("Respuesta", (), {"status_code": estado})())
+
+        async def iterar():
+            for respuesta in respuestas:
+                yield respuesta
+        return iterar()
+
+    async def create_container(self, **kwargs) -> None:
+        await self._red()
+        if self.container_name in self._servicio.contenedores:
+            raise ResourceExistsError("The specified container already exists.")
+        self._servicio.contenedores.add(self.container_name)
+
+    async def _red(self) -> None:
+        self._servicio.peticiones += 1
+        await asyncio.sleep(self._servicio.latencia)
+
+
+class FakeBlobService:
+    """Servicio de blobs simulado: guarda solo tamaños, no contenido."""
+
+    def __init__(self, latencia: float = 0.01, ancho_banda: float = 50e6):
+        self.latencia = latencia
+        self.ancho_banda = ancho_banda
+        self.peticiones = 0
+        self.contenedores: set = set()
+        self.blobs: Dict[tuple, _Propiedades] = {}
+        self.bloques: Dict[tuple, int] = {}
+
+    def get_container_client(self, nombre: str) -> FakeContainerClient:
+        return FakeContainerClient(self, nombre)
@@ -0,0 +1,76 @@
+"""
+Servidor SMTP "sumidero" local para benchmarks.
+
+Acepta EHLO, AUTH, MAIL, RCPT, DATA, NOOP, RSET y QUIT, descarta los
+mensajes y cuenta conexiones, mensajes y bytes recibidos. Puede simular la
+latencia de un servidor real añadiendo un retardo a cada comando.
+"""
+import asyncio
+import threading
+
+
+class SmtpSink:
+    """Sumidero SMTP que se ejecuta en su propio hilo y event loop."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latencia: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latencia = latencia
+        self.conexiones = 0
+        self.mensajes = 0
+        self.bytes = 0
+        self._loop = None
+        self._server = None
+        self._listo = threading.Event()
+
+    async def _atender(self, reader, writer):
+        self.conexiones += 1
+        writer.write(b"220 sink ESMTP\r\n")
+        await writer.drain()
+        while True:
+            linea = await reader.readline()
+            if not linea:
+                break
+            cmd = linea.decode("latin-1").strip().upper()
+            if self.latencia:
+                await asyncio.sleep(self.latencia)
+            if cmd.startswith(("EHLO", "HELO")):
+                writer.write(b"250-sink\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+            elif cmd.startswith("AUTH"):
+                writer.write(b"235 Autenticado\r\n")
+            elif cmd.startswith("DATA"):
+                writer.write(b"354 Fin con <CRLF>.<CRLF>\r\n")
+                await writer.drain()
+                while True:
+                    dato = await reader.readline()
+                    if dato in (b".\r\n", b""):
+                        break
+                    self.bytes += len(dato)
+                self.mensajes += 1
+                writer.write(b"250 En cola\r\n")
+            elif cmd.startswith("QUIT"):
+                writer.write(b"221 Adios\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+    def _ejecutar(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._atender, self.host, self.port)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._listo.set()
+        self._loop.run_forever()
+
+    def iniciar(self) -> "SmtpSink":
+        threading.Thread(target=self._ejecutar, daemon=True).start()
+        self._listo.wait()
+        return self
+
+    def detener(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
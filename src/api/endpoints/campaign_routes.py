@@ -0,0 +1,52 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from src.config.config import get_db
+from src.security.auth import verify_jwt_token
+from src.services.campaign_services import (
+    CampaignService,
+    detectar_formato,
+    filas_csv,
+    filas_ndjson,
+    leer_lineas,
+)
+
+router = APIRouter(tags=["Envio correo masivo"])
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que no escucha ``http.disconnect`` mientras responde.
+
+    El cuerpo de la petición se sigue leyendo mientras se envían resultados;
+    el listener de desconexión de Starlette consumiría esos mensajes. Si el
+    cliente se desconecta, el envío falla y el generador se cierra.
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@router.post("/send-email-campaign")
+async def send_email_campaign(
+    request: Request,
+    identifying_name: str = Query(..., description="Identificador de plantilla"),
+    subject: str = Query(..., description="Asunto por defecto (la columna 'subject' lo reemplaza)"),
+    formato: Optional[str] = Query(None, description="ndjson o csv; por defecto se deduce del Content-Type"),
+    db: Session = Depends(get_db),
+    tokenpayload: dict = Depends(verify_jwt_token),
+):
+    # Envía una plantilla a una lista de destinatarios recibida en streaming
+    # (NDJSON o CSV) y devuelve el resultado de cada destinatario como NDJSON.
+    formato = detectar_formato(formato, request.headers.get("content-type"))
+    service = CampaignService(db, identifying_name, subject)
+    # Antes de responder: una plantilla inexistente devuelve 404, no un flujo vacío
+    await service.cargar_contexto()
+
+    lineas = leer_lineas(request.stream())
+    filas = filas_csv(lineas) if formato == "csv" else filas_ndjson(lineas)
+    return NDJSONStreamingResponse(service.enviar(filas), media_type="application/x-ndjson")
@@ -4,7 +4,7 @@ from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional
 
 # from src.config.config import get_session
-from ...config.config import get_session
+from ...config.config import get_db
 
 from src.schemas.crud_credentials_schema import (
     CredentialsCreate,
@@ -13,6 +13,7 @@ from src.schemas.crud_credentials_schema import (
     PaginacionSchema
 )
 from src.security.auth import verify_jwt_token
+from src.utils.paginacion import codificar_cursor
 from src.services import crud_credentials_services as crud
 
 # inicializacion del roter
@@ -24,15 +25,30 @@ def list_credentials(
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=200),
     activo: Optional[bool] = Query(None, description="Filtrar por estado activo (true o false)"),
+    cursor: Optional[str] = Query(
+        None,
+        description="Paginación por cursor: next_cursor de la respuesta anterior (vacío para la primera página); ignora page",
+    ),
+    con_total: bool = Query(False, description="En modo cursor, calcular también el total (una consulta más)"),
     
-    db: Session = Depends(lambda: next(get_session(0))),
-    tokenpayload: dict = Depends(verify_jwt_token)
+    db: Session = Depends(get_db),
+    tokenpayload: dict = Depends(verify_jwt_token),
 )-> Dict[str, Any]:
-    skip = (page - 1) * per_page
     limit = per_page
-    data = crud.list_credential(db, activo=activo, skip=skip, limit=limit)
-    total = crud.count_credential(db, activo=activo)
-    # Método adicional para contar todos los datos
+    if cursor is not None:
+        # Keyset sobre id: mismo coste en cualquier página
+        data, next_cursor = crud.keyset_credential(db, cursor, limit, activo=activo)
+        return {
+            "items": data,
+            "per_page": per_page,
+            "size": limit,
+            "total": crud.count_credential(db, activo=activo) if con_total else None,
+            "next_cursor": next_cursor,
+        }
+
+    skip = (page - 1) * per_page
+    # Página y total en una sola consulta (count(*) OVER ())
+    data, total = crud.page_credential(db, activo=activo, skip=skip, limit=limit)
     return {
         "items": data,
         "per_page": per_page,
@@ -40,15 +56,16 @@ def list_credentials(
         "total": total,
         "last_page" : (total + per_page - 1) // per_page,
         "page": page,
-        "pages": (total + limit - 1) // limit  # Redondeo hacia arriba
-        
+        "pages": (total + limit - 1) // limit,  # Redondeo hacia arriba
+        # Permite seguir por cursor desde esta página
+        "next_cursor": codificar_cursor(data[-1].id) if skip + len(data) < total else None,
     }
 
 
 @router.post("/credentials", response_model=CredentialsOut)
 def create_credentials(
     data: CredentialsCreate,
-    db: Session = Depends(lambda: next(get_session(0))),
+    db: Session = Depends(get_db),
     tokenpayload: dict = Depends(verify_jwt_token)
 ):
     try:
@@ -61,7 +78,7 @@ def create_credentials(
 
 @router.get("/credentials/{id}", response_model=CredentialsOut)
 def read_credentials_by_id(
-    id: int, db: Session = Depends(lambda: next(get_session(0))),
+    id: int, db: Session = Depends(get_db),
     tokenpayload: dict = Depends(verify_jwt_token)
 ):
     try:
@@ -79,7 +96,7 @@ def read_credentials_by_id(
 def update_credentials(
     id: int,
     data: CredentialsUpdate,
-    db: Session = Depends(lambda: next(get_session(0))),
+    db: Session = Depends(get_db),
     tokenpayload: dict = Depends(verify_jwt_token)
 ):
     try:
@@ -95,7 +112,7 @@ def update_credentials(
 
 @router.delete("/credentials/{id}", response_model=CredentialsOut)
 def delete_credentials(
-    id: int, db: Session = Depends(lambda: next(get_session(0))),
+    id: int, db: Session = Depends(get_db),
     tokenpayload: dict = Depends(verify_jwt_token)
 ):
     try:
@@ -112,7 +129,7 @@ def delete_credentials(
         
 @router.post("/{id}/reactivate", response_model=CredentialsOut)
 def reactivates(
-    id: int, db: Session = Depends(lambda: next(get_session(0))),
+    id: int, db: Session = Depends(get_db),
     tokenpayload: dict = Depends(verify_jwt_token)
 ):
     try:
@@ -127,6 +144,6 @@ def reactivates(
         
 @router.get("/{id}")        
 def get_show(id: int, 
-                db: Session = Depends(lambda: next(get_session(0))),
+                db: Session = Depends(get_db),
                 tokenpayload: dict = Depends(verify_jwt_token)):
     return crud.show(db, id)
\ No newline at end of file
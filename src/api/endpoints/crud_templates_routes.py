@@ -3,7 +3,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional
 
-from src.config.config import get_session
+from src.config.config import get_db
 from src.schemas.crud_templates_schema import (
     CreateNotification,
     PaginacionSchema,
@@ -11,6 +11,7 @@ from src.schemas.crud_templates_schema import (
     NotificationOut
 )
 from src.security.auth import verify_jwt_token
+from src.utils.paginacion import codificar_cursor
 from src.services import crud_templates_services
 
 # inicializacion del roter
@@ -22,16 +23,30 @@ def list_notifications(
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=200),
     activo: Optional[bool] = Query(None, description="Filtrar por estado activo (true o false)"),
+    cursor: Optional[str] = Query(
+        None,
+        description="Paginación por cursor: next_cursor de la respuesta anterior (vacío para la primera página); ignora page",
+    ),
+    con_total: bool = Query(False, description="En modo cursor, calcular también el total (una consulta más)"),
     
-    db: Session = Depends(lambda: next(get_session(0))),
+    db: Session = Depends(get_db),
     tokenpayload: dict = Depends(verify_jwt_token),
 )-> Dict[str, Any]:
-    skip = (page - 1) * per_page
     limit = per_page
-    
-    data = crud_templates_services.list_template(db, activo=activo, skip=skip, limit=limit)
-    total = crud_templates_services.count_template(db, activo=activo)
-    # Método adicional para contar todos los datos
+    if cursor is not None:
+        # Keyset sobre id: mismo coste en cualquier página
+        data, next_cursor = crud_templates_services.keyset_template(db, cursor, limit, activo=activo)
+        return {
+            "items": data,
+            "per_page": per_page,
+            "size": limit,
+            "total": crud_templates_services.count_template(db, activo=activo) if con_total else None,
+            "next_cursor": next_cursor,
+        }
+
+    skip = (page - 1) * per_page
+    # Página y total en una sola consulta (count(*) OVER ())
+    data, total = crud_templates_services.page_template(db, activo=activo, skip=skip, limit=limit)
     return {
         "items": data,
         "per_page": per_page,
@@ -39,15 +54,16 @@ def list_notifications(
         "total": total,
         "last_page" : (total + per_page - 1) // per_page,
         "page": page,
-        "pages": (total + limit - 1) // limit  # Redondeo hacia arriba
-        
+        "pages": (total + limit - 1) // limit,  # Redondeo hacia arriba
+        # Permite seguir por cursor desde esta página
+        "next_cursor": codificar_cursor(data[-1].id) if skip + len(data) < total else None,
     }
 
 
 @router.post("/templates", response_model=NotificationOut)
 def create_notification(
     notification: CreateNotification,
-    db: Session = Depends(lambda: next(get_session(0))),
+    db: Session = Depends(get_db),
     tokenpayload: dict = Depends(verify_jwt_token),
 ):
     try:
@@ -62,7 +78,7 @@ def create_notification(
 @router.get("/templates/{id}")
 def read_notification(
     id: int,
-    db: Session = Depends(lambda: next(get_session(0))),
+    db: Session = Depends(get_db),
     tokenpayload: dict = Depends(verify_jwt_token),
 ):
     try:
@@ -84,7 +100,7 @@ def read_notification(
 def update_notification(
     id: int,
     data: UpdateNotification,
-    db: Session = Depends(lambda: next(get_session(0))),
+    db: Session = Depends(get_db),
     tokenpayload: dict = Depends(verify_jwt_token),
 ):
     try:
@@ -98,7 +114,7 @@ def update_notification(
 @router.delete("/templates/{id}", response_model=NotificationOut)
 def delete_notification(
     id_notification: int,
-    db: Session = Depends(lambda: next(get_session(0))),
+    db: Session = Depends(get_db),
     tokenpayload: dict = Depends(verify_jwt_token),
 ):
     try:
@@ -111,7 +127,7 @@ def delete_notification(
 
 @router.post("/{id}/reactivate", response_model=NotificationOut)
 def reactivates(
-    id: int, db: Session = Depends(lambda: next(get_session(0))), 
+    id: int, db: Session = Depends(get_db), 
     tokenpayload: dict = Depends(verify_jwt_token)
 ):
     try:
@@ -127,6 +143,6 @@ def reactivates(
         
 @router.get("/{id}")        
 def get_show(id: int, 
-                db: Session = Depends(lambda: next(get_session(0))),
+                db: Session = Depends(get_db),
                 tokenpayload: dict = Depends(verify_jwt_token)):
     return crud_templates_services.show(db, id)
\ No newline at end of file
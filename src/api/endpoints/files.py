@@ -4,22 +4,62 @@ Endpoints para la gestión de archivos en Azure Storage.
 @autor: Fabio Garcia
 @fecha: Septiembre 2025
 """
-from typing import Optional
+from email.utils import format_datetime
+from typing import Optional, Tuple
+import json
 import os
 import tempfile
 import aiofiles
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query, Header
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from starlette import status
 
-from ...models.schemas import FileUploadResponse, FileListResponse, ErrorResponse, SuccessResponse
+from ...config.settings import settings
+from ...models.schemas import (
+    BulkDeleteRequest, BulkDeleteResponse, FileUploadResponse, FileListResponse, ErrorResponse, SuccessResponse
+)
+from ...services.download_cache import EntradaCache, cache_descargas
 from ...services.storage_service import StorageService
-from ...utils.exceptions import StorageError
+from ...utils.exceptions import RangoNoSatisfacibleError, StorageError
 
 from src.security.auth import verify_jwt_token
 
 router = APIRouter()
 
+
+def _parsear_rango(valor: Optional[str]) -> Optional[Tuple[int, Optional[int]]]:
+    """
+    Interpreta una cabecera ``Range`` de un solo rango (``bytes=a-b`` o
+    ``bytes=a-``). Los rangos múltiples, por sufijo o mal formados se
+    ignoran y se sirve el archivo completo, como permite RFC 9110.
+    """
+    if not valor or not valor.startswith("bytes=") or "," in valor:
+        return None
+    inicio, _, fin = valor[len("bytes="):].strip().partition("-")
+    if not inicio.isdigit() or (fin and not fin.isdigit()):
+        return None
+    if fin and int(fin) < int(inicio):
+        return None
+    return int(inicio), int(fin) if fin else None
+
+
+class CacheFileResponse(FileResponse):
+    """
+    FileResponse de una copia de la caché de descargas. La libera al terminar,
+    también si el cliente corta la conexión o el rango no es satisfacible:
+    hasta entonces la caché no borra el archivo.
+    """
+    def __init__(self, entrada: EntradaCache, **kwargs):
+        super().__init__(entrada.ruta, media_type=entrada.content_type, **kwargs)
+        self.entrada = entrada
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            cache_descargas.liberar(self.entrada)
+
+
 @router.post(
     "/upload",
     response_model=FileUploadResponse,
@@ -54,16 +94,25 @@ async def upload_file(
                 detail="No se ha proporcionado ningún archivo"
             )
         
-        # Obtener el contenido del archivo
-        content = await file.read()
-        
-        # Cargar el archivo a Azure Storage
-        result = await StorageService.upload_file(
-            content,
-            file.filename,
-            file.content_type or "application/octet-stream",
-            container
-        )
+        if settings.storage_upload_streaming:
+            # Subida por bloques desde el archivo temporal, sin cargarlo en memoria
+            result = await StorageService.upload_stream(
+                file.file,
+                file.filename,
+                file.content_type or "application/octet-stream",
+                container
+            )
+        else:
+            # Obtener el contenido del archivo
+            content = await file.read()
+
+            # Cargar el archivo a Azure Storage
+            result = await StorageService.upload_file(
+                content,
+                file.filename,
+                file.content_type or "application/octet-stream",
+                container
+            )
         
         return result
         
@@ -88,33 +137,89 @@ async def upload_file(
 )
 async def download_file(container: str, 
                         file_name: str,
-                        api_key: str = Depends(verify_jwt_token)
+                        api_key: str = Depends(verify_jwt_token),
+                        range: Optional[str] = Header(None, description="Rango de bytes (bytes=inicio-fin)"),
+                        if_none_match: Optional[str] = Header(None, description="ETag de la copia que ya tiene el cliente")
                         ):
     """
     Descarga un archivo desde Azure Storage.
+
+    Admite descargas parciales (``Range`` → 206) y condicionales
+    (``If-None-Match`` → 304), resueltas con una sola petición a Azure.
     
     Args:
         file_name: Nombre del archivo a descargar
         container: Nombre del contenedor en Azure Storage
         api_key: API Key para autenticación (proporcionada en el header X-API-Key)
+        range: Cabecera Range opcional
+        if_none_match: Cabecera If-None-Match opcional
         
     Returns:
         StreamingResponse: Stream del contenido del archivo
     """
     try:
-        # Descargar el archivo desde Azure Storage
-        download_stream, content_type, size = await StorageService.download_file(file_name, container)
+        rango = _parsear_rango(range)
+        # Solo se admite un ETag; las listas se ignoran y se descarga normalmente
+        etag = if_none_match.strip() if if_none_match and "," not in if_none_match else None
+
+        descarga = None
+        # Caché local: aplica a descargas completas y a rangos de blobs ya guardados
+        if settings.storage_cache_habilitada and (rango is None or cache_descargas.contiene(container, file_name)):
+            entrada, descarga = await cache_descargas.descargar(file_name, container, etag)
+            if entrada:
+                if etag == entrada.etag:
+                    cache_descargas.liberar(entrada)
+                    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": entrada.etag})
+                headers = {
+                    "Content-Disposition": f"attachment; filename={file_name}",
+                    "ETag": entrada.etag,
+                }
+                if entrada.last_modified:
+                    headers["Last-Modified"] = format_datetime(entrada.last_modified, usegmt=True)
+                # FileResponse resuelve Range y envía el archivo sin copiarlo en memoria
+                return CacheFileResponse(entrada, headers=headers)
+
+        if descarga is None:
+            # Descargar el archivo desde Azure Storage
+            descarga = await StorageService.download_file(
+                file_name,
+                container,
+                inicio=rango[0] if rango else None,
+                fin=rango[1] if rango else None,
+                if_none_match=etag,
+            )
+
+        if descarga.no_modificado:
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": descarga.etag} if descarga.etag else None,
+            )
+
+        headers = {
+            "Content-Disposition": f"attachment; filename={file_name}",
+            "Content-Length": str(descarga.size),
+            "Accept-Ranges": "bytes",
+        }
+        if descarga.etag:
+            headers["ETag"] = descarga.etag
+        if descarga.last_modified:
+            headers["Last-Modified"] = format_datetime(descarga.last_modified, usegmt=True)
+        if descarga.parcial:
+            headers["Content-Range"] = f"bytes {descarga.inicio}-{descarga.fin}/{descarga.total}"
 
         # Crear respuesta de streaming
         return StreamingResponse(
-            download_stream.chunks(),
-            media_type=content_type,
-            headers={
-                "Content-Disposition": f"attachment; filename={file_name}",
-                "Content-Length": str(size)
-            }
+            descarga.stream.chunks(),
+            status_code=status.HTTP_206_PARTIAL_CONTENT if descarga.parcial else status.HTTP_200_OK,
+            media_type=descarga.content_type,
+            headers=headers
         )
         
+    except RangoNoSatisfacibleError as e:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{e.total}", "Accept-Ranges": "bytes"},
+        )
     except StorageError as e:
         if "no existe" in str(e):
             raise HTTPException(
@@ -131,6 +236,19 @@ async def download_file(container: str,
             detail=f"Error inesperado: {str(e)}"
         )
 
+@router.get(
+    "/cache/stats",
+    responses={
+        403: {"model": ErrorResponse, "description": "API Key inválida o no proporcionada"}
+    }
+)
+async def download_cache_stats(api_key: str = Depends(verify_jwt_token)):
+    """
+    Contadores de la caché local de descargas (aciertos, fallos, expulsiones
+    y bytes en disco), para dimensionar ``STORAGE_CACHE_MAX_BYTES``.
+    """
+    return cache_descargas.estadisticas()
+
 @router.get(
     "/list",
     response_model=FileListResponse,
@@ -142,20 +260,56 @@ async def download_file(container: str,
 async def list_files(
     prefix: Optional[str] = Query(None, description="Prefijo para filtrar archivos"),
     container: str = Query("files", description="Nombre del contenedor en Azure Storage"),
+    page_size: Optional[int] = Query(None, ge=1, le=5000, description="Archivos por página"),
+    continuation_token: Optional[str] = Query(None, description="Token de la página siguiente (next_token)"),
+    stream: bool = Query(False, description="Devolver el listado completo como NDJSON en streaming"),
     api_key: str = Depends(verify_jwt_token)
 ):
     """
     Lista los archivos disponibles en Azure Storage.
+
+    - Con ``page_size`` o ``continuation_token`` devuelve una sola página y
+      el ``next_token`` para pedir la siguiente.
+    - Con ``stream=true`` responde ``application/x-ndjson``: un archivo por
+      línea, pidiendo a Azure una página cada vez.
+    - Sin ellos devuelve el contenedor completo (comportamiento anterior).
     
     Args:
         prefix: Prefijo opcional para filtrar archivos
         container: Nombre del contenedor en Azure Storage   
+        page_size: Tamaño de página
+        continuation_token: Token de continuación de la página anterior
+        stream: Responder en NDJSON
         api_key: API Key para autenticación (proporcionada en el header X-API-Key)
         
     Returns:
         FileListResponse: Lista de archivos disponibles
     """
     try:
+        if stream:
+            async def lineas():
+                try:
+                    async for archivo in StorageService.iter_files(
+                        prefix, container,
+                        page_size or settings.storage_listado_pagina,
+                        continuation_token,
+                    ):
+                        yield archivo.model_dump_json() + "\n"
+                except StorageError as e:
+                    # La respuesta ya empezó: el error se informa como última línea
+                    yield json.dumps({"error": str(e)}) + "\n"
+
+            return StreamingResponse(lineas(), media_type="application/x-ndjson")
+
+        if page_size or continuation_token:
+            # Una página del listado
+            files, next_token = await StorageService.list_files_page(
+                prefix, container,
+                page_size or settings.storage_listado_pagina,
+                continuation_token,
+            )
+            return FileListResponse(files=files, count=len(files), next_token=next_token)
+
         # Listar archivos desde Azure Storage
         files = await StorageService.list_files(prefix, container)
         
@@ -176,6 +330,53 @@ async def list_files(
             detail=f"Error inesperado: {str(e)}"
         )
 
+@router.post(
+    "/bulk-delete",
+    response_model=BulkDeleteResponse,
+    responses={
+        403: {"model": ErrorResponse, "description": "API Key inválida o no proporcionada"},
+        422: {"model": ErrorResponse, "description": "Solicitud inválida"},
+        500: {"model": ErrorResponse, "description": "Error interno del servidor"}
+    }
+)
+async def bulk_delete_files(
+    request: BulkDeleteRequest,
+    api_key: str = Depends(verify_jwt_token)
+):
+    """
+    Elimina muchos archivos de Azure Storage en lotes (API batch de Azure).
+
+    Acepta una lista de nombres o un prefijo y, opcionalmente, una fecha de
+    corte ``older_than``. Devuelve el resultado de cada archivo: los que no
+    existen (404) o se modificaron después del corte (412) no cuentan como
+    eliminados.
+    
+    Args:
+        request: Nombres o prefijo, contenedor y fecha de corte
+        api_key: API Key para autenticación (proporcionada en el header X-API-Key)
+        
+    Returns:
+        BulkDeleteResponse: Totales y resultado por archivo
+    """
+    try:
+        return await StorageService.delete_files(
+            request.container,
+            names=request.names,
+            prefix=request.prefix,
+            older_than=request.older_than,
+        )
+
+    except StorageError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error inesperado: {str(e)}"
+        )
+
 @router.delete(
     "/{container}/{file_name}",
     response_model=SuccessResponse,
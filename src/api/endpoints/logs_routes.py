@@ -0,0 +1,57 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from src.config.config import get_db
+from src.schemas.logs_schema import EstadisticasLogsSchema, LogsPaginaSchema
+from src.security.auth import verify_jwt_token
+from src.services import logs_services
+
+# inicializacion del roter
+router = APIRouter(prefix="/logs", tags=["Logs de envio"])
+
+
+@router.get("", response_model=LogsPaginaSchema)
+def list_logs(
+    estado: Optional[str] = Query(None, description="ENVIADO, ERROR, ..."),
+    identificador: Optional[str] = Query(None, description="Identificador de la plantilla"),
+    destinatario: Optional[str] = Query(None, description="Correo del destinatario principal"),
+    desde: Optional[datetime] = Query(None, description="Fecha de envío desde (incluida, UTC si no tiene zona)"),
+    hasta: Optional[datetime] = Query(None, description="Fecha de envío hasta (excluida)"),
+    per_page: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor de la respuesta anterior"),
+    incluir_contenido: bool = Query(False, description="Incluir el HTML enviado en cada log"),
+    db: Session = Depends(get_db),
+    tokenpayload: dict = Depends(verify_jwt_token),
+) -> Dict[str, Any]:
+    # Logs del más reciente al más antiguo, paginados por cursor
+    data, next_cursor = logs_services.listar_logs(
+        db,
+        per_page,
+        cursor=cursor,
+        estado=estado,
+        identificador=identificador,
+        destinatario=destinatario,
+        desde=desde,
+        hasta=hasta,
+        incluir_contenido=incluir_contenido,
+    )
+    return {"items": data, "per_page": per_page, "size": len(data), "next_cursor": next_cursor}
+
+
+@router.get("/stats", response_model=EstadisticasLogsSchema)
+def logs_stats(
+    desde: Optional[datetime] = Query(None, description="Desde (se redondea a la hora; por defecto hace 24 horas)"),
+    hasta: Optional[datetime] = Query(None, description="Hasta (por defecto ahora)"),
+    identificador: Optional[str] = Query(None, description="Identificador de la plantilla ('' = logs sin plantilla)"),
+    estado: Optional[str] = Query(None, description="ENVIADO, ERROR, ..."),
+    por_hora: bool = Query(False, description="Un conteo por hora en lugar del total del rango"),
+    db: Session = Depends(get_db),
+    tokenpayload: dict = Depends(verify_jwt_token),
+):
+    # Conteos por plantilla y estado desde el resumen por hora (sin recorrer logs_envio)
+    return logs_services.estadisticas(
+        db, desde=desde, hasta=hasta, identificador=identificador, estado=estado, por_hora=por_hora
+    )
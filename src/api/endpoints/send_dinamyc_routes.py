@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
-from src.config.config import get_session
+from src.config.config import get_db
 from src.models.smtp_model import EmailRequest
 from src.security.auth import verify_jwt_token
 from src.services.send_dinamyc_services import SendDinamycO365Service
@@ -12,9 +13,15 @@ router = APIRouter(tags=["Envio correo avanzado"])
 @router.post("/send-email-form")
 async def send_email_form(
     form: EmailRequest = Depends(),
-    db: Session = Depends(lambda: next(get_session(0))),
+    encolar: bool = Query(False, description="Encolar el envío y responder 202 con el id del trabajo"),
+    db: Session = Depends(get_db),
     tokenpayload: str = Depends(verify_jwt_token),
 ):
     service = SendDinamycO365Service(db, form, tokenpayload=tokenpayload["token"])
-    result = await service.send(form)
+    result = await service.send(form, encolar=encolar)
+    if encolar:
+        return JSONResponse(
+            status_code=202,
+            content={"message": "Correo encolado", "detail": result},
+        )
     return {"message": "Correo procesado", "detail": result}
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
-from src.config.config import get_session
+from src.config.config import get_db
 from src.models.smtp_model_basic import EmailRequest
 from src.security.auth import verify_jwt_token
 # from src.services.send_services import O365EmailService
 from src.services.send_services import SmtpEmailService
+from src.services import outbox_service
 
 router = APIRouter(tags=["Envio correo basico"])
 
@@ -13,12 +15,37 @@ router = APIRouter(tags=["Envio correo basico"])
 @router.post("/send-email")
 async def send_email(
     request: EmailRequest,
-    db: Session = Depends(lambda: next(get_session(0))),
+    encolar: bool = Query(False, description="Encolar el envío y responder 202 con el id del trabajo"),
+    db: Session = Depends(get_db),
     # tokenpayload: dict = Depends(verify_jwt_token),
 ):
     # Endpoint para enviar un correo usando O365.
     try:
-        result = await SmtpEmailService(db, request).send(request)
+        result = await SmtpEmailService(db, request).send(request, encolar=encolar)
+        if encolar:
+            return JSONResponse(
+                status_code=202,
+                content={"message": "Correo encolado", "detail": result},
+            )
         return {"message": "Correo enviado correctamente", "detail": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/send-email/jobs/{job_id}")
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    tokenpayload: dict = Depends(verify_jwt_token),
+):
+    # Consulta el estado de un envío encolado
+    trabajo = outbox_service.consultar_trabajo(db, job_id)
+    return {
+        "job_id": trabajo.id,
+        "estado": trabajo.estado,
+        "intentos": trabajo.intentos,
+        "destinatario": trabajo.destinatario,
+        "fecha_creacion": trabajo.fecha_creacion,
+        "fecha_actualizacion": trabajo.fecha_actualizacion,
+        "detalle": trabajo.detalle,
+    }
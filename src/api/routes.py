@@ -8,8 +8,10 @@ from fastapi import APIRouter
 from .endpoints import files
 from .endpoints import send_routes
 from .endpoints import send_dinamyc_routes
+from .endpoints import campaign_routes
 from .endpoints import crud_templates_routes
 from .endpoints import crud_credentials_routes
+from .endpoints import logs_routes
 
 
 # Crear router principal
@@ -20,6 +22,9 @@ api_router.include_router(files.router, prefix="/v1/files", tags=["files"])
 
 api_router.include_router(send_routes.router)
 api_router.include_router(send_dinamyc_routes.router)
+api_router.include_router(campaign_routes.router)
 
 api_router.include_router(crud_templates_routes.router)
 api_router.include_router(crud_credentials_routes.router)
+
+api_router.include_router(logs_routes.router)
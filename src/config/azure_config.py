@@ -4,6 +4,13 @@ Configuración para la conexión con Azure Blob Storage.
 @autor: Fabio Garcia
 @fecha: Septiembre 2025
 """
+import asyncio
+import time
+from typing import Dict, Optional
+
+import aiohttp
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.storage.blob import StorageErrorCode
 from azure.storage.blob.aio import BlobServiceClient
 from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
 from ..config.settings import settings
@@ -16,41 +23,128 @@ class AzureStorageConfig:
     y gestionar la conexión con el servicio.
     """
     
+    # Cliente compartido por todo el proceso (se crea una sola vez)
+    _cliente: Optional[BlobServiceClient] = None
+    _lock: Optional[asyncio.Lock] = None
+    # Contenedores ya verificados: nombre -> instante (monotónico) de la verificación
+    _contenedores: Dict[str, float] = {}
+
     @staticmethod
-    async def get_blob_service_client():
+    def configurado() -> bool:
+        """Indica si hay credenciales de Azure Storage en la configuración."""
+        return bool(
+            settings.azure_storage_connection_string
+            or (settings.azure_storage_account_name and settings.azure_storage_account_key)
+        )
+
+    @staticmethod
+    def _crear_cliente() -> BlobServiceClient:
         """
-        Crea y devuelve un cliente asíncrono para Azure Blob Storage.
-        
-        Returns:
-            BlobServiceClient: Cliente asíncrono para Azure Blob Storage.
+        Construye el cliente con un transporte aiohttp propio, cuyo pool de
+        conexiones y tiempos de espera salen de la configuración.
         """
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=settings.storage_pool_conexiones,
+                limit_per_host=settings.storage_pool_conexiones,
+                keepalive_timeout=settings.storage_keepalive,
+            ),
+            trust_env=True,
+        )
+        transport = AioHttpTransport(
+            session=session,
+            session_owner=True,  # el transporte cierra la sesión al cerrar el cliente
+            connection_timeout=settings.storage_timeout_conexion,
+            read_timeout=settings.storage_timeout_lectura,
+        )
+
         # Priorizar el uso de connection string si está disponible
         if settings.azure_storage_connection_string:
             return BlobServiceClient.from_connection_string(
-                settings.azure_storage_connection_string
+                settings.azure_storage_connection_string,
+                transport=transport,
             )
-        
+
         # Alternativa: usar cuenta y clave
-        elif settings.azure_storage_account_name and settings.azure_storage_account_key:
-            account_url = f"https://{settings.azure_storage_account_name}.blob.core.windows.net"
-            return BlobServiceClient(
-                account_url=account_url,
-                credential=settings.azure_storage_account_key
-            )
-        
+        account_url = f"https://{settings.azure_storage_account_name}.blob.core.windows.net"
+        return BlobServiceClient(
+            account_url=account_url,
+            credential=settings.azure_storage_account_key,
+            transport=transport,
+        )
+
+    @staticmethod
+    async def get_blob_service_client():
+        """
+        Devuelve el cliente asíncrono compartido para Azure Blob Storage.
+
+        El cliente se crea al arrancar la aplicación (``iniciar``) y se
+        reutiliza en todas las operaciones, de modo que las conexiones TLS
+        quedan abiertas entre peticiones. Si aún no existe (scripts, pruebas)
+        se crea en el primer uso.
+
+        Returns:
+            BlobServiceClient: Cliente asíncrono para Azure Blob Storage.
+        """
+        if AzureStorageConfig._cliente is not None:
+            return AzureStorageConfig._cliente
+
         # Si no hay credenciales, lanzar excepción
-        else:
+        if not AzureStorageConfig.configurado():
             raise ValueError(
                 "No se ha proporcionado configuración válida para Azure Storage. "
                 "Debe configurar AZURE_STORAGE_CONNECTION_STRING o "
                 "AZURE_STORAGE_ACCOUNT_NAME y AZURE_STORAGE_ACCOUNT_KEY."
             )
-    
+
+        if AzureStorageConfig._lock is None:
+            AzureStorageConfig._lock = asyncio.Lock()
+        async with AzureStorageConfig._lock:
+            if AzureStorageConfig._cliente is None:
+                AzureStorageConfig._cliente = AzureStorageConfig._crear_cliente()
+        return AzureStorageConfig._cliente
+
+    @staticmethod
+    async def iniciar() -> None:
+        """Crea el cliente compartido al arrancar (si hay credenciales)."""
+        if not AzureStorageConfig.configurado():
+            print("⚠️ Azure Storage sin configurar; el cliente se creará en el primer uso")
+            return
+        await AzureStorageConfig.get_blob_service_client()
+
+    @staticmethod
+    async def cerrar() -> None:
+        """Cierra el cliente compartido y su pool de conexiones (al apagar)."""
+        cliente = AzureStorageConfig._cliente
+        AzureStorageConfig._cliente = None
+        AzureStorageConfig._lock = None
+        if cliente is not None:
+            await cliente.close()
+
+    @staticmethod
+    def olvidar_contenedor(container_name: str) -> None:
+        """Quita un contenedor de la caché (p. ej. porque fue eliminado)."""
+        AzureStorageConfig._contenedores.pop(container_name, None)
+
+    @staticmethod
+    def contenedor_inexistente(error: Exception) -> bool:
+        """Indica si ``error`` es la respuesta de Azure a un contenedor que no existe."""
+        return (
+            isinstance(error, ResourceNotFoundError)
+            and getattr(error, "error_code", None) == StorageErrorCode.CONTAINER_NOT_FOUND
+        )
+
     @staticmethod
     async def ensure_container_exists(container_name=None):
         """
         Asegura que el contenedor especificado existe, creándolo si es necesario.
-        
+
+        Los contenedores verificados se recuerdan en el proceso, así que solo
+        la primera llamada (o la primera tras ``storage_contenedores_ttl``
+        segundos, si es mayor que 0) hace la petición ``create_container``.
+        Si el contenedor se elimina después, la operación que falle debe
+        llamar a ``olvidar_contenedor`` y volver a asegurarlo.
+
         Args:
             container_name (str, optional): Nombre del contenedor. 
                 Si no se proporciona, se usa el valor por defecto de la configuración.
@@ -59,6 +153,11 @@ class AzureStorageConfig:
             str: Nombre del contenedor.
         """
         container_name = container_name or settings.azure_storage_container_name
+
+        verificado = AzureStorageConfig._contenedores.get(container_name)
+        ttl = settings.storage_contenedores_ttl
+        if verificado is not None and (ttl <= 0 or time.monotonic() - verificado < ttl):
+            return container_name
         
         # Obtener cliente de servicio
         blob_service_client = await AzureStorageConfig.get_blob_service_client()
@@ -72,5 +171,6 @@ class AzureStorageConfig:
         except ResourceExistsError:
             # El contenedor ya existe, lo cual está bien
             pass
-        
+
+        AzureStorageConfig._contenedores[container_name] = time.monotonic()
         return container_name
@@ -1,9 +1,14 @@
 import os
-from typing import Generator, List, Union
+import time
+from typing import AsyncGenerator, Generator, List, Union
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, exc, MetaData
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from .settings import settings
 
 # Cargar variables de entorno
 load_dotenv()
@@ -29,13 +34,96 @@ SCHEMA_NAMES = ["Notificaciones"]
 
 # # --- Configura las URLs dinámicamente ---
 DB_URL = f"postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+# Driver asíncrono (asyncpg) para las consultas que se hacen desde el event loop
+DB_URL_ASYNC = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+
+
+# # --- Pools de conexiones ---
+
+class EsperaPool:
+    """Acumula cuánto esperan los checkouts de un pool por una conexión."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.timeouts = 0
+
+    def registrar(self, segundos: float) -> None:
+        self.checkouts += 1
+        self.total += segundos
+        self.maximo = max(self.maximo, segundos)
+
+    def resumen(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "espera_media_ms": round(self.total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "espera_max_ms": round(self.maximo * 1000, 3),
+            "timeouts": self.timeouts,
+        }
+
+
+class _EsperaMedida:
+    """
+    Mide cada checkout del pool: el tiempo esperando una conexión libre (o
+    abriendo una nueva) y los que terminan en ``QueuePool limit ... timed out``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.espera = EsperaPool()
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            self.espera.timeouts += 1
+            raise
+        self.espera.registrar(time.perf_counter() - inicio)
+        return conexion
+
+    def recreate(self):
+        # dispose() crea un pool nuevo: conservar los contadores
+        nuevo = super().recreate()
+        nuevo.espera = self.espera
+        return nuevo
+
+
+class PoolMedido(_EsperaMedida, QueuePool):
+    pass
+
+
+class PoolAsyncMedido(_EsperaMedida, AsyncAdaptedQueuePool):
+    pass
+
+
+POOL_OPCIONES = dict(
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+)
 
 
 # # --- Crear engines y sesiones dinámicamente ---
 
-engine = [create_engine(DB_URL, echo=False, future=True) for _ in SCHEMA_NAMES]
+engine = [
+    create_engine(DB_URL, echo=False, future=True, poolclass=PoolMedido, **POOL_OPCIONES)
+    for _ in SCHEMA_NAMES
+]
 sessions = [sessionmaker(autocommit=False, autoflush=False, bind=e) for e in engine]
 
+# Engines y sesiones asíncronas, uno por schema (mismo orden que SCHEMA_NAMES)
+async_engine = [
+    create_async_engine(DB_URL_ASYNC, echo=False, poolclass=PoolAsyncMedido, **POOL_OPCIONES)
+    for _ in SCHEMA_NAMES
+]
+async_sessions = [
+    async_sessionmaker(bind=e, autoflush=False, expire_on_commit=False) for e in async_engine
+]
+
 
 Base = [declarative_base(metadata=MetaData(schema=schema)) for schema in SCHEMA_NAMES]
 
@@ -59,4 +147,46 @@ def get_session(
             yield dbs
         finally:
             for db in dbs:
-                db.close()
\ No newline at end of file
+                db.close()
+
+
+def get_db() -> Generator[Session, None, None]:
+    """
+    Dependencia de FastAPI con la sesión del schema principal.
+
+    FastAPI reanuda el generador al terminar la petición (también cuando la
+    respuesta es un streaming), así que la conexión vuelve al pool en cuanto
+    se envía la respuesta.
+    """
+    yield from get_session(0)
+
+
+async def get_async_session(db_index: int = 0) -> AsyncGenerator[AsyncSession, None]:
+    """Devuelve una sesión asíncrona del schema indicado y la cierra al terminar."""
+    async with async_sessions[db_index]() as db:
+        yield db
+
+
+async def cerrar_engines_async() -> None:
+    """Cierra las conexiones de los engines asíncronos (usado al apagar)."""
+    for e in async_engine:
+        await e.dispose()
+
+
+def estado_pools() -> List[dict]:
+    """Ocupación y esperas de los pools de conexiones de cada schema."""
+    estado = []
+    for schema, sync, asincrono in zip(SCHEMA_NAMES, engine, async_engine):
+        for driver, pool in (("psycopg2", sync.pool), ("asyncpg", asincrono.pool)):
+            estado.append({
+                "schema": schema,
+                "driver": driver,
+                "pool_size": pool.size(),
+                "max_overflow": settings.db_max_overflow,
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                # QueuePool.overflow() es negativo mientras quedan conexiones base sin abrir
+                "overflow": max(pool.overflow(), 0),
+                **pool.espera.resumen(),
+            })
+    return estado
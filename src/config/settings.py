@@ -5,6 +5,8 @@ Configuración general de la aplicación.
 @fecha: Septiembre 2025
 """
 import os
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -16,6 +18,10 @@ class Settings(BaseSettings):
         debug: Modo de depuración
         api_prefix: Prefijo para todas las rutas de la API
         api_key: Clave de API para autenticación
+        smtp_pool_*: Límites del pool de sesiones SMTP por credencial
+        outbox_*: Workers que entregan los envíos encolados
+        logs_*: Escritura en lote de los logs de envío
+        db_*: Driver de las consultas del envío y pool de conexiones de PostgreSQL
     """
     app_name: str = "Azure Storage App"
     debug: bool = False
@@ -24,11 +30,38 @@ class Settings(BaseSettings):
     # Configuración de seguridad
     api_key: str = "123"
     
+    # Backend de almacenamiento de archivos: "azure" o "local" (directorio storage_local_dir)
+    storage_backend: Literal["azure", "local"] = "azure"
+    storage_local_dir: str = "uploads/blobs"
+    # URL base de los archivos locales (vacío = endpoint de descarga de esta API)
+    storage_local_url_base: str = ""
+
     # Configuración para Azure Storage
     azure_storage_connection_string: str = ""
     azure_storage_account_name: str = ""
     azure_storage_account_key: str = ""
     azure_storage_container_name: str = "files"
+    # Subida por bloques (block blobs): tamaño de bloque en bytes y bloques en vuelo
+    storage_upload_streaming: bool = True
+    storage_upload_bloque: int = 4 * 1024 * 1024
+    storage_upload_concurrencia: int = 4
+    # Cliente compartido de Blob Storage: conexiones del pool y tiempos en segundos
+    storage_pool_conexiones: int = 100
+    storage_keepalive: float = 30.0
+    storage_timeout_conexion: float = 20.0
+    storage_timeout_lectura: float = 60.0
+    # Segundos que se recuerda un contenedor verificado (0 = mientras viva el proceso)
+    storage_contenedores_ttl: float = 0.0
+    # Tamaño de página del listado de archivos (máximo de Azure: 5000)
+    storage_listado_pagina: int = 1000
+    # Caché local en disco de descargas (opcional): presupuesto total y tamaño máximo por blob
+    storage_cache_habilitada: bool = False
+    storage_cache_dir: str = "uploads/cache_descargas"
+    storage_cache_max_bytes: int = 512 * 1024 * 1024
+    storage_cache_max_archivo: int = 32 * 1024 * 1024
+    # Borrado masivo: blobs por petición batch (máximo 256) y lotes en vuelo
+    storage_borrado_lote: int = 256
+    storage_borrado_concurrencia: int = 4
     
     # configuracion_bd
     postgres_host: str
@@ -36,11 +69,76 @@ class Settings(BaseSettings):
     postgres_db: str
     postgres_user: str
     postgres_password: str
+    # Consultas del camino de envío (plantilla/credencial y logs) con asyncpg
+    # en lugar de psycopg2 síncrono en el event loop (opcional: DB_ASYNC=true)
+    db_async: bool = False
+    # Pool de conexiones de cada engine (tiempos en segundos)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    # Reciclar conexiones más viejas que esto (-1 = nunca) y comprobarlas antes de usarlas
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
     secret_key: str
     algorithm: str
     url_api_storage: str
 
-    
+    # Configuración del pool de sesiones SMTP (tiempos en segundos)
+    smtp_timeout: float = 30.0
+    smtp_starttls: bool = True
+    smtp_max_workers: int = 16
+    smtp_pool_max_por_credencial: int = 4
+    smtp_pool_max_inactividad: float = 60.0
+    smtp_pool_max_vida: float = 600.0
+    smtp_pool_timeout_espera: float = 30.0
+
+    # Bandeja de salida (outbox) y workers de envío en segundo plano
+    outbox_habilitado: bool = True
+    outbox_workers: int = 2
+    outbox_lote: int = 5
+    outbox_intervalo: float = 1.0
+    outbox_max_intentos: int = 5
+    outbox_reintento_base: float = 30.0
+    outbox_visibilidad: float = 300.0
+
+    # Cliente HTTP del servicio externo de correo (serviciostic.net)
+    relay_url: str = "https://email.serviciostic.net/"
+    relay_timeout: float = 15.0
+    relay_max_conexiones: int = 50
+    relay_max_keepalive: int = 20
+    relay_keepalive_expiry: float = 30.0
+    relay_http2: bool = False
+
+    # Envío masivo (campañas)
+    campana_concurrencia: int = 4
+
+    # Escritor en lote de logs_envio (cada N registros o M milisegundos)
+    logs_lote: int = 200
+    logs_intervalo_ms: int = 250
+    logs_max_buffer: int = 10000
+    # Particiones mensuales de logs_envio: meses creados por adelantado, meses
+    # conservados (0 = sin retención) y cada cuánto corre el mantenimiento (segundos)
+    logs_particion_meses_adelante: int = 3
+    logs_retencion_meses: int = 0
+    logs_mantenimiento_intervalo: float = 21600.0
+
+    # Almacén local de adjuntos direccionado por contenido (SHA-256)
+    adjuntos_dir: str = "uploads/adjuntos"
+    # Subida de adjuntos del formulario: "local" (StorageService en proceso)
+    # o "remoto" (POST a URL_API_STORAGE en otra instancia)
+    adjuntos_subida: Literal["local", "remoto"] = "local"
+    # Verificar el certificado TLS de URL_API_STORAGE en la subida remota
+    adjuntos_verificar_tls: bool = True
+    # Adjuntos de un mismo envío que se suben en paralelo
+    adjuntos_concurrencia: int = 4
+
+    # Caché de plantillas compiladas (número máximo de versiones)
+    plantillas_cache_max: int = 256
+
+    # Caché del par (plantilla, credencial) usado en cada envío (TTL en segundos)
+    contexto_cache_max: int = 512
+    contexto_cache_ttl: float = 300.0
+
     class Config:
         env_file = ".env"
         case_sensitive = False
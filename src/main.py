@@ -4,7 +4,9 @@ Punto de entrada de la aplicación FastAPI.
 @autor: Fabio Garcia
 @fecha: Septiembre 2025
 """
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
@@ -12,10 +14,49 @@ import os
 
 from scalar_fastapi import get_scalar_api_reference
 
+from .config.azure_config import AzureStorageConfig
 from .config.settings import settings
 from .api.routes import api_router
 from .utils.exceptions import StorageError
-from src.config.config import Base, engine
+from .services.download_cache import cache_descargas
+from .services.log_writer import log_writer
+from .services.logs_particiones import mantenimiento_particiones
+from .services.outbox_worker import outbox_workers
+from .services.relay_client import cerrar_cliente_relay
+from .services.smtp_transport import cerrar_transporte
+from .security.auth import verify_jwt_token
+from src.config.config import Base, cerrar_engines_async, engine, estado_pools
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Gestiona los recursos compartidos durante el ciclo de vida de la app."""
+    # Cliente compartido de Azure Blob Storage (pool de conexiones reutilizado)
+    if settings.storage_backend == "azure":
+        await AzureStorageConfig.iniciar()
+    # Particiones futuras y retención de logs_envio (primera pasada al arrancar)
+    mantenimiento_particiones.iniciar()
+    # Escritor en lote de los logs de envío
+    log_writer.iniciar()
+    # Workers que vacían la bandeja de salida de envíos encolados
+    if settings.outbox_habilitado:
+        outbox_workers.iniciar()
+    yield
+    await outbox_workers.detener()
+    # Vaciar los logs pendientes (incluidos los de los workers recién detenidos)
+    await log_writer.detener()
+    await mantenimiento_particiones.detener()
+    # Cerrar las conexiones asyncpg (después del último vaciado de logs)
+    await cerrar_engines_async()
+    # Cerrar el cliente HTTP compartido del servicio externo de correo
+    await cerrar_cliente_relay()
+    # Esperar los envíos SMTP en curso y cerrar las sesiones del pool
+    await cerrar_transporte()
+    # Cerrar el cliente de Blob Storage y sus conexiones
+    await AzureStorageConfig.cerrar()
+    # Borrar las copias locales de la caché de descargas de este proceso
+    cache_descargas.vaciar()
+
 
 # Crear aplicación FastAPI
 app = FastAPI(
@@ -24,8 +65,11 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
+# Una logs_envio sin particionar de versiones anteriores no se migra aquí (en
+# cada réplica y bajo bloqueo): ver python -m src.scripts.particionar_logs_envio
 for base, eng in zip(Base, engine):
     print(f"🛠️ Creando tablas en schema: {base.metadata.schema}")
     base.metadata.create_all(bind=eng)
@@ -55,6 +99,11 @@ async def storage_exception_handler(request, exc):
 async def health_check():
     return {"status": "ok"}
 
+# Ocupación de los pools de conexiones a la base de datos
+@app.get("/health/db", tags=["health"])
+async def pool_metrics(tokenpayload: dict = Depends(verify_jwt_token)):
+    return {"pools": estado_pools()}
+
 # Ruta para documentación con Scalar
 @app.get("/scalar", include_in_schema=False)
 async def scalar_html():
@@ -33,7 +33,7 @@
 
 
 from datetime import datetime
-from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text, event
 from src.config.config import Base
 
 
@@ -46,22 +46,39 @@ def crear_modelo_logs_envio(base):
 
     class LogsEnvio(base):
         __tablename__ = "logs_envio"
-
-        id = Column(Integer, primary_key=True, index=True, autoincrement=True, comment="Identificador único del log de envío")
+        __table_args__ = (
+            # Índices de las consultas habituales (se crean en cada partición)
+            Index(f"ix_{schema}_logs_envio_fecha_id", "fecha_envio", "id"),
+            Index(f"ix_{schema}_logs_envio_estado_fecha", "estado", "fecha_envio"),
+            Index(f"ix_{schema}_logs_envio_identificador_estado_fecha", "identificador", "estado", "fecha_envio"),
+            Index(f"ix_{schema}_logs_envio_destinatario_fecha", "destinatario", "fecha_envio"),
+            # Una partición por mes (ver services/logs_particiones.py)
+            {"postgresql_partition_by": "RANGE (fecha_envio)"},
+        )
+
+        # La clave de partición tiene que formar parte de la clave primaria
+        id = Column(Integer, primary_key=True, autoincrement=True, comment="Identificador único del log de envío")
         destinatario = Column(String(255), nullable=False, comment="Correo del destinatario principal")
         cc = Column(Text, nullable=True, comment="Lista de correos en copia")
         bcc = Column(Text, nullable=True, comment="Lista de correos en copia oculta")
-        adjuntos = Column(Text, nullable=True, comment="Lista de rutas de archivos adjuntos")
+        adjuntos = Column(Text, nullable=True, comment="Adjuntos separados por ';': referencias sha256:<hash>/<nombre> del almacén local o rutas remotas")
         num_adjuntos = Column(Integer, default=0, comment="Cantidad de adjuntos enviados")
         imagenes = Column(Text, nullable=True, comment="Lista de imágenes adjuntas")
         num_imagenes = Column(Integer, default=0, comment="Cantidad de imágenes adjuntas")
         asunto = Column(String(500), nullable=True, comment="Asunto del correo enviado")
         contenido = Column(Text, nullable=True, comment="Contenido HTML del correo enviado")
         estado = Column(String(50), default="PENDIENTE", comment="Estado del envío: PENDIENTE, ENVIADO o ERROR")
-        fecha_envio = Column(DateTime, default=datetime.utcnow, comment="Fecha y hora del intento de envío")
+        fecha_envio = Column(DateTime, primary_key=True, default=datetime.utcnow, comment="Fecha y hora del intento de envío (clave de partición)")
         identificador = Column(String(255), nullable=True, comment="Identificador relacionado con la plantilla")
         detalle = Column(Text, nullable=True, comment="Mensaje de error o confirmación del envío")
 
+    @event.listens_for(LogsEnvio.__table__, "after_create")
+    def _crear_particiones(target, connection, **kw):
+        # Sin particiones la tabla no admite inserciones: crear las del mes
+        # actual y siguientes junto con la tabla
+        from src.services.logs_particiones import asegurar_particiones
+        asegurar_particiones(connection, schema)
+
     # Renombrar la clase según el schema
     LogsEnvio.__name__ = f"LogsEnvio_{schema}"
     return LogsEnvio
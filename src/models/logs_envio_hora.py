@@ -0,0 +1,41 @@
+from sqlalchemy import BigInteger, Column, DateTime, String, event, text
+from src.config.config import Base
+
+
+def crear_modelo_logs_envio_hora(base):
+    """
+    Crea dinámicamente la tabla 'logs_envio_hora' (resumen por hora de
+    logs_envio) para el schema asociado a la Base recibida.
+    """
+    schema = base.metadata.schema  # obtiene el esquema actual
+
+    class LogsEnvioHora(base):
+        __tablename__ = "logs_envio_hora"
+
+        hora = Column(DateTime, primary_key=True, comment="Inicio de la hora (UTC) de los envíos contados")
+        identificador = Column(String(255), primary_key=True, comment="Identificador de la plantilla ('' si el log no tiene)")
+        estado = Column(String(50), primary_key=True, comment="Estado del envío: ENVIADO, ERROR, ...")
+        total = Column(BigInteger, nullable=False, default=0, comment="Cantidad de logs de envío de la hora, plantilla y estado")
+
+    @event.listens_for(LogsEnvioHora.__table__, "after_create")
+    def _rellenar(target, connection, **kw):
+        # Resumen de los logs que ya existían antes de crear la tabla
+        existe = connection.execute(
+            text("SELECT to_regclass(:tabla) IS NOT NULL"), {"tabla": f'"{schema}".logs_envio'}
+        ).scalar()
+        if existe:
+            connection.execute(text(
+                f'INSERT INTO "{schema}".logs_envio_hora (hora, identificador, estado, total) '
+                "SELECT date_trunc('hour', fecha_envio), coalesce(identificador, ''), coalesce(estado, ''), count(*) "
+                f'FROM "{schema}".logs_envio GROUP BY 1, 2, 3'
+            ))
+
+    # Renombrar la clase según el schema
+    LogsEnvioHora.__name__ = f"LogsEnvioHora_{schema}"
+    return LogsEnvioHora
+
+
+# ==========================================================
+# INSTANCIAS DE MODELOS POR SCHEMA
+# ==========================================================
+LogsEnvioHora = crear_modelo_logs_envio_hora(Base[0])
@@ -0,0 +1,46 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+from src.config.config import Base
+
+
+def crear_modelo_outbox_envio(base):
+    """
+    Crea dinámicamente la tabla 'outbox_envio' (bandeja de salida duradera)
+    para el schema asociado a la Base recibida.
+    """
+    schema = base.metadata.schema  # obtiene el esquema actual
+
+    class OutboxEnvio(base):
+        __tablename__ = "outbox_envio"
+        __table_args__ = (
+            # Índice usado por los workers para reclamar trabajos pendientes
+            Index(f"ix_{schema}_outbox_envio_estado_disponible", "estado", "disponible_en"),
+        )
+
+        id = Column(Integer, primary_key=True, index=True, autoincrement=True, comment="Identificador único del trabajo de envío")
+        canal = Column(String(20), nullable=False, comment="Canal de entrega: SMTP o RELAY")
+        credenciales_id = Column(Integer, nullable=True, comment="ID de la credencial SMTP usada para el envío")
+        remitente = Column(String(255), nullable=True, comment="Correo del remitente")
+        destinatario = Column(String(255), nullable=False, comment="Correo del destinatario principal")
+        cc = Column(Text, nullable=True, comment="Lista de correos en copia")
+        bcc = Column(Text, nullable=True, comment="Lista de correos en copia oculta")
+        adjuntos = Column(Text, nullable=True, comment="Lista de rutas locales de archivos adjuntos")
+        asunto = Column(String(500), nullable=True, comment="Asunto del correo")
+        contenido = Column(Text, nullable=True, comment="Contenido HTML ya renderizado")
+        identificador = Column(String(255), nullable=True, comment="Identificador relacionado con la plantilla")
+        estado = Column(String(50), default="PENDIENTE", nullable=False, comment="Estado del trabajo: PENDIENTE, PROCESANDO, ENVIADO o ERROR")
+        intentos = Column(Integer, default=0, nullable=False, comment="Cantidad de intentos de entrega realizados")
+        disponible_en = Column(DateTime, default=datetime.utcnow, nullable=False, comment="Fecha a partir de la cual un worker puede tomar el trabajo")
+        fecha_creacion = Column(DateTime, default=datetime.utcnow, comment="Fecha y hora en que se encoló el trabajo")
+        fecha_actualizacion = Column(DateTime, nullable=True, comment="Fecha y hora del último cambio de estado")
+        detalle = Column(Text, nullable=True, comment="Último mensaje de error o confirmación")
+
+    # Renombrar la clase según el schema
+    OutboxEnvio.__name__ = f"OutboxEnvio_{schema}"
+    return OutboxEnvio
+
+
+# ==========================================================
+# INSTANCIAS DE MODELOS POR SCHEMA
+# ==========================================================
+OutboxEnvio = crear_modelo_outbox_envio(Base[0])
@@ -4,8 +4,9 @@ Modelos de datos y esquemas Pydantic.
 @autor: Fabio Garcia
 @fecha: Septiembre 2025
 """
+from datetime import datetime
 from typing import List, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 class FileInfo(BaseModel):
     """
@@ -45,10 +46,12 @@ class FileListResponse(BaseModel):
     
     Attributes:
         files: Lista de archivos disponibles
-        count: Número total de archivos
+        count: Número de archivos devueltos
+        next_token: Token para pedir la página siguiente (None si no hay más)
     """
     files: List[FileInfo]
-    count: int = Field(..., description="Número total de archivos")
+    count: int = Field(..., description="Número de archivos devueltos")
+    next_token: Optional[str] = Field(None, description="Token de continuación de la página siguiente")
 
 class ErrorResponse(BaseModel):
     """
@@ -73,3 +76,58 @@ class SuccessResponse(BaseModel):
     message: str
     data: Optional[dict] = None
 
+
+
+class BulkDeleteRequest(BaseModel):
+    """
+    Solicitud de borrado masivo de archivos.
+
+    Se indica una lista de nombres o un prefijo (no ambos). ``older_than``
+    limita el borrado a los archivos no modificados desde esa fecha.
+
+    Attributes:
+        container: Nombre del contenedor
+        names: Nombres de los archivos a eliminar
+        prefix: Prefijo de los archivos a eliminar
+        older_than: Fecha de corte (UTC); solo se borran archivos anteriores
+    """
+    container: str = "files"
+    names: Optional[List[str]] = None
+    prefix: Optional[str] = None
+    older_than: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def _nombres_o_prefijo(self):
+        if (self.names is None) == (self.prefix is None):
+            raise ValueError("Debe indicar 'names' o 'prefix', pero no ambos")
+        return self
+
+
+class BulkDeleteItem(BaseModel):
+    """
+    Resultado del borrado de un archivo.
+
+    Attributes:
+        name: Nombre del archivo
+        status: Código HTTP devuelto por Azure para ese archivo
+        deleted: Si el archivo fue eliminado
+        error: Motivo del fallo (opcional)
+    """
+    name: str
+    status: int
+    deleted: bool
+    error: Optional[str] = None
+
+
+class BulkDeleteResponse(BaseModel):
+    """
+    Respuesta del borrado masivo.
+
+    Attributes:
+        deleted: Número de archivos eliminados
+        failed: Número de archivos no eliminados
+        results: Resultado de cada archivo
+    """
+    deleted: int
+    failed: int
+    results: List[BulkDeleteItem]
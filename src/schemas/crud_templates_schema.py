@@ -36,7 +36,9 @@ class PaginacionSchema(BaseModel):
     items: List[Notification]
     per_page: int
     size: int
-    total: int
-    page: int
-    pages: int
-    last_page:int
+    # En modo cursor no hay número de página y el total solo se calcula si se pide
+    total: Optional[int] = None
+    page: Optional[int] = None
+    pages: Optional[int] = None
+    last_page: Optional[int] = None
+    next_cursor: Optional[str] = None
@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Optional, List
+
+from pydantic import BaseModel, ConfigDict
+
+
+class LogEnvioOut(BaseModel):
+    id: int
+    destinatario: str
+    cc: Optional[str] = None
+    bcc: Optional[str] = None
+    adjuntos: Optional[str] = None
+    num_adjuntos: Optional[int] = None
+    imagenes: Optional[str] = None
+    num_imagenes: Optional[int] = None
+    asunto: Optional[str] = None
+    # Solo con incluir_contenido=true (HTML completo del correo)
+    contenido: Optional[str] = None
+    estado: Optional[str] = None
+    fecha_envio: datetime
+    identificador: Optional[str] = None
+    detalle: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class LogsPaginaSchema(BaseModel):
+    items: List[LogEnvioOut]
+    per_page: int
+    size: int
+    next_cursor: Optional[str] = None
+
+
+class EstadisticaLogs(BaseModel):
+    # Presente solo al agrupar por hora
+    hora: Optional[datetime] = None
+    identificador: str
+    estado: str
+    total: int
+
+
+class EstadisticasLogsSchema(BaseModel):
+    desde: datetime
+    hasta: datetime
+    items: List[EstadisticaLogs]
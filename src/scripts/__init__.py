@@ -0,0 +1,2 @@
+# Inicializador del paquete
+# Este archivo permite que Python reconozca el directorio como un paquete
@@ -0,0 +1,55 @@
+"""
+Migración única de una ``logs_envio`` sin particionar a la tabla particionada.
+
+No se ejecuta al arrancar la aplicación: se lanza una vez, desde un solo
+proceso, con las mismas variables POSTGRES_* que la aplicación:
+
+    python -m src.scripts.particionar_logs_envio
+
+1. Preparación (sin bloquear las escrituras, puede tardar): índices con
+   ``CREATE INDEX CONCURRENTLY`` y restricción de rango validada.
+2. Migración (transacción corta): renombra la tabla a ``logs_envio_legacy``
+   y la adjunta como partición de la tabla nueva sin recorrerla.
+
+Con ``--solo-preparar`` se hace solo el primer paso, para lanzar el segundo
+en otro momento. Ver ``src/services/logs_particiones.py``.
+"""
+import argparse
+import sys
+
+from sqlalchemy.exc import OperationalError
+
+from src.config.config import Base, engine
+from src.services.logs_particiones import migrar_tabla_sin_particiones, preparar_tabla_sin_particiones
+
+
+def main(solo_preparar: bool, lock_timeout: str) -> int:
+    schema = Base[0].metadata.schema
+    try:
+        if not preparar_tabla_sin_particiones(engine[0], schema, lock_timeout):
+            print("logs_envio ya está particionada o no existe: no hay nada que migrar")
+            return 0
+    except OperationalError as e:
+        print(f"❌ No se pudo preparar logs_envio: {e}")
+        return 1
+    print("🗂️ logs_envio preparada: índices y restricción de rango validados")
+    if solo_preparar:
+        return 0
+    try:
+        migrar_tabla_sin_particiones(engine[0], schema, lock_timeout)
+    except OperationalError as e:
+        # Normalmente, lock_timeout: la tabla sigue como estaba y se puede reintentar
+        print(f"❌ No se pudo migrar logs_envio, se mantiene la tabla anterior: {e}")
+        return 1
+    print("✅ logs_envio migrada a tabla particionada")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--solo-preparar", action="store_true",
+                        help="Solo crear índices y validar la restricción de rango")
+    parser.add_argument("--lock-timeout", default="5s",
+                        help="Espera máxima por el bloqueo de la tabla (p. ej. 5s)")
+    args = parser.parse_args()
+    sys.exit(main(args.solo_preparar, args.lock_timeout))
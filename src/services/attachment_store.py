@@ -0,0 +1,161 @@
+"""
+Almacén local de adjuntos direccionado por contenido (SHA-256).
+
+Cada adjunto se guarda una sola vez en ``<adjuntos_dir>/sha256/ab/<hash>``,
+sin importar cuántos envíos lo usen ni cómo se llame. Cada envío guarda una
+referencia ``sha256:<hash>/<nombre>``: el hash identifica el contenido y el
+nombre es el que verá el destinatario. Esas referencias son las que quedan en
+``LogsEnvio.adjuntos`` y en la bandeja de salida.
+
+El espacio en disco y las escrituras crecen con el contenido único, no con
+el número de envíos.
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+from ..config.settings import settings
+
+PREFIJO = "sha256:"
+_BLOQUE = 1024 * 1024
+# Caracteres que no pueden ir en el nombre de una referencia
+_NO_PERMITIDOS = re.compile(r"[;\x00-\x1f\x7f-\x9f]")
+
+
+@dataclass(frozen=True)
+class AdjuntoGuardado:
+    """Adjunto ya presente en el almacén."""
+    sha256: str
+    nombre: str
+    tamano: int
+    ruta: Path
+    nuevo: bool
+
+    @property
+    def referencia(self) -> str:
+        return f"{PREFIJO}{self.sha256}/{self.nombre}"
+
+
+class AttachmentStore:
+    """Objetos inmutables indexados por SHA-256 en el sistema de archivos."""
+
+    def __init__(self, raiz: str):
+        self.raiz = Path(raiz)
+        self.objetos = self.raiz / "sha256"
+
+    def ruta_objeto(self, sha256: str) -> Path:
+        return self.objetos / sha256[:2] / sha256
+
+    def guardar_bytes(self, contenido: bytes, nombre: str) -> AdjuntoGuardado:
+        """Guarda el contenido si aún no existe y devuelve su referencia."""
+        sha256 = hashlib.sha256(contenido).hexdigest()
+        destino = self.ruta_objeto(sha256)
+        nuevo = False
+        if not destino.exists():
+            nuevo = self._publicar(destino, lambda f: f.write(contenido))
+        return AdjuntoGuardado(sha256, _nombre_seguro(nombre), len(contenido), destino, nuevo)
+
+    def guardar_flujo(self, flujo: BinaryIO, nombre: str) -> AdjuntoGuardado:
+        """
+        Guarda el contenido de un archivo abierto (p. ej. el temporal de un
+        UploadFile) leyéndolo por bloques: el hash se calcula mientras se
+        escribe un temporal, que se descarta si el contenido ya existía.
+        """
+        flujo.seek(0)
+        digest = hashlib.sha256()
+        tamano = 0
+        self.objetos.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.objetos, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for bloque in iter(lambda: flujo.read(_BLOQUE), b""):
+                    digest.update(bloque)
+                    tamano += len(bloque)
+                    f.write(bloque)
+            sha256 = digest.hexdigest()
+            destino = self.ruta_objeto(sha256)
+            nuevo = False
+            if destino.exists():
+                os.unlink(tmp)
+            else:
+                destino.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp, destino)
+                nuevo = True
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        finally:
+            flujo.seek(0)
+        return AdjuntoGuardado(sha256, _nombre_seguro(nombre), tamano, destino, nuevo)
+
+    def guardar_archivo(self, origen: str, nombre: Optional[str] = None) -> AdjuntoGuardado:
+        """Calcula el hash de un archivo en bloques y lo copia solo si es contenido nuevo."""
+        origen_path = Path(origen)
+        digest = hashlib.sha256()
+        tamano = 0
+        with open(origen_path, "rb") as f:
+            for bloque in iter(lambda: f.read(_BLOQUE), b""):
+                digest.update(bloque)
+                tamano += len(bloque)
+        sha256 = digest.hexdigest()
+        destino = self.ruta_objeto(sha256)
+        nuevo = False
+        if not destino.exists():
+            def copiar(tmp: BinaryIO) -> None:
+                with open(origen_path, "rb") as f:
+                    shutil.copyfileobj(f, tmp, _BLOQUE)
+            nuevo = self._publicar(destino, copiar)
+        return AdjuntoGuardado(
+            sha256, _nombre_seguro(nombre or origen_path.name), tamano, destino, nuevo
+        )
+
+    def _publicar(self, destino: Path, escribir) -> bool:
+        """
+        Escribe en un temporal del mismo directorio y lo renombra de forma
+        atómica, para que nunca se lea un objeto a medio escribir. Si otro
+        envío publicó el mismo hash a la vez, gana cualquiera: el contenido es
+        idéntico.
+        """
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=destino.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                escribir(f)
+            if destino.exists():
+                os.unlink(tmp)
+                return False
+            os.replace(tmp, destino)
+            return True
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def resolver(self, referencia: str) -> Optional[Tuple[Path, str]]:
+        """
+        Devuelve ``(ruta_local, nombre)`` de una referencia del almacén o de
+        una ruta local (registros anteriores), o None si no existe en disco.
+        """
+        if referencia.startswith(PREFIJO):
+            sha256, _, nombre = referencia[len(PREFIJO):].partition("/")
+            ruta = self.ruta_objeto(sha256)
+            return (ruta, nombre or sha256) if ruta.exists() else None
+        ruta = Path(referencia)
+        return (ruta, ruta.name) if ruta.exists() else None
+
+
+def _nombre_seguro(nombre: str) -> str:
+    # Solo el nombre base: el separador '/' delimita hash y nombre en la referencia
+    nombre = os.path.basename((nombre or "").replace("\\", "/"))
+    # ';' separa las referencias en outbox_envio y logs_envio; sin caracteres de control
+    return _NO_PERMITIDOS.sub("_", nombre) or "adjunto"
+
+
+# Instancia global del almacén
+attachment_store = AttachmentStore(settings.adjuntos_dir)
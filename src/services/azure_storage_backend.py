@@ -0,0 +1,531 @@
+"""
+Backend de almacenamiento sobre Azure Blob Storage.
+
+@autor: Fabio Garcia
+@fecha: Septiembre 2025
+"""
+from typing import Awaitable, Callable, Iterable, List, Optional, BinaryIO, Tuple, TypeVar
+import asyncio
+import base64
+import uuid
+from urllib.parse import quote
+from datetime import datetime, timezone
+from azure.storage.blob import BlobBlock, ContentSettings
+from azure.storage.blob.aio import BlobClient
+from azure.core import MatchConditions
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+
+from ..config.azure_config import AzureStorageConfig
+from ..config.settings import settings
+from ..models.schemas import BulkDeleteItem, BulkDeleteResponse, FileInfo, FileUploadResponse, SuccessResponse
+from ..utils.exceptions import RangoNoSatisfacibleError, StorageError
+from .storage_backend import MOTIVOS_BORRADO, DescargaBlob, StorageBackend
+
+T = TypeVar("T")
+
+
+async def _en_contenedor(container: Optional[str], operacion: Callable[[str], Awaitable[T]]) -> T:
+    """
+    Ejecuta ``operacion(nombre_contenedor)`` sobre un contenedor asegurado.
+
+    El contenedor normalmente ya está en la caché de ``AzureStorageConfig``
+    y no se hace ninguna petición previa. Si fue eliminado desde fuera, la
+    operación falla con ``ContainerNotFound``: se olvida, se vuelve a crear
+    y se reintenta una sola vez.
+    """
+    container_name = await AzureStorageConfig.ensure_container_exists(container)
+    if not container_name:
+        raise StorageError("El contenedor especificado no existe o no se pudo crear.")
+    try:
+        return await operacion(container_name)
+    except ResourceNotFoundError as e:
+        if not AzureStorageConfig.contenedor_inexistente(e):
+            raise
+        AzureStorageConfig.olvidar_contenedor(container_name)
+        await AzureStorageConfig.ensure_container_exists(container_name)
+        return await operacion(container_name)
+
+
+async def _subir_por_bloques(
+    blob_client: BlobClient,
+    stream: BinaryIO,
+    content_type: str,
+    tam_bloque: int,
+    en_vuelo: int,
+) -> int:
+    """
+    Sube ``stream`` como block blob leyendo bloques de ``tam_bloque`` bytes y
+    manteniendo hasta ``en_vuelo`` llamadas ``stage_block`` simultáneas; al
+    final confirma la lista de bloques en orden. La memoria usada queda
+    acotada a ``tam_bloque * en_vuelo`` sin importar el tamaño del archivo.
+
+    Returns:
+        int: Bytes subidos
+    """
+    content_settings = ContentSettings(content_type=content_type)
+    bloque = await asyncio.to_thread(stream.read, tam_bloque)
+
+    # Archivos de un solo bloque: una única petición Put Blob
+    if len(bloque) < tam_bloque:
+        await blob_client.upload_blob(
+            bloque, overwrite=True, content_settings=content_settings
+        )
+        return len(bloque)
+
+    ids: List[str] = []
+    tareas: set = set()
+    total = 0
+    try:
+        while bloque:
+            if len(tareas) >= en_vuelo:
+                hechas, tareas = await asyncio.wait(
+                    tareas, return_when=asyncio.FIRST_COMPLETED
+                )
+                for tarea in hechas:
+                    tarea.result()  # propaga el primer error
+
+            # Los ids deben tener la misma longitud y estar en base64
+            block_id = base64.b64encode(f"{len(ids):08d}".encode()).decode()
+            ids.append(block_id)
+            tareas.add(asyncio.ensure_future(
+                blob_client.stage_block(block_id, bloque, length=len(bloque))
+            ))
+            total += len(bloque)
+            bloque = await asyncio.to_thread(stream.read, tam_bloque)
+
+        await asyncio.gather(*tareas)
+    except BaseException:
+        for tarea in tareas:
+            tarea.cancel()
+        raise
+
+    await blob_client.commit_block_list(
+        [BlobBlock(block_id=block_id) for block_id in ids],
+        content_settings=content_settings,
+    )
+    return total
+
+
+def _total_desde_content_range(content_range: Optional[str], por_defecto: int) -> int:
+    """Extrae el tamaño total de una cabecera ``bytes a-b/total``."""
+    if content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        if total.isdigit():
+            return int(total)
+    return por_defecto
+
+
+def _file_info(blob, url_contenedor: str) -> FileInfo:
+    """Convierte un ``BlobProperties`` del listado en ``FileInfo``."""
+    # Con una connection string SAS la URL del contenedor lleva el token
+    # (``?sv=...&sig=...``): va detrás de la ruta del blob, como en BlobClient.url
+    base, separador, sas = url_contenedor.partition("?")
+    return FileInfo(
+        name=blob.name,
+        size=blob.size,
+        content_type=blob.content_settings.content_type or "application/octet-stream",
+        # Misma codificación que BlobClient.url, sin crear un cliente por blob
+        url=f"{base.rstrip('/')}/{quote(blob.name, safe='~/')}{separador}{sas}",
+        created_on=blob.creation_time.isoformat() if blob.creation_time else datetime.now().isoformat()
+    )
+
+
+# Máximo de subpeticiones que admite una petición batch de Azure
+MAX_LOTE_BORRADO = 256
+
+async def _borrar_lote(container_client, nombres: List[str], antes_de: Optional[datetime]) -> List[BulkDeleteItem]:
+    """Elimina hasta 256 blobs con una sola petición batch."""
+    blobs = [
+        {"name": nombre, "if_unmodified_since": antes_de} if antes_de else nombre
+        for nombre in nombres
+    ]
+    try:
+        respuestas = await container_client.delete_blobs(
+            *blobs, delete_snapshots="include", raise_on_any_failure=False
+        )
+        # Las subrespuestas llegan en el mismo orden que los blobs
+        estados = [r.status_code async for r in respuestas]
+    except Exception as e:
+        return [BulkDeleteItem(name=n, status=500, deleted=False, error=str(e)) for n in nombres]
+
+    return [
+        BulkDeleteItem(
+            name=nombre,
+            status=estado,
+            deleted=200 <= estado < 300,
+            error=None if 200 <= estado < 300 else MOTIVOS_BORRADO.get(estado, f"Error HTTP {estado}"),
+        )
+        for nombre, estado in zip(nombres, estados)
+    ]
+
+
+class AzureStorageBackend(StorageBackend):
+    """
+    Almacenamiento en Azure Blob Storage (``azure.storage.blob.aio``) con el
+    cliente compartido de ``AzureStorageConfig``.
+    """
+    
+    async def upload_file(self, file_content: BinaryIO, file_name: str, content_type: str, container: str = None) -> FileUploadResponse:
+        """
+        Carga un archivo a Azure Blob Storage.
+        
+        Args:
+            file_content: Contenido del archivo a cargar
+            file_name: Nombre del archivo
+            content_type: Tipo de contenido MIME del archivo
+            container: Nombre del contenedor donde se cargará el archivo
+            
+        Returns:
+            FileUploadResponse: Información del archivo cargado
+            
+        Raises:
+            StorageError: Si ocurre un error durante la carga
+        """
+        try:
+            # Generar un nombre único para evitar colisiones
+            unique_name = f"{uuid.uuid4().hex}_{file_name}"
+            inicio = file_content.tell() if hasattr(file_content, "seek") else None
+
+            async def subir(container_name: str) -> BlobClient:
+                # Obtener cliente de blob
+                blob_service_client = await AzureStorageConfig.get_blob_service_client()
+                blob_client = blob_service_client.get_container_client(container_name).get_blob_client(unique_name)
+                if inicio is not None:
+                    file_content.seek(inicio)
+
+                # Cargar el archivo
+                await blob_client.upload_blob(
+                    file_content,
+                    content_settings=ContentSettings(content_type=content_type),
+                    overwrite=True
+                )
+                return blob_client
+
+            # Una sola petición si el contenedor ya está verificado
+            blob_client = await _en_contenedor(container, subir)
+
+            # El tamaño se conoce sin pedir las propiedades del blob
+            if isinstance(file_content, (bytes, bytearray, memoryview)):
+                file_size = len(file_content)
+            else:
+                file_size = (await blob_client.get_blob_properties()).size
+
+            # Crear y devolver respuesta
+            return FileUploadResponse(
+                file_name=unique_name,
+                file_size=file_size,
+                content_type=content_type,
+                url=blob_client.url
+            )
+            
+        except Exception as e:
+            raise StorageError(f"Error al cargar el archivo: {str(e)}")
+    
+    async def upload_stream(self, stream: BinaryIO, file_name: str, content_type: str, container: str = None) -> FileUploadResponse:
+        """
+        Carga un archivo a Azure Blob Storage leyéndolo por bloques.
+
+        A diferencia de ``upload_file`` no necesita el contenido completo en
+        memoria: lee ``storage_upload_bloque`` bytes cada vez desde ``stream``
+        (p. ej. ``UploadFile.file``) y los sube en paralelo como bloques.
+
+        Args:
+            stream: Archivo abierto en modo binario, posicionado al inicio
+            file_name: Nombre del archivo
+            content_type: Tipo de contenido MIME del archivo
+            container: Nombre del contenedor donde se cargará el archivo
+
+        Returns:
+            FileUploadResponse: Información del archivo cargado
+
+        Raises:
+            StorageError: Si ocurre un error durante la carga
+        """
+        try:
+            # Generar un nombre único para evitar colisiones
+            unique_name = f"{uuid.uuid4().hex}_{file_name}"
+            inicio = stream.tell()
+
+            async def subir(container_name: str):
+                # Obtener cliente de blob
+                blob_service_client = await AzureStorageConfig.get_blob_service_client()
+                blob_client = blob_service_client.get_container_client(container_name).get_blob_client(unique_name)
+                stream.seek(inicio)
+
+                # Subir por bloques en paralelo y confirmar la lista de bloques
+                tamano = await _subir_por_bloques(
+                    blob_client,
+                    stream,
+                    content_type,
+                    settings.storage_upload_bloque,
+                    max(1, settings.storage_upload_concurrencia),
+                )
+                return blob_client, tamano
+
+            blob_client, tamano = await _en_contenedor(container, subir)
+
+            return FileUploadResponse(
+                file_name=unique_name,
+                file_size=tamano,
+                content_type=content_type,
+                url=blob_client.url
+            )
+
+        except Exception as e:
+            raise StorageError(f"Error al cargar el archivo: {str(e)}")
+
+    async def download_file(
+        self,
+        file_name: str,
+        container: str = None,
+        inicio: Optional[int] = None,
+        fin: Optional[int] = None,
+        if_none_match: Optional[str] = None,
+    ) -> DescargaBlob:
+        """
+        Descarga un archivo desde Azure Blob Storage con una sola petición.
+
+        La respuesta de ``download_blob`` ya trae las propiedades del blob
+        (tipo, tamaño, ETag), así que no se consultan por separado.
+        
+        Args:
+            file_name: Nombre del archivo a descargar
+            container: Nombre del contenedor (por defecto el de la configuración)
+            inicio: Primer byte a descargar (cabecera Range); None = desde el inicio
+            fin: Último byte a descargar, inclusive; None = hasta el final
+            if_none_match: ETag que ya tiene el cliente; si coincide no se descarga
+            
+        Returns:
+            DescargaBlob: Stream de datos y metadatos de la descarga
+            
+        Raises:
+            RangoNoSatisfacibleError: Si ``inicio`` está más allá del final
+            StorageError: Si el archivo no existe o hay un error durante la descarga
+        """
+        container_name = container or settings.azure_storage_container_name
+        try:
+            # Obtener cliente de blob
+            blob_service_client = await AzureStorageConfig.get_blob_service_client()
+            blob_client = blob_service_client.get_container_client(container_name).get_blob_client(file_name)
+
+            opciones = {}
+            if inicio is not None:
+                opciones["offset"] = inicio
+                if fin is not None:
+                    opciones["length"] = fin - inicio + 1
+            if if_none_match:
+                opciones["etag"] = if_none_match
+                opciones["match_condition"] = MatchConditions.IfModified
+
+            # Descargar el blob (una petición; el resto de bloques se piden al iterar)
+            download_stream = await blob_client.download_blob(**opciones)
+            properties = download_stream.properties
+
+            descarga = DescargaBlob(
+                stream=download_stream,
+                content_type=properties.content_settings.content_type or "application/octet-stream",
+                size=download_stream.size,
+                total=_total_desde_content_range(properties.content_range, download_stream.size),
+                etag=properties.etag,
+                last_modified=properties.last_modified,
+            )
+            if inicio is not None:
+                descarga.inicio = inicio
+                descarga.fin = inicio + download_stream.size - 1
+            return descarga
+
+        except ResourceNotFoundError:
+            raise StorageError(f"El archivo \'{file_name}\' no existe")
+        except HttpResponseError as e:
+            if e.status_code == 304:
+                # El cliente ya tiene la versión actual
+                etag = e.response.headers.get("ETag") if e.response is not None else None
+                return DescargaBlob(
+                    stream=None,
+                    content_type="application/octet-stream",
+                    size=0,
+                    total=0,
+                    etag=etag or if_none_match,
+                    no_modificado=True,
+                )
+            if e.status_code == 416:
+                # Caso poco frecuente: se consulta el tamaño para la cabecera Content-Range
+                try:
+                    total = (await blob_client.get_blob_properties()).size
+                except Exception as e2:
+                    raise StorageError(f"Error al descargar el archivo: {str(e2)}")
+                raise RangoNoSatisfacibleError(
+                    f"El rango solicitado no es válido para \'{file_name}\'", total
+                )
+            raise StorageError(f"Error al descargar el archivo: {str(e)}")
+        except Exception as e:
+            raise StorageError(f"Error al descargar el archivo: {str(e)}")
+    
+    async def list_files_page(
+        self,
+        prefix: Optional[str] = None,
+        container: str = None,
+        page_size: int = 1000,
+        continuation_token: Optional[str] = None,
+    ) -> Tuple[List[FileInfo], Optional[str]]:
+        """
+        Lista una página de archivos usando las páginas nativas de Azure
+        (``by_page``): una petición por llamada, sin recorrer el contenedor.
+        
+        Args:
+            prefix: Prefijo opcional para filtrar archivos
+            container: Nombre del contenedor (por defecto el de la configuración)
+            page_size: Número máximo de archivos de la página (Azure admite hasta 5000)
+            continuation_token: Token devuelto por la página anterior
+            
+        Returns:
+            Tuple[List[FileInfo], Optional[str]]: Archivos de la página y token
+            de la siguiente (None si no hay más)
+            
+        Raises:
+            StorageError: Si ocurre un error durante el listado
+        """
+        try:
+            blob_service_client = await AzureStorageConfig.get_blob_service_client()
+            container_name = container or settings.azure_storage_container_name
+            container_client = blob_service_client.get_container_client(container_name)
+
+            paginas = container_client.list_blobs(
+                name_starts_with=prefix, results_per_page=page_size
+            ).by_page(continuation_token=continuation_token)
+
+            archivos: List[FileInfo] = []
+            async for pagina in paginas:
+                archivos = [_file_info(blob, container_client.url) async for blob in pagina]
+                break
+            return archivos, paginas.continuation_token or None
+
+        except Exception as e:
+            raise StorageError(f"Error al listar archivos: {str(e)}")
+
+    async def delete_files(
+        self,
+        container: str = None,
+        names: Optional[Iterable[str]] = None,
+        prefix: Optional[str] = None,
+        older_than: Optional[datetime] = None,
+    ) -> BulkDeleteResponse:
+        """
+        Elimina muchos archivos con la API batch de Azure: lotes de hasta 256
+        blobs por petición y ``storage_borrado_concurrencia`` lotes en vuelo.
+
+        Con ``prefix`` se recorren las páginas del listado y los lotes se
+        envían mientras se lista; con ``older_than`` solo se borran los blobs
+        no modificados desde esa fecha (también se comprueba en Azure con
+        ``If-Unmodified-Since``, por si cambian entre el listado y el borrado).
+
+        Args:
+            container: Nombre del contenedor (por defecto el de la configuración)
+            names: Nombres de los archivos a eliminar
+            prefix: Prefijo de los archivos a eliminar (alternativa a ``names``)
+            older_than: Fecha de corte opcional
+
+        Returns:
+            BulkDeleteResponse: Resultado de cada archivo
+
+        Raises:
+            StorageError: Si falla el listado o la conexión con Azure
+        """
+        if older_than and older_than.tzinfo is None:
+            # Azure trabaja en UTC
+            older_than = older_than.replace(tzinfo=timezone.utc)
+        try:
+            blob_service_client = await AzureStorageConfig.get_blob_service_client()
+            container_name = container or settings.azure_storage_container_name
+            container_client = blob_service_client.get_container_client(container_name)
+
+            tam_lote = max(1, min(settings.storage_borrado_lote, MAX_LOTE_BORRADO))
+            semaforo = asyncio.Semaphore(max(1, settings.storage_borrado_concurrencia))
+            tareas: List[asyncio.Task] = []
+
+            async def con_limite(lote: List[str]) -> List[BulkDeleteItem]:
+                try:
+                    return await _borrar_lote(container_client, lote, older_than)
+                finally:
+                    semaforo.release()
+
+            async def enviar(lote: List[str]) -> None:
+                # Se espera turno antes de crear la tarea: el listado no se adelanta
+                await semaforo.acquire()
+                tareas.append(asyncio.create_task(con_limite(lote)))
+
+            lote: List[str] = []
+            try:
+                if prefix is not None:
+                    async for blob in container_client.list_blobs(name_starts_with=prefix):
+                        if older_than and blob.last_modified and blob.last_modified >= older_than:
+                            continue
+                        lote.append(blob.name)
+                        if len(lote) == tam_lote:
+                            await enviar(lote)
+                            lote = []
+                else:
+                    for nombre in dict.fromkeys(names or []):
+                        lote.append(nombre)
+                        if len(lote) == tam_lote:
+                            await enviar(lote)
+                            lote = []
+                if lote:
+                    await enviar(lote)
+                resultados = await asyncio.gather(*tareas)
+            except BaseException:
+                for tarea in tareas:
+                    tarea.cancel()
+                raise
+
+            items = [item for lote_resultados in resultados for item in lote_resultados]
+            borrados = sum(1 for item in items if item.deleted)
+            return BulkDeleteResponse(deleted=borrados, failed=len(items) - borrados, results=items)
+
+        except Exception as e:
+            raise StorageError(f"Error al eliminar archivos: {str(e)}")
+
+    async def delete_file(self, file_name: str, container: str = None) -> SuccessResponse:
+        """
+        Elimina un archivo de Azure Blob Storage.
+        
+        Args:
+            file_name: Nombre del archivo a eliminar
+            container: Nombre del contenedor en Azure Storage (por defecto "files")
+
+        Returns:
+            SuccessResponse: Respuesta de éxito
+
+        Raises:
+            StorageError: Si el archivo no existe o hay un error durante la eliminación
+        """
+        try:
+            # Obtener cliente de servicio
+            blob_service_client = await AzureStorageConfig.get_blob_service_client()
+            
+            # Obtener cliente de contenedor
+            container_name = container or settings.azure_storage_container_name
+            container_client = blob_service_client.get_container_client(
+                container_name
+            )
+            
+            # Obtener cliente de blob
+            blob_client = container_client.get_blob_client(file_name)
+            
+            # Eliminar el blob (si no existe Azure responde 404: ResourceNotFoundError)
+            await blob_client.delete_blob()
+            
+            #Crear y devolver respuesta
+            return SuccessResponse(
+                message="Archivo eliminado exitosamente",
+                data={
+                    "file_name": file_name,
+                    "container": container_name
+                }
+            )
+
+        except ResourceNotFoundError:
+            raise StorageError(f"El archivo \'{file_name}\' no existe")
+        except Exception as e:
+            raise StorageError(f"Error al eliminar el archivo: {str(e)}")
+
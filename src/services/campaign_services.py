@@ -0,0 +1,229 @@
+"""
+Envío masivo (campaña): una plantilla, muchos destinatarios.
+
+La lista de destinatarios llega como flujo NDJSON o CSV y se procesa fila a
+fila: la plantilla y la credencial se consultan una sola vez, cada fila se
+renderiza y se envía con las sesiones SMTP del pool, y el resultado por
+destinatario se devuelve también como flujo NDJSON. Solo hay un número
+acotado de envíos en vuelo, por lo que la memoria no crece con la lista.
+"""
+import asyncio
+import csv
+import json
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from src.config.settings import settings
+from src.services.contexto_envio_cache import obtener_contexto_envio, obtener_contexto_envio_async
+from src.services.log_writer import log_writer
+from src.services.send_dinamyc_services import construir_mensaje, validar_email
+from src.services.smtp_transport import enviar_mensaje
+from src.services.template_engine import obtener_compilada
+
+# Columnas CSV reservadas; el resto se usan como variables de la plantilla
+COLUMNAS_RESERVADAS = ("to", "cc", "bcc", "subject")
+
+
+async def leer_lineas(flujo: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Divide un flujo de bytes en líneas de texto sin cargarlo completo."""
+    pendiente = b""
+    async for bloque in flujo:
+        pendiente += bloque
+        *lineas, pendiente = pendiente.split(b"\n")
+        for linea in lineas:
+            yield linea.rstrip(b"\r").decode("utf-8-sig")
+    if pendiente:
+        yield pendiente.rstrip(b"\r").decode("utf-8-sig")
+
+
+def _lista(valor) -> List[str]:
+    if not valor:
+        return []
+    if isinstance(valor, str):
+        return [v.strip() for v in valor.split(";") if v.strip()]
+    if not isinstance(valor, list):
+        valor = [valor]
+    # Un NDJSON puede traer números u objetos: se validan como texto
+    return [str(v).strip() for v in valor if v]
+
+
+async def filas_ndjson(lineas: AsyncIterator[str]) -> AsyncIterator[dict]:
+    """Una fila por línea: {"to": ..., "cc": [...], "bcc": [...], "body_html": {...}}"""
+    async for linea in lineas:
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError as e:
+            yield {"_error": f"JSON inválido: {e}"}
+            continue
+        if not isinstance(fila, dict):
+            yield {"_error": "Cada línea debe ser un objeto JSON"}
+            continue
+        yield fila
+
+
+def _fila_csv(cabecera: List[str], valores: List[str]) -> dict:
+    registro = dict(zip(cabecera, valores))
+    return {
+        "to": registro.get("to", "").strip(),
+        "cc": registro.get("cc"),
+        "bcc": registro.get("bcc"),
+        "subject": registro.get("subject") or None,
+        "body_html": {
+            k: v for k, v in registro.items() if k not in COLUMNAS_RESERVADAS
+        },
+    }
+
+
+async def filas_csv(lineas: AsyncIterator[str]) -> AsyncIterator[dict]:
+    """
+    La primera línea es la cabecera. Las columnas to, cc, bcc y subject son
+    reservadas (cc y bcc separados por ';'); el resto son variables.
+    """
+    # Un solo lector para todo el flujo, alimentado desde una cola: un campo
+    # entre comillas puede ocupar varias líneas. Solo se le pide una fila
+    # cuando las líneas encoladas cierran todas las comillas (None = fin).
+    pendientes: deque = deque()
+    lector = csv.reader(iter(pendientes.popleft, None))
+    cabecera: Optional[List[str]] = None
+    comillas_abiertas = False
+    async for linea in lineas:
+        if not comillas_abiertas and not linea.strip():
+            continue
+        pendientes.append(linea + "\n")
+        if linea.count('"') % 2:
+            comillas_abiertas = not comillas_abiertas
+        if comillas_abiertas:
+            continue
+        valores = next(lector)
+        if cabecera is None:
+            cabecera = [c.strip() for c in valores]
+            continue
+        yield _fila_csv(cabecera, valores)
+
+    if pendientes and cabecera is not None:
+        # Comillas sin cerrar al final del flujo: se entrega lo que haya
+        pendientes.append(None)
+        for valores in lector:
+            yield _fila_csv(cabecera, valores)
+
+
+class CampaignService:
+    def __init__(self, db: Session, identifying_name: str, subject: str):
+        self.db = db
+        self.identifying_name = identifying_name
+        self.subject = subject
+        self.plantilla = None
+
+    async def cargar_contexto(self) -> None:
+        """Plantilla y credenciales: se resuelven una sola vez para toda la campaña."""
+        if settings.db_async:
+            contexto = await obtener_contexto_envio_async(self.identifying_name)
+        else:
+            contexto = obtener_contexto_envio(self.db, self.identifying_name)
+        plantilla = contexto.plantilla
+        creds = contexto.credencial
+
+        self.credencial_id = creds.id
+        self.host = creds.host
+        self.port = creds.port
+        self.user = creds.user
+        self.password = creds.password
+        self.plantilla = plantilla
+        self.content_html = plantilla.content_html
+        self.compilada = obtener_compilada(plantilla)
+
+    async def _enviar_fila(self, numero: int, fila: dict) -> dict:
+        # Cualquier error de una fila se devuelve en su resultado: no corta el flujo
+        to = fila.get("to")
+        destinatario = str(to).strip() if to is not None else ""
+        asunto = fila.get("subject") or self.subject
+        if not isinstance(asunto, str):
+            asunto = str(asunto)
+        resultado = {"linea": numero, "to": destinatario}
+        if "_error" in fila:
+            return {**resultado, "estado": "ERROR", "detalle": fila["_error"]}
+
+        if not validar_email(destinatario):
+            detalle = f"Correo inválido en TO: {destinatario}"
+            self._registrar(destinatario, [], [], asunto, None, "ERROR", detalle)
+            return {**resultado, "estado": "ERROR", "detalle": detalle}
+        cc = [c for c in _lista(fila.get("cc")) if validar_email(c)]
+        bcc = [b for b in _lista(fila.get("bcc")) if validar_email(b)]
+
+        variables = fila.get("body_html") or {}
+        try:
+            contenido_html = self.content_html
+            if isinstance(variables, dict):
+                contenido_html = self.compilada.render(variables)
+            msg = construir_mensaje(self.user, destinatario, cc, asunto, contenido_html, [])
+            await enviar_mensaje(
+                self.credencial_id, self.host, self.port, self.user, self.password,
+                msg, from_addr=self.user, to_addrs=[destinatario] + cc + bcc,
+            )
+        except Exception as e:
+            self._registrar(destinatario, cc, bcc, asunto, str(variables), "ERROR", str(e))
+            return {**resultado, "estado": "ERROR", "detalle": str(e)}
+
+        self._registrar(
+            destinatario, cc, bcc, asunto, contenido_html, "ENVIADO", "Correo enviado correctamente"
+        )
+        return {**resultado, "estado": "ENVIADO"}
+
+    def _registrar(self, destinatario, cc, bcc, asunto, contenido, estado, detalle) -> None:
+        log_writer.encolar(
+            destinatario=destinatario,
+            cc=";".join(cc) if cc else None,
+            bcc=";".join(bcc) if bcc else None,
+            num_adjuntos=0,
+            asunto=asunto,
+            contenido=contenido,
+            estado=estado,
+            fecha_envio=datetime.utcnow(),
+            identificador=self.identifying_name,
+            detalle=detalle,
+        )
+
+    async def enviar(self, filas: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+        """
+        Envía cada fila y produce una línea NDJSON con su resultado, en el
+        mismo orden de entrada y con a lo sumo ``campana_concurrencia``
+        envíos en vuelo.
+        """
+        en_vuelo: deque = deque()
+        resumen: Dict[str, int] = {"ENVIADO": 0, "ERROR": 0}
+        numero = 0
+        try:
+            async for fila in filas:
+                numero += 1
+                en_vuelo.append(asyncio.create_task(self._enviar_fila(numero, fila)))
+                if len(en_vuelo) >= settings.campana_concurrencia:
+                    resultado = await en_vuelo.popleft()
+                    resumen[resultado["estado"]] += 1
+                    yield (json.dumps(resultado, ensure_ascii=False) + "\n").encode("utf-8")
+            while en_vuelo:
+                resultado = await en_vuelo.popleft()
+                resumen[resultado["estado"]] += 1
+                yield (json.dumps(resultado, ensure_ascii=False) + "\n").encode("utf-8")
+            yield (json.dumps({"resumen": {"total": numero, **resumen}}) + "\n").encode("utf-8")
+        finally:
+            # Si el cliente corta la conexión se cancelan los envíos pendientes
+            for tarea in en_vuelo:
+                tarea.cancel()
+
+
+def detectar_formato(formato: Optional[str], content_type: Optional[str]) -> str:
+    if formato:
+        formato = formato.lower()
+    elif content_type and "csv" in content_type.lower():
+        formato = "csv"
+    else:
+        formato = "ndjson"
+    if formato not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="El formato debe ser 'ndjson' o 'csv'")
+    return formato
@@ -0,0 +1,212 @@
+"""
+Caché en proceso del par (plantilla, credencial) que usa cada envío.
+
+Los servicios de envío consultaban ``Plantillas`` por ``identifying_name`` y
+luego ``CredencialesCorreo`` por id en cada petición. Ambos datos solo
+cambian a través de los endpoints CRUD, que invalidan esta caché tras
+confirmar el cambio; el TTL acota además el tiempo que otra réplica puede
+servir datos desactualizados.
+
+Se guardan copias planas (no objetos ORM) para que puedan compartirse entre
+sesiones e hilos sin quedar ligadas a una sesión cerrada.
+
+``obtener_contexto_envio_async`` carga los fallos con una sesión asíncrona
+(asyncpg), sin bloquear el event loop mientras espera a la base de datos.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..config.config import async_sessions
+from ..config.settings import settings
+from ..models.credenciales_model import CredencialesCorreo
+from ..models.plantilla_model import Plantillas
+
+
+@dataclass(frozen=True)
+class PlantillaInfo:
+    """Copia de los campos de ``Plantillas`` necesarios para enviar."""
+    id: int
+    identifying_name: str
+    content_html: str
+    credenciales_id: int
+    updated_at: Optional[datetime]
+
+
+@dataclass(frozen=True)
+class CredencialInfo:
+    """Copia de los campos de ``CredencialesCorreo`` necesarios para enviar."""
+    id: int
+    host: str
+    port: str
+    user: str
+    password: str
+
+
+@dataclass(frozen=True)
+class ContextoEnvio:
+    plantilla: PlantillaInfo
+    credencial: CredencialInfo
+
+
+class CacheContextosEnvio:
+    """Caché LRU con TTL de contextos de envío, indexada por identifying_name."""
+
+    def __init__(self, maximo: int = 512, ttl: float = 300.0):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._datos: "OrderedDict[str, Tuple[float, ContextoEnvio]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Se incrementa en cada invalidación para descartar cargas en curso
+        self._generacion = 0
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, db: Session, identifying_name: str) -> ContextoEnvio:
+        """Devuelve el contexto de la plantilla, consultando la BD solo si no está en caché."""
+        contexto, generacion = self._buscar(identifying_name)
+        if contexto is None:
+            contexto = _cargar(db, identifying_name)
+            self._guardar(identifying_name, contexto, generacion)
+        return contexto
+
+    async def obtener_async(self, identifying_name: str) -> ContextoEnvio:
+        """Igual que ``obtener``, pero los fallos se cargan con una sesión asíncrona."""
+        contexto, generacion = self._buscar(identifying_name)
+        if contexto is None:
+            async with async_sessions[0]() as db:
+                contexto = await _cargar_async(db, identifying_name)
+            self._guardar(identifying_name, contexto, generacion)
+        return contexto
+
+    def _buscar(self, identifying_name: str) -> Tuple[Optional[ContextoEnvio], int]:
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(identifying_name)
+            if entrada is not None and entrada[0] > ahora:
+                self._datos.move_to_end(identifying_name)
+                self.aciertos += 1
+                return entrada[1], self._generacion
+            self.fallos += 1
+            return None, self._generacion
+
+    def _guardar(self, identifying_name: str, contexto: ContextoEnvio, generacion: int) -> None:
+        with self._lock:
+            # Una invalidación durante la carga puede haber dejado el dato obsoleto
+            if generacion == self._generacion and self.ttl > 0:
+                self._datos[identifying_name] = (time.monotonic() + self.ttl, contexto)
+                self._datos.move_to_end(identifying_name)
+                while len(self._datos) > self.maximo:
+                    self._datos.popitem(last=False)
+
+    def invalidar(self) -> None:
+        """Descarta todos los contextos (las escrituras CRUD son poco frecuentes)."""
+        with self._lock:
+            self._generacion += 1
+            self._datos.clear()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "entradas": len(self._datos),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+            }
+
+
+def _cargar(db: Session, identifying_name: str) -> ContextoEnvio:
+    # Buscar plantilla
+    plantilla = (
+        db.query(Plantillas)
+        .filter(Plantillas.identifying_name == identifying_name)
+        .first()
+    )
+    if not plantilla:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No se encontró la plantilla '{identifying_name}'",
+        )
+
+    # Buscar credenciales asociadas
+    creds = (
+        db.query(CredencialesCorreo)
+        .filter(CredencialesCorreo.id == plantilla.credenciales_id)
+        .first()
+    )
+    if not creds:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No se encontraron credenciales con ID '{plantilla.credenciales_id}'",
+        )
+
+    return _contexto(plantilla, creds)
+
+
+async def _cargar_async(db, identifying_name: str) -> ContextoEnvio:
+    # Plantilla y credenciales en una sola consulta
+    fila = (
+        await db.execute(
+            select(Plantillas, CredencialesCorreo)
+            .outerjoin(CredencialesCorreo, CredencialesCorreo.id == Plantillas.credenciales_id)
+            .where(Plantillas.identifying_name == identifying_name)
+            .limit(1)
+        )
+    ).first()
+    if not fila:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No se encontró la plantilla '{identifying_name}'",
+        )
+
+    plantilla, creds = fila
+    if not creds:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No se encontraron credenciales con ID '{plantilla.credenciales_id}'",
+        )
+    return _contexto(plantilla, creds)
+
+
+def _contexto(plantilla: Plantillas, creds: CredencialesCorreo) -> ContextoEnvio:
+    return ContextoEnvio(
+        plantilla=PlantillaInfo(
+            id=plantilla.id,
+            identifying_name=plantilla.identifying_name,
+            content_html=plantilla.content_html,
+            credenciales_id=plantilla.credenciales_id,
+            updated_at=plantilla.updated_at,
+        ),
+        credencial=CredencialInfo(
+            id=creds.id,
+            host=creds.client_id,
+            port=creds.client_secret,
+            user=creds.username,
+            password=creds.tenant_id,
+        ),
+    )
+
+
+# Instancia global de la caché
+contextos_envio = CacheContextosEnvio(
+    maximo=settings.contexto_cache_max,
+    ttl=settings.contexto_cache_ttl,
+)
+
+
+def obtener_contexto_envio(db: Session, identifying_name: str) -> ContextoEnvio:
+    return contextos_envio.obtener(db, identifying_name)
+
+
+async def obtener_contexto_envio_async(identifying_name: str) -> ContextoEnvio:
+    return await contextos_envio.obtener_async(identifying_name)
+
+
+def invalidar_contextos_envio() -> None:
+    contextos_envio.invalidar()
@@ -5,6 +5,8 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 
 from src.models.credenciales_model import CredencialesCorreo
+from src.services.contexto_envio_cache import invalidar_contextos_envio
+from src.utils.paginacion import pagina_keyset, pagina_offset
 from src.schemas.crud_credentials_schema import CredentialsCreate, CredentialsUpdate
 
 
@@ -22,11 +24,23 @@ def get_credential_by_id(db: Session, id: int):
 
 
 
-def list_credential(db: Session, skip: int, limit: int, activo: bool | None = None):
-    return db.query(CredencialesCorreo).filter(CredencialesCorreo.activo == activo).offset(skip).limit(limit).all()
 def count_credential(db: Session, activo: bool | None = None):
     return db.query(CredencialesCorreo).filter(CredencialesCorreo.activo == activo).count()
 
+def page_credential(db: Session, skip: int, limit: int, activo: bool | None = None):
+    """Página por offset y total en la misma consulta: ``(items, total)``."""
+    query = db.query(CredencialesCorreo).filter(CredencialesCorreo.activo == activo)
+    items, total = pagina_offset(query, CredencialesCorreo.id, skip, limit)
+    if total is None:
+        # Página vacía (más allá del final): el total se cuenta aparte
+        total = count_credential(db, activo=activo)
+    return items, total
+
+def keyset_credential(db: Session, cursor: str | None, limit: int, activo: bool | None = None):
+    """Página por cursor sobre ``id``: ``(items, next_cursor)``."""
+    query = db.query(CredencialesCorreo).filter(CredencialesCorreo.activo == activo)
+    return pagina_keyset(query, CredencialesCorreo.id, cursor, limit)
+
 
 def create_credential(db: Session, data: CredentialsCreate):
     try:
@@ -56,6 +70,7 @@ def update_credential(db: Session, id: int, data: CredentialsUpdate):
             setattr(obj, field, value)
             obj.updated_at = datetime.utcnow()
         db.commit()
+        invalidar_contextos_envio()
         db.refresh(obj)
         return obj
     except SQLAlchemyError as e:
@@ -76,6 +91,7 @@ def delete_credential(db: Session, id: int):
         obj.deleted_at = datetime.utcnow()
         obj.activo = False  # 2 representa inactivo
         db.commit()
+        invalidar_contextos_envio()
         db.refresh(obj)
         return obj
     except SQLAlchemyError as e:
@@ -98,6 +114,7 @@ def reactivate(db: Session, id: int):
         
         obj.activo = True 
         db.commit()
+        invalidar_contextos_envio()
         db.refresh(obj)
         return obj
     except SQLAlchemyError as e:
@@ -5,6 +5,8 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 
 from src.models.plantilla_model import Plantillas
+from src.services.contexto_envio_cache import invalidar_contextos_envio
+from src.utils.paginacion import pagina_keyset, pagina_offset
 from src.schemas.crud_templates_schema import CreateNotification, UpdateNotification
 
 
@@ -21,11 +23,23 @@ def get_template_by_id(id: int, db: Session):
             detail=f"Error al consultar plantilla de notificaciones por ID: {str(e)}",
         )
 
-def list_template(db: Session, skip: int, limit: int, activo: bool | None = None):
-    return db.query(Plantillas).filter(Plantillas.activo == activo).offset(skip).limit(limit).all()
 def count_template(db: Session, activo: bool | None = None):
     return db.query(Plantillas).filter(Plantillas.activo == activo).count()
 
+def page_template(db: Session, skip: int, limit: int, activo: bool | None = None):
+    """Página por offset y total en la misma consulta: ``(items, total)``."""
+    query = db.query(Plantillas).filter(Plantillas.activo == activo)
+    items, total = pagina_offset(query, Plantillas.id, skip, limit)
+    if total is None:
+        # Página vacía (más allá del final): el total se cuenta aparte
+        total = count_template(db, activo=activo)
+    return items, total
+
+def keyset_template(db: Session, cursor: str | None, limit: int, activo: bool | None = None):
+    """Página por cursor sobre ``id``: ``(items, next_cursor)``."""
+    query = db.query(Plantillas).filter(Plantillas.activo == activo)
+    return pagina_keyset(query, Plantillas.id, cursor, limit)
+
 def create_notification(db: Session, notification: CreateNotification):
     try:
         datacreate = db.query(Plantillas).filter(
@@ -53,6 +67,7 @@ def create_notification(db: Session, notification: CreateNotification):
         db_notification.created_at = datetime.utcnow()
         db.add(db_notification)
         db.commit()
+        invalidar_contextos_envio()
         db.refresh(db_notification)
         return db_notification
     except SQLAlchemyError as e:
@@ -105,6 +120,7 @@ def update_notification(id: int, data: UpdateNotification, db: Session):
             setattr(notification, campo, valor)
             notification.updated_at = datetime.utcnow()
         db.commit()
+        invalidar_contextos_envio()
         db.refresh(notification)
         return notification
     except SQLAlchemyError as e:
@@ -128,6 +144,7 @@ def delete_notification(id_notification: int, db: Session):
         notification.deleted_at = datetime.utcnow()
         notification.activo = False
         db.commit()
+        invalidar_contextos_envio()
         db.refresh(notification)
         return notification
     except SQLAlchemyError as e:
@@ -150,6 +167,7 @@ def reactivate(db: Session, id: int):
         
         obj.activo = True
         db.commit()
+        invalidar_contextos_envio()
         db.refresh(obj)
         return obj
     except SQLAlchemyError as e:
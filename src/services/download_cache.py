@@ -0,0 +1,235 @@
+"""
+Caché local en disco de las descargas de Blob Storage (opcional).
+
+Los blobs que se descargan una y otra vez (logos, PDF legales que van
+adjuntos en muchos correos) se guardan en ``<storage_cache_dir>/<pid>`` y
+se sirven desde el archivo local con ``FileResponse``, que usa ``sendfile``
+cuando el servidor lo permite y resuelve por sí mismo las cabeceras Range.
+
+- Nunca se sirve una copia obsoleta: cada acierto se revalida contra Azure
+  con ``If-None-Match``, así que sigue costando una petición condicional
+  (304 sin cuerpo si está vigente); lo que se ahorra es la transferencia
+  del contenido. La revalidación no toma el lock del blob; solo se toma
+  para llenar o reemplazar la copia, de modo que haya una única descarga
+  por blob.
+- Una copia reemplazada o expulsada no se borra del disco mientras alguna
+  respuesta la esté sirviendo: quien recibe una entrada llama a
+  ``liberar`` al terminar.
+- El total en disco no pasa de ``storage_cache_max_bytes``; al superarlo se
+  expulsan los archivos usados hace más tiempo (LRU).
+- Los blobs mayores que ``storage_cache_max_archivo`` no se guardan y se
+  transmiten directamente desde Azure.
+
+Los contadores (aciertos, fallos, expulsiones, bytes) se consultan en
+``GET /v1/files/cache/stats`` para dimensionar la caché.
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+import aiofiles
+
+from ..config.settings import settings
+from .storage_backend import DescargaBlob
+from .storage_service import StorageService
+
+
+@dataclass(frozen=True)
+class EntradaCache:
+    """Copia local de un blob."""
+    ruta: Path
+    etag: str
+    tamano: int
+    content_type: str
+    last_modified: Optional[datetime]
+
+
+class CacheDescargas:
+    """Caché LRU de blobs en disco con un presupuesto de bytes."""
+
+    def __init__(self, raiz: str, max_bytes: int, max_archivo: int):
+        # Un directorio por proceso: el índice vive en memoria
+        self.raiz = Path(raiz) / str(os.getpid())
+        self.max_bytes = max_bytes
+        self.max_archivo = min(max_archivo, max_bytes)
+        self._entradas: "OrderedDict[Tuple[str, str], EntradaCache]" = OrderedDict()
+        # Por blob: [lock, peticiones que lo tienen o lo esperan]
+        self._locks: Dict[Tuple[str, str], list] = {}
+        # Respuestas que sirven cada archivo y archivos que se borran al liberarlos
+        self._lectores: Dict[Path, int] = {}
+        self._por_borrar: Set[Path] = set()
+        self._bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def contiene(self, container: str, file_name: str) -> bool:
+        return (container, file_name) in self._entradas
+
+    def estadisticas(self) -> dict:
+        total = self.aciertos + self.fallos
+        return {
+            "habilitada": settings.storage_cache_habilitada,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round(self.aciertos / total, 4) if total else 0.0,
+            "expulsiones": self.expulsiones,
+            "archivos": len(self._entradas),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    async def descargar(
+        self, file_name: str, container: str, if_none_match: Optional[str] = None
+    ) -> Tuple[Optional[EntradaCache], Optional[DescargaBlob]]:
+        """
+        Devuelve ``(entrada, None)`` si el blob se puede servir desde disco o
+        ``(None, descarga)`` si hay que transmitirlo desde Azure (blob demasiado
+        grande, o 304 para el ETag ``if_none_match`` del cliente cuando no está
+        en caché). Una entrada devuelta se debe ``liberar`` al terminar de
+        servirla.
+
+        Raises:
+            StorageError: Si el archivo no existe o falla la descarga
+        """
+        clave = (container, file_name)
+        while True:
+            entrada = self._entradas.get(clave)
+            descarga = None
+            if entrada:
+                # Revalidar siempre (una petición condicional), sin lock. La copia
+                # local solo se usa si Azure responde 304
+                descarga = await StorageService.download_file(file_name, container, if_none_match=entrada.etag)
+                if descarga.no_modificado:
+                    if self._entradas.get(clave) is entrada:
+                        self.aciertos += 1
+                        self._entradas.move_to_end(clave)
+                        return self._tomar(entrada), None
+                    # Reemplazada o expulsada mientras se revalidaba
+                    continue
+
+            # El lock solo cubre el llenado: un solo fallo por blob a la vez
+            async with self._bloqueo(clave):
+                if self._entradas.get(clave) is not entrada:
+                    # Otra petición la llenó o la reemplazó mientras se esperaba:
+                    # la respuesta 200 de la revalidación ya no sirve
+                    if descarga is not None:
+                        await descarga.cerrar()
+                    continue
+                if entrada is None:
+                    descarga = await StorageService.download_file(file_name, container, if_none_match=if_none_match)
+                else:
+                    self._quitar(clave)
+                if not descarga.no_modificado:
+                    self.fallos += 1
+                if descarga.no_modificado or descarga.size > self.max_archivo or not descarga.etag:
+                    return None, descarga
+                return self._tomar(await self._guardar(clave, descarga)), None
+
+    def _tomar(self, entrada: EntradaCache) -> EntradaCache:
+        self._lectores[entrada.ruta] = self._lectores.get(entrada.ruta, 0) + 1
+        return entrada
+
+    def liberar(self, entrada: EntradaCache) -> None:
+        """La respuesta terminó de servir la entrada; borra el archivo si ya se quitó."""
+        restantes = self._lectores.pop(entrada.ruta, 1) - 1
+        if restantes:
+            self._lectores[entrada.ruta] = restantes
+        elif entrada.ruta in self._por_borrar:
+            self._por_borrar.discard(entrada.ruta)
+            self._borrar(entrada.ruta)
+
+    @asynccontextmanager
+    async def _bloqueo(self, clave: Tuple[str, str]) -> AsyncIterator[None]:
+        """
+        Lock por blob. Cuenta quién lo tiene y quién espera, y solo se descarta
+        cuando no queda nadie: si se quitara con esperas pendientes, la siguiente
+        petición crearía otro lock y el mismo blob se llenaría dos veces.
+        """
+        registro = self._locks.setdefault(clave, [asyncio.Lock(), 0])
+        registro[1] += 1
+        try:
+            async with registro[0]:
+                yield
+        finally:
+            registro[1] -= 1
+            if not registro[1]:
+                del self._locks[clave]
+
+    async def _guardar(self, clave: Tuple[str, str], descarga: DescargaBlob) -> EntradaCache:
+        """Escribe el blob en un temporal y lo publica con un rename atómico."""
+        self.raiz.mkdir(parents=True, exist_ok=True)
+        # El ETag forma parte del nombre: una versión nueva no pisa el archivo
+        # que otra petición puede estar sirviendo todavía
+        destino = self.raiz / hashlib.sha256("/".join((*clave, descarga.etag)).encode()).hexdigest()
+        fd, tmp = tempfile.mkstemp(dir=self.raiz, prefix=".tmp-")
+        os.close(fd)
+        try:
+            async with aiofiles.open(tmp, "wb") as f:
+                async for trozo in descarga.stream.chunks():
+                    await f.write(trozo)
+            os.replace(tmp, destino)
+            # Mismo ETag que una copia expulsada que aún se servía: ya no se borra
+            self._por_borrar.discard(destino)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        entrada = EntradaCache(
+            ruta=destino,
+            etag=descarga.etag,
+            tamano=descarga.size,
+            content_type=descarga.content_type,
+            last_modified=descarga.last_modified,
+        )
+        if clave in self._entradas:
+            self._quitar(clave)
+        self._entradas[clave] = entrada
+        self._bytes += entrada.tamano
+        self._expulsar()
+        return entrada
+
+    def _quitar(self, clave: Tuple[str, str]) -> None:
+        entrada = self._entradas.pop(clave)
+        self._bytes -= entrada.tamano
+        if self._lectores.get(entrada.ruta):
+            # Un FileResponse puede no haber abierto aún el archivo
+            self._por_borrar.add(entrada.ruta)
+        else:
+            self._borrar(entrada.ruta)
+
+    @staticmethod
+    def _borrar(ruta: Path) -> None:
+        try:
+            ruta.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _expulsar(self) -> None:
+        # La entrada recién guardada es la más reciente: se expulsa por el otro extremo
+        while self._bytes > self.max_bytes and len(self._entradas) > 1:
+            self._quitar(next(iter(self._entradas)))
+            self.expulsiones += 1
+
+    def vaciar(self) -> None:
+        """Borra todas las copias locales (usado al apagar)."""
+        self._entradas.clear()
+        self._lectores.clear()
+        self._por_borrar.clear()
+        self._bytes = 0
+        shutil.rmtree(self.raiz, ignore_errors=True)
+
+
+cache_descargas = CacheDescargas(
+    settings.storage_cache_dir,
+    settings.storage_cache_max_bytes,
+    settings.storage_cache_max_archivo,
+)
@@ -0,0 +1,356 @@
+"""
+Backend de almacenamiento en el sistema de archivos local.
+
+Cada contenedor es un directorio bajo ``STORAGE_LOCAL_DIR`` y cada blob un
+archivo (las "/" del nombre crean subdirectorios). El tipo de contenido se
+guarda aparte en ``.meta/<contenedor>/<nombre>.json`` y el ETag se deriva
+de la fecha de modificación y el tamaño. La E/S de archivos es asíncrona
+(aiofiles): sirve para desarrollo y para medir los endpoints de archivos
+sin una cuenta de Azure (``benchmarks/bench_storage_backend.py``).
+"""
+import asyncio
+import json
+import mimetypes
+import os
+import uuid
+from itertools import islice
+from datetime import datetime, timezone
+from pathlib import Path, PurePosixPath
+from typing import AsyncIterator, BinaryIO, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+import aiofiles.os
+
+from ..config.settings import settings
+from ..models.schemas import BulkDeleteItem, BulkDeleteResponse, FileInfo, FileUploadResponse, SuccessResponse
+from ..utils.exceptions import RangoNoSatisfacibleError, StorageError
+from .storage_backend import MOTIVOS_BORRADO, DescargaBlob, StorageBackend
+
+_BLOQUE = 1024 * 1024
+_META = ".meta"
+_TMP = ".tmp"
+
+
+class _LectorLocal:
+    """Lee un rango de un archivo local por trozos."""
+
+    def __init__(self, ruta: Path, inicio: int, size: int):
+        self.ruta = ruta
+        self.inicio = inicio
+        self.size = size
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self.ruta, "rb") as f:
+            await f.seek(self.inicio)
+            restante = self.size
+            while restante > 0:
+                trozo = await f.read(min(_BLOQUE, restante))
+                if not trozo:
+                    break
+                restante -= len(trozo)
+                yield trozo
+
+
+def _etag(st: os.stat_result) -> str:
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def _fecha(st: os.stat_result) -> datetime:
+    return datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)
+
+
+async def _trozos_flujo(stream: BinaryIO) -> AsyncIterator[bytes]:
+    """Lee un archivo abierto por bloques sin bloquear el event loop."""
+    while True:
+        trozo = await asyncio.to_thread(stream.read, _BLOQUE)
+        if not trozo:
+            return
+        yield trozo
+
+
+async def _trozos_bytes(contenido: bytes) -> AsyncIterator[bytes]:
+    yield contenido
+
+
+class LocalStorageBackend(StorageBackend):
+    """Almacenamiento de archivos en un directorio local."""
+
+    def __init__(self, raiz: str, url_base: str):
+        self.raiz = Path(raiz)
+        self.url_base = url_base.rstrip("/")
+
+    # ------------------------------------------------------------------
+    # Rutas
+    # ------------------------------------------------------------------
+    def _contenedor(self, container: Optional[str]) -> Tuple[str, Path]:
+        nombre = container or settings.azure_storage_container_name
+        if not nombre or nombre.startswith(".") or "/" in nombre or "\\" in nombre:
+            raise StorageError(f"Nombre de contenedor no válido: \'{nombre}\'")
+        return nombre, self.raiz / nombre
+
+    def _ruta(self, container: Optional[str], file_name: str) -> Tuple[str, Path]:
+        """Ruta del blob, rechazando nombres que salgan del contenedor."""
+        nombre, directorio = self._contenedor(container)
+        partes = PurePosixPath(file_name).parts
+        if (
+            not partes
+            or "\\" in file_name
+            or PurePosixPath(file_name).is_absolute()
+            or any(p in (".", "..") for p in partes)
+        ):
+            raise StorageError(f"Nombre de archivo no válido: \'{file_name}\'")
+        return nombre, directorio.joinpath(*partes)
+
+    def _ruta_meta(self, container_name: str, file_name: str) -> Path:
+        return self.raiz / _META / container_name / f"{file_name}.json"
+
+    def _url(self, container_name: str, file_name: str) -> str:
+        return f"{self.url_base}/{container_name}/{quote(file_name, safe='~/')}"
+
+    def _content_type(self, container_name: str, file_name: str) -> str:
+        try:
+            with open(self._ruta_meta(container_name, file_name), encoding="utf-8") as f:
+                return json.load(f)["content_type"]
+        except (OSError, ValueError, KeyError):
+            return mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+
+    # ------------------------------------------------------------------
+    # Subida
+    # ------------------------------------------------------------------
+    async def _guardar(
+        self, container: Optional[str], file_name: str, content_type: str, trozos: AsyncIterator[bytes]
+    ) -> FileUploadResponse:
+        """Escribe en un temporal y lo publica con un rename atómico."""
+        unique_name = f"{uuid.uuid4().hex}_{file_name}"
+        container_name, destino = self._ruta(container, unique_name)
+        tmp = self.raiz / _TMP / uuid.uuid4().hex
+        try:
+            await aiofiles.os.makedirs(tmp.parent, exist_ok=True)
+            await aiofiles.os.makedirs(destino.parent, exist_ok=True)
+            tamano = 0
+            async with aiofiles.open(tmp, "wb") as f:
+                async for trozo in trozos:
+                    await f.write(trozo)
+                    tamano += len(trozo)
+
+            meta = self._ruta_meta(container_name, unique_name)
+            await aiofiles.os.makedirs(meta.parent, exist_ok=True)
+            async with aiofiles.open(meta, "w", encoding="utf-8") as f:
+                await f.write(json.dumps({"content_type": content_type}))
+            await aiofiles.os.replace(tmp, destino)
+        except Exception as e:
+            try:
+                await aiofiles.os.remove(tmp)
+            except FileNotFoundError:
+                pass
+            raise StorageError(f"Error al cargar el archivo: {str(e)}")
+
+        return FileUploadResponse(
+            file_name=unique_name,
+            file_size=tamano,
+            content_type=content_type,
+            url=self._url(container_name, unique_name),
+        )
+
+    async def upload_file(self, file_content: BinaryIO, file_name: str, content_type: str, container: str = None) -> FileUploadResponse:
+        if isinstance(file_content, (bytes, bytearray, memoryview)):
+            trozos = _trozos_bytes(bytes(file_content))
+        else:
+            trozos = _trozos_flujo(file_content)
+        return await self._guardar(container, file_name, content_type, trozos)
+
+    async def upload_stream(self, stream: BinaryIO, file_name: str, content_type: str, container: str = None) -> FileUploadResponse:
+        return await self._guardar(container, file_name, content_type, _trozos_flujo(stream))
+
+    # ------------------------------------------------------------------
+    # Descarga
+    # ------------------------------------------------------------------
+    async def download_file(
+        self,
+        file_name: str,
+        container: str = None,
+        inicio: Optional[int] = None,
+        fin: Optional[int] = None,
+        if_none_match: Optional[str] = None,
+    ) -> DescargaBlob:
+        container_name, ruta = self._ruta(container, file_name)
+        try:
+            st = await aiofiles.os.stat(ruta)
+        except (FileNotFoundError, NotADirectoryError):
+            raise StorageError(f"El archivo \'{file_name}\' no existe")
+        if not os.path.isfile(ruta):
+            raise StorageError(f"El archivo \'{file_name}\' no existe")
+
+        etag = _etag(st)
+        content_type = await asyncio.to_thread(self._content_type, container_name, file_name)
+        if if_none_match and if_none_match in ("*", etag):
+            return DescargaBlob(
+                stream=None, content_type=content_type, size=0, total=0,
+                etag=etag, last_modified=_fecha(st), no_modificado=True,
+            )
+
+        total = st.st_size
+        if inicio is None:
+            return DescargaBlob(
+                stream=_LectorLocal(ruta, 0, total), content_type=content_type, size=total,
+                total=total, etag=etag, last_modified=_fecha(st),
+            )
+
+        if inicio >= total:
+            raise RangoNoSatisfacibleError(
+                f"El rango solicitado no es válido para \'{file_name}\'", total
+            )
+        ultimo = total - 1 if fin is None else min(fin, total - 1)
+        size = ultimo - inicio + 1
+        return DescargaBlob(
+            stream=_LectorLocal(ruta, inicio, size), content_type=content_type, size=size,
+            total=total, etag=etag, last_modified=_fecha(st), inicio=inicio, fin=ultimo,
+        )
+
+    # ------------------------------------------------------------------
+    # Listado
+    # ------------------------------------------------------------------
+    def _recorrer(self, directorio: Path, prefix: Optional[str], despues: Optional[str] = None) -> Iterator[str]:
+        """
+        Nombres (con "/") de los archivos del contenedor en orden alfabético,
+        generados sin recorrer el contenedor entero: se omiten los
+        subdirectorios que quedan antes de ``despues`` o fuera del prefijo.
+        """
+        prefix = prefix or ""
+        # Empezar el recorrido en el subdirectorio más profundo del prefijo
+        base = directorio.joinpath(*PurePosixPath(prefix).parts[:-1]) if "/" in prefix else directorio
+        if prefix.endswith("/"):
+            base = directorio.joinpath(*PurePosixPath(prefix).parts)
+
+        def nivel(actual: Path) -> Iterator[str]:
+            try:
+                with os.scandir(actual) as it:
+                    entradas = [(e.name, e.is_dir(follow_symlinks=False)) for e in it]
+            except (FileNotFoundError, NotADirectoryError):
+                return  # el prefijo no existe o se borró durante el listado
+            relativo = actual.relative_to(directorio).as_posix()
+            relativo = "" if relativo == "." else relativo + "/"
+            # Con "/" al final de los directorios, el orden de las claves es el
+            # de los nombres completos ("a.txt" < "a/b" < "ab")
+            claves = sorted((relativo + nombre + ("/" if es_dir else ""), nombre, es_dir) for nombre, es_dir in entradas)
+            for clave, nombre, es_dir in claves:
+                if es_dir:
+                    if not (clave.startswith(prefix) or prefix.startswith(clave)):
+                        continue
+                    if despues and clave < despues and not despues.startswith(clave):
+                        continue  # todo el subdirectorio va antes del cursor
+                    yield from nivel(actual / nombre)
+                elif clave.startswith(prefix) and not (despues and clave <= despues):
+                    yield clave
+
+        return nivel(base)
+
+    def _nombres(self, directorio: Path, prefix: Optional[str]) -> List[str]:
+        """Nombres (con "/") de los archivos del contenedor, ordenados."""
+        return list(self._recorrer(directorio, prefix))
+
+    def _file_info(self, container_name: str, directorio: Path, nombre: str) -> Optional[FileInfo]:
+        try:
+            st = (directorio / nombre).stat()
+        except FileNotFoundError:
+            return None  # eliminado durante el listado
+        return FileInfo(
+            name=nombre,
+            size=st.st_size,
+            content_type=self._content_type(container_name, nombre),
+            url=self._url(container_name, nombre),
+            created_on=_fecha(st).isoformat(),
+        )
+
+    async def list_files_page(
+        self,
+        prefix: Optional[str] = None,
+        container: str = None,
+        page_size: int = 1000,
+        continuation_token: Optional[str] = None,
+    ) -> Tuple[List[FileInfo], Optional[str]]:
+        """
+        Página del listado en orden alfabético; el token es el último nombre
+        devuelto (como el marcador de Azure).
+        """
+        container_name, directorio = self._contenedor(container)
+
+        def pagina() -> Tuple[List[FileInfo], Optional[str]]:
+            # Un nombre de más para saber si hay otra página
+            nombres = list(islice(self._recorrer(directorio, prefix, continuation_token), page_size + 1))
+            seleccion = nombres[:page_size]
+            archivos = [self._file_info(container_name, directorio, n) for n in seleccion]
+            siguiente = seleccion[-1] if len(nombres) > page_size else None
+            return [a for a in archivos if a is not None], siguiente
+
+        try:
+            return await asyncio.to_thread(pagina)
+        except Exception as e:
+            raise StorageError(f"Error al listar archivos: {str(e)}")
+
+    # ------------------------------------------------------------------
+    # Borrado
+    # ------------------------------------------------------------------
+    async def _borrar(self, container_name: str, ruta: Path, nombre: str, older_than: Optional[datetime]) -> BulkDeleteItem:
+        try:
+            if older_than and _fecha(await aiofiles.os.stat(ruta)) >= older_than:
+                return BulkDeleteItem(name=nombre, status=412, deleted=False, error=MOTIVOS_BORRADO[412])
+            await aiofiles.os.remove(ruta)
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            return BulkDeleteItem(name=nombre, status=404, deleted=False, error=MOTIVOS_BORRADO[404])
+        except OSError as e:
+            return BulkDeleteItem(name=nombre, status=500, deleted=False, error=str(e))
+        try:
+            await aiofiles.os.remove(self._ruta_meta(container_name, nombre))
+        except FileNotFoundError:
+            pass
+        return BulkDeleteItem(name=nombre, status=202, deleted=True)
+
+    async def delete_files(
+        self,
+        container: str = None,
+        names: Optional[Iterable[str]] = None,
+        prefix: Optional[str] = None,
+        older_than: Optional[datetime] = None,
+    ) -> BulkDeleteResponse:
+        if older_than and older_than.tzinfo is None:
+            older_than = older_than.replace(tzinfo=timezone.utc)
+        container_name, directorio = self._contenedor(container)
+        try:
+            if prefix is not None:
+                nombres = await asyncio.to_thread(self._nombres, directorio, prefix)
+            else:
+                nombres = list(dict.fromkeys(names or []))
+
+            items = []
+            for nombre in nombres:
+                try:
+                    _, ruta = self._ruta(container_name, nombre)
+                except StorageError as e:
+                    items.append(BulkDeleteItem(name=nombre, status=400, deleted=False, error=str(e)))
+                    continue
+                item = await self._borrar(container_name, ruta, nombre, older_than)
+                # Con prefijo, los archivos recientes se omiten (como en Azure)
+                if not (prefix is not None and item.status == 412):
+                    items.append(item)
+        except Exception as e:
+            raise StorageError(f"Error al eliminar archivos: {str(e)}")
+
+        borrados = sum(1 for item in items if item.deleted)
+        return BulkDeleteResponse(deleted=borrados, failed=len(items) - borrados, results=items)
+
+    async def delete_file(self, file_name: str, container: str = None) -> SuccessResponse:
+        container_name, ruta = self._ruta(container, file_name)
+        item = await self._borrar(container_name, ruta, file_name, None)
+        if item.status == 404:
+            raise StorageError(f"El archivo \'{file_name}\' no existe")
+        if not item.deleted:
+            raise StorageError(f"Error al eliminar el archivo: {item.error}")
+        return SuccessResponse(
+            message="Archivo eliminado exitosamente",
+            data={
+                "file_name": file_name,
+                "container": container_name
+            }
+        )
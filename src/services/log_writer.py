@@ -0,0 +1,257 @@
+"""
+Escritor en segundo plano de los logs de envío (``logs_envio``).
+
+Los servicios de envío ya no hacen ``db.add(log); db.commit()`` por cada
+correo: los registros se acumulan en memoria y una tarea asyncio los
+inserta con un único INSERT multi-fila cada ``logs_lote`` registros o cada
+``logs_intervalo_ms`` milisegundos, lo que ocurra primero. Al apagar la
+aplicación se vacía el búfer.
+
+Quien necesite el id del log puede usar ``escribir``, que fuerza un vaciado
+inmediato y espera a que su registro quede confirmado.
+
+Con ``DB_ASYNC`` los lotes se insertan con el engine asíncrono (asyncpg)
+desde el propio event loop; si no, con psycopg2 en un hilo.
+
+En la misma transacción de cada lote se suman sus conteos al resumen por
+hora ``logs_envio_hora`` (hora, plantilla, estado), que es lo que consultan
+las estadísticas sin recorrer ``logs_envio``.
+"""
+import asyncio
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..config.config import async_engine, sessions
+from ..config.settings import settings
+from ..models.logs_envio import LogsEnvio
+from ..models.logs_envio_hora import LogsEnvioHora
+
+# Columnas que se insertan (todas menos la clave primaria)
+_COLUMNAS = [c.name for c in LogsEnvio.__table__.columns if c.name != "id"]
+_POR_DEFECTO = {"num_adjuntos": 0, "num_imagenes": 0, "estado": "PENDIENTE"}
+
+
+def _fila(campos: dict) -> dict:
+    desconocidos = set(campos) - set(_COLUMNAS)
+    if desconocidos:
+        raise ValueError(f"Columnas desconocidas en logs_envio: {sorted(desconocidos)}")
+    fila = {c: campos.get(c, _POR_DEFECTO.get(c)) for c in _COLUMNAS}
+    if fila["fecha_envio"] is None:
+        fila["fecha_envio"] = datetime.utcnow()
+    return fila
+
+
+def _sentencia_insert():
+    return insert(LogsEnvio.__table__).returning(
+        LogsEnvio.__table__.c.id, sort_by_parameter_order=True
+    )
+
+
+def _sentencia_resumen(filas: List[dict]):
+    """UPSERT que suma los conteos del lote a ``logs_envio_hora``."""
+    conteos = Counter(
+        (f["fecha_envio"].replace(minute=0, second=0, microsecond=0), f["identificador"] or "", f["estado"] or "")
+        for f in filas
+    )
+    # Orden fijo de claves: dos lotes concurrentes bloquean las filas en el mismo orden
+    valores = [
+        {"hora": hora, "identificador": identificador, "estado": estado, "total": total}
+        for (hora, identificador, estado), total in sorted(conteos.items())
+    ]
+    tabla = LogsEnvioHora.__table__
+    sentencia = pg_insert(tabla).values(valores)
+    return sentencia.on_conflict_do_update(
+        index_elements=[tabla.c.hora, tabla.c.identificador, tabla.c.estado],
+        set_={"total": tabla.c.total + sentencia.excluded.total},
+    )
+
+
+def insertar_logs(filas: List[dict]) -> List[int]:
+    """Inserta las filas en una sola sentencia y devuelve sus ids en orden."""
+    db = sessions[0]()
+    try:
+        resultado = db.execute(_sentencia_insert(), filas)
+        ids = list(resultado.scalars())
+        db.execute(_sentencia_resumen(filas))
+        db.commit()
+        return ids
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def insertar_logs_async(filas: List[dict]) -> List[int]:
+    """Igual que ``insertar_logs`` con el engine asíncrono (asyncpg)."""
+    async with async_engine[0].begin() as conn:
+        resultado = await conn.execute(_sentencia_insert(), filas)
+        ids = list(resultado.scalars())
+        await conn.execute(_sentencia_resumen(filas))
+        return ids
+
+
+async def _insertar(filas: List[dict]) -> List[int]:
+    if settings.db_async:
+        return await insertar_logs_async(filas)
+    return await asyncio.to_thread(insertar_logs, filas)
+
+
+class LogWriter:
+    """Búfer de logs de envío con vaciado periódico en lote."""
+
+    def __init__(self, lote: int = 200, intervalo_ms: int = 250, max_buffer: int = 10000):
+        self.lote = lote
+        self.intervalo = intervalo_ms / 1000
+        self.max_buffer = max_buffer
+        # Cada elemento es (fila, futuro opcional que espera el id)
+        self._buffer: List[tuple] = []
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._evento: Optional[asyncio.Event] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self._detener = False
+        self.escritos = 0
+        self.descartados = 0
+        self.vaciados = 0
+
+    # --------------------------
+    # CICLO DE VIDA
+    # --------------------------
+    def iniciar(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._evento = asyncio.Event()
+        self._detener = False
+        self._tarea = asyncio.create_task(self._ejecutar(), name="log-writer")
+
+    async def detener(self) -> None:
+        """Vacía el búfer pendiente y detiene la tarea."""
+        if self._tarea is None:
+            return
+        self._detener = True
+        self._evento.set()
+        await asyncio.gather(self._tarea, return_exceptions=True)
+        self._tarea = None
+        self._loop = None
+
+    @property
+    def activo(self) -> bool:
+        return self._tarea is not None and not self._tarea.done()
+
+    # --------------------------
+    # API PÚBLICA
+    # --------------------------
+    def encolar(self, **campos) -> None:
+        """
+        Agrega un log al búfer sin esperar a la base de datos. Puede llamarse
+        desde el event loop o desde otro hilo. Si el escritor no está en
+        marcha (scripts, pruebas) el log se inserta de inmediato.
+        """
+        fila = _fila(campos)
+        if not self.activo:
+            insertar_logs([fila])
+            self.escritos += 1
+            return
+        self._agregar(fila, None)
+
+    async def escribir(self, **campos) -> int:
+        """Modo síncrono: inserta el log en el siguiente lote y devuelve su id."""
+        fila = _fila(campos)
+        if not self.activo:
+            return (await _insertar([fila]))[0]
+        futuro = asyncio.get_running_loop().create_future()
+        self._agregar(fila, futuro, urgente=True)
+        return await futuro
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            pendientes = len(self._buffer)
+        return {
+            "pendientes": pendientes,
+            "escritos": self.escritos,
+            "vaciados": self.vaciados,
+            "descartados": self.descartados,
+        }
+
+    # --------------------------
+    # INTERNOS
+    # --------------------------
+    def _agregar(self, fila: dict, futuro: Optional[asyncio.Future], urgente: bool = False) -> None:
+        with self._lock:
+            self._buffer.append((fila, futuro))
+            lleno = len(self._buffer) >= self.lote
+        if lleno or urgente:
+            self._despertar()
+
+    def _despertar(self) -> None:
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            en_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            en_loop = False
+        if en_loop:
+            self._evento.set()
+        else:
+            loop.call_soon_threadsafe(self._evento.set)
+
+    async def _ejecutar(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._evento.wait(), timeout=self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._evento.clear()
+            await self._vaciar()
+            if self._detener:
+                # Vaciado final: lo que haya llegado mientras se escribía
+                await self._vaciar()
+                return
+
+    async def _vaciar(self) -> None:
+        with self._lock:
+            pendientes, self._buffer = self._buffer, []
+        while pendientes:
+            bloque, pendientes = pendientes[:self.lote], pendientes[self.lote:]
+            try:
+                ids = await _insertar([f for f, _ in bloque])
+            except Exception as e:
+                print(f"❌ LogWriter: error al insertar {len(bloque)} logs: {e}")
+                self._devolver(bloque + pendientes, e)
+                return
+            self.escritos += len(bloque)
+            self.vaciados += 1
+            for (_, futuro), log_id in zip(bloque, ids):
+                if futuro is not None and not futuro.done():
+                    futuro.set_result(log_id)
+
+    def _devolver(self, filas: List[tuple], error: Exception) -> None:
+        """Reencola las filas tras un fallo; quien espera un id recibe el error."""
+        reintentar = []
+        for fila, futuro in filas:
+            if futuro is not None:
+                if not futuro.done():
+                    futuro.set_exception(error)
+            else:
+                reintentar.append((fila, None))
+        with self._lock:
+            self._buffer = reintentar + self._buffer
+            exceso = len(self._buffer) - self.max_buffer
+            if exceso > 0:
+                del self._buffer[:exceso]
+                self.descartados += exceso
+                print(f"⚠️ LogWriter: búfer lleno, se descartan {exceso} logs antiguos")
+
+
+# Instancia global del escritor de logs
+log_writer = LogWriter(
+    lote=settings.logs_lote,
+    intervalo_ms=settings.logs_intervalo_ms,
+    max_buffer=settings.logs_max_buffer,
+)
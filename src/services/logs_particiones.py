@@ -0,0 +1,422 @@
+"""
+Particiones mensuales de ``logs_envio`` y retención.
+
+La tabla está particionada por rango sobre ``fecha_envio`` con una partición
+por mes (``logs_envio_pAAAAMM``) y una partición DEFAULT que recoge lo que
+caiga fuera de ellas. Una tarea periódica:
+
+- crea por adelantado las particiones del mes actual y de los
+  ``logs_particion_meses_adelante`` siguientes;
+- con ``logs_retencion_meses`` > 0, borra con ``DROP TABLE`` las particiones
+  cuyo rango terminó antes del límite, en lugar de un ``DELETE`` masivo
+  (que genera mucho WAL y deja la tabla llena de tuplas muertas).
+
+Una tabla ``logs_envio`` anterior sin particionar se conserva, pero no se
+migra al arrancar: es una operación única que se lanza a mano con
+``python -m src.scripts.particionar_logs_envio``. Los índices y una
+restricción CHECK con el rango se preparan antes sin bloquear las
+escrituras (``CREATE INDEX CONCURRENTLY``, ``VALIDATE CONSTRAINT``); después,
+en una transacción corta, la tabla se renombra a ``logs_envio_legacy`` y se
+adjunta como partición desde MINVALUE, sin copiar datos ni recorrerla. La
+retención la borra entera cuando vence su rango. Mientras no se migre, la
+aplicación sigue escribiendo en la tabla anterior y el mantenimiento no
+hace nada.
+"""
+import asyncio
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from ..config.config import engine
+from ..config.settings import settings
+from ..models.logs_envio import LogsEnvio
+
+TABLA = "logs_envio"
+DEFAULT = "logs_envio_default"
+LEGACY = "logs_envio_legacy"
+# Clave del advisory lock: un solo proceso crea o borra particiones a la vez
+_BLOQUEO = 0x6C6F6773
+# Retención de la partición DEFAULT: filas por DELETE y DELETEs por pasada
+_LOTE_DEFAULT = 5000
+_LOTES_POR_PASADA = 20
+
+_LIMITES = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+# Restricción CHECK con el rango de la tabla anterior: con ella validada,
+# SET NOT NULL y ATTACH PARTITION no recorren la tabla
+RANGO_LEGACY = f"{LEGACY}_rango"
+_HASTA_CHECK = re.compile(r"fecha_envio < '(.+?)'")
+
+
+@dataclass(frozen=True)
+class Particion:
+    nombre: str
+    desde: Optional[datetime]  # None = MINVALUE
+    hasta: Optional[datetime]  # None = MAXVALUE
+    default: bool = False
+
+    def cubre(self, instante: datetime) -> bool:
+        return not self.default and (self.desde is None or self.desde <= instante) and (
+            self.hasta is None or instante < self.hasta
+        )
+
+
+def _mes(fecha: datetime, desplazamiento: int = 0) -> datetime:
+    """Primer instante del mes de ``fecha`` desplazado ``desplazamiento`` meses."""
+    indice = fecha.year * 12 + fecha.month - 1 + desplazamiento
+    return datetime(indice // 12, indice % 12 + 1, 1)
+
+
+def _tabla(schema: str, nombre: str) -> str:
+    return f'"{schema}"."{nombre}"'
+
+
+def _limite(valor: str) -> Optional[datetime]:
+    if valor in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(valor.strip("'"))
+
+
+def particiones(conn: Connection, schema: str) -> List[Particion]:
+    """Particiones actuales de ``logs_envio`` con sus límites."""
+    filas = conn.execute(
+        text(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            JOIN pg_namespace n ON n.oid = p.relnamespace
+            WHERE n.nspname = :schema AND p.relname = :tabla
+            """
+        ),
+        {"schema": schema, "tabla": TABLA},
+    )
+    resultado = []
+    for nombre, limites in filas:
+        if limites == "DEFAULT":
+            resultado.append(Particion(nombre, None, None, default=True))
+            continue
+        desde, hasta = _LIMITES.search(limites).groups()
+        resultado.append(Particion(nombre, _limite(desde), _limite(hasta)))
+    return resultado
+
+
+def _tipo(conn: Connection, schema: str, nombre: str) -> Optional[str]:
+    """``relkind`` de la tabla: 'r' normal, 'p' particionada, None si no existe."""
+    return conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:tabla)"),
+        {"tabla": _tabla(schema, nombre)},
+    ).scalar()
+
+
+def _existe(conn: Connection, schema: str, nombre: str) -> bool:
+    return conn.execute(
+        text("SELECT to_regclass(:tabla) IS NOT NULL"), {"tabla": _tabla(schema, nombre)}
+    ).scalar()
+
+
+def _adjuntar_legacy(conn: Connection, schema: str, existentes: List[Particion]) -> None:
+    if not _existe(conn, schema, LEGACY) or any(p.nombre == LEGACY for p in existentes):
+        return
+    legacy = _tabla(schema, LEGACY)
+    rango = conn.execute(
+        text(
+            "SELECT pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(:tabla) AND conname = :nombre AND convalidated"
+        ),
+        {"tabla": legacy, "nombre": RANGO_LEGACY},
+    ).scalar()
+    max_id = conn.execute(text(f"SELECT max(id) FROM {legacy}")).scalar()
+    if rango:
+        # El mismo límite que la restricción validada: el ATTACH no recorre la tabla
+        hasta = datetime.fromisoformat(_HASTA_CHECK.search(rango).group(1))
+    else:
+        hasta = _mes(conn.execute(text(f"SELECT max(fecha_envio) FROM {legacy}")).scalar() or datetime.utcnow(), 1)
+    conn.execute(text(
+        f"ALTER TABLE {_tabla(schema, TABLA)} ATTACH PARTITION {legacy} "
+        f"FOR VALUES FROM (MINVALUE) TO ('{hasta.isoformat()}')"
+    ))
+    if rango:
+        # Ya la garantiza el rango de la partición
+        conn.execute(text(f'ALTER TABLE {legacy} DROP CONSTRAINT "{RANGO_LEGACY}"'))
+    if max_id:
+        # Los ids nuevos siguen la numeración de la tabla anterior
+        conn.execute(
+            text("SELECT setval(pg_get_serial_sequence(:tabla, 'id'), :id)"),
+            {"tabla": _tabla(schema, TABLA), "id": max_id},
+        )
+    print(f"🗂️ logs_envio anterior adjuntada como partición hasta {hasta:%Y-%m}")
+
+
+def _crear_particion(conn: Connection, schema: str, inicio: datetime, fin: datetime, con_default: bool) -> str:
+    padre, nombre = _tabla(schema, TABLA), f"{TABLA}_p{inicio:%Y%m}"
+    rango = f"FOR VALUES FROM ('{inicio.isoformat()}') TO ('{fin.isoformat()}')"
+    filtro = {"inicio": inicio, "fin": fin}
+    en_default = con_default and conn.execute(
+        text(
+            f"SELECT 1 FROM {_tabla(schema, DEFAULT)} "
+            "WHERE fecha_envio >= :inicio AND fecha_envio < :fin LIMIT 1"
+        ),
+        filtro,
+    ).first()
+    if not en_default:
+        conn.execute(text(f"CREATE TABLE {_tabla(schema, nombre)} PARTITION OF {padre} {rango}"))
+        return nombre
+    # La partición DEFAULT tiene filas del rango: Postgres no deja crear la
+    # partición nueva mientras estén ahí, así que se mueven a ella.
+    conn.execute(text(f"ALTER TABLE {padre} DETACH PARTITION {_tabla(schema, DEFAULT)}"))
+    conn.execute(text(f"CREATE TABLE {_tabla(schema, nombre)} PARTITION OF {padre} {rango}"))
+    conn.execute(
+        text(
+            f"WITH movidas AS (DELETE FROM {_tabla(schema, DEFAULT)} "
+            "WHERE fecha_envio >= :inicio AND fecha_envio < :fin RETURNING *) "
+            f"INSERT INTO {_tabla(schema, nombre)} SELECT * FROM movidas"
+        ),
+        filtro,
+    )
+    conn.execute(text(f"ALTER TABLE {padre} ATTACH PARTITION {_tabla(schema, DEFAULT)} DEFAULT"))
+    return nombre
+
+
+def asegurar_particiones(conn: Connection, schema: str, meses_adelante: Optional[int] = None) -> List[str]:
+    """
+    Crea la partición DEFAULT y las mensuales que falten desde el mes actual
+    hasta ``meses_adelante`` meses después. Devuelve las particiones creadas.
+    """
+    if meses_adelante is None:
+        meses_adelante = settings.logs_particion_meses_adelante
+    conn.execute(text("SELECT pg_advisory_xact_lock(:clave)"), {"clave": _BLOQUEO})
+    existentes = particiones(conn, schema)
+    _adjuntar_legacy(conn, schema, existentes)
+    existentes = particiones(conn, schema)
+
+    con_default = any(p.default for p in existentes)
+    creadas = []
+    actual = _mes(datetime.utcnow())
+    for k in range(meses_adelante + 1):
+        inicio, fin = _mes(actual, k), _mes(actual, k + 1)
+        if any(p.cubre(inicio) for p in existentes):
+            continue
+        creadas.append(_crear_particion(conn, schema, inicio, fin, con_default))
+    if not con_default:
+        conn.execute(text(f"CREATE TABLE {_tabla(schema, DEFAULT)} PARTITION OF {_tabla(schema, TABLA)} DEFAULT"))
+    return creadas
+
+
+def eliminar_particiones_vencidas(conn: Connection, schema: str, retencion_meses: int) -> List[str]:
+    """
+    Borra las particiones cuyo rango terminó hace más de ``retencion_meses``
+    meses (contando el actual). Las filas vencidas de la partición DEFAULT
+    se borran aparte, por lotes (``purgar_default_vencida``).
+    """
+    if retencion_meses <= 0:
+        return []
+    conn.execute(text("SELECT pg_advisory_xact_lock(:clave)"), {"clave": _BLOQUEO})
+    # DROP de una partición bloquea la tabla padre: no esperar detrás de
+    # transacciones largas (se reintenta en la siguiente pasada)
+    conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+    limite = _mes(datetime.utcnow(), -retencion_meses)
+    borradas = []
+    for particion in particiones(conn, schema):
+        if particion.default or particion.hasta is None or particion.hasta > limite:
+            continue
+        conn.execute(text(f"DROP TABLE {_tabla(schema, particion.nombre)}"))
+        borradas.append(particion.nombre)
+    return borradas
+
+
+def purgar_default_vencida(
+    eng: Engine,
+    schema: str,
+    retencion_meses: int,
+    lote: int = _LOTE_DEFAULT,
+    max_lotes: int = _LOTES_POR_PASADA,
+) -> int:
+    """
+    Borra las filas vencidas de la partición DEFAULT en lotes de ``lote``
+    filas, cada uno en su propia transacción, y como mucho ``max_lotes`` por
+    pasada: un único ``DELETE`` sin límite podría recorrer millones de filas
+    en una transacción larga. Lo que quede se borra en las pasadas
+    siguientes. Devuelve las filas borradas.
+    """
+    if retencion_meses <= 0:
+        return 0
+    limite = _mes(datetime.utcnow(), -retencion_meses)
+    tabla = _tabla(schema, DEFAULT)
+    total = 0
+    for _ in range(max_lotes):
+        with eng.begin() as conn:
+            borradas = conn.execute(
+                text(
+                    f"DELETE FROM {tabla} WHERE ctid = ANY(ARRAY("
+                    f"SELECT ctid FROM {tabla} WHERE fecha_envio < :limite LIMIT :lote))"
+                ),
+                {"limite": limite, "lote": lote},
+            ).rowcount
+        total += borradas
+        if borradas < lote:
+            return total
+    print(f"⚠️ {DEFAULT}: quedan filas anteriores a {limite:%Y-%m}; se seguirán borrando en la próxima pasada")
+    return total
+
+
+def _indices_legacy() -> List[Tuple[str, List[str]]]:
+    """Índices de la tabla particionada, con nombre para la tabla anterior."""
+    return [
+        (f"{LEGACY}_{'_'.join(c.name for c in indice.columns)}", [c.name for c in indice.columns])
+        for indice in LogsEnvio.__table__.indexes
+    ]
+
+
+def preparar_tabla_sin_particiones(eng: Engine, schema: str, lock_timeout: str = "5s") -> bool:
+    """
+    Primera fase de la migración, sin bloquear las escrituras de la
+    aplicación (que sigue usando la tabla anterior mientras tanto):
+
+    - crea con ``CONCURRENTLY`` los índices de la tabla particionada y el
+      índice único ``(id, fecha_envio)`` de la nueva clave primaria, para que
+      el ATTACH los reutilice en lugar de construirlos;
+    - añade ``CHECK (fecha_envio IS NOT NULL AND fecha_envio < hasta)`` con
+      ``NOT VALID`` y lo valida aparte (solo SHARE UPDATE EXCLUSIVE).
+
+    ``hasta`` es el inicio del mes siguiente al próximo, con margen para un
+    cambio de mes entre las dos fases. ``CONCURRENTLY`` espera a que terminen
+    las transacciones abiertas antes de empezar. Es idempotente.
+    """
+    tabla = _tabla(schema, TABLA)
+    # CONCURRENTLY no admite transacciones: cada sentencia confirma sola
+    with eng.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if _tipo(conn, schema, TABLA) != "r":
+            return False
+        # fecha_envio pasa a ser parte de la clave primaria
+        conn.execute(text(f"UPDATE {tabla} SET fecha_envio = 'epoch' WHERE fecha_envio IS NULL"))
+        conn.execute(text(f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "{LEGACY}_id_fecha_envio" ON {tabla} (id, fecha_envio)'))
+        for nombre, columnas in _indices_legacy():
+            conn.execute(text(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{nombre}" ON {tabla} ({", ".join(columnas)})'
+            ))
+        existe = conn.execute(
+            text("SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass(:tabla) AND conname = :nombre"),
+            {"tabla": tabla, "nombre": RANGO_LEGACY},
+        ).first()
+        if not existe:
+            hasta = _mes(datetime.utcnow(), 2)
+            # Bloqueo breve, pero en cola detendría las escrituras detrás de una transacción larga
+            conn.execute(text(f"SET lock_timeout = '{lock_timeout}'"))
+            try:
+                conn.execute(text(
+                    f'ALTER TABLE {tabla} ADD CONSTRAINT "{RANGO_LEGACY}" '
+                    f"CHECK (fecha_envio IS NOT NULL AND fecha_envio < '{hasta.isoformat()}') NOT VALID"
+                ))
+            finally:
+                conn.execute(text("RESET lock_timeout"))
+        conn.execute(text(f'ALTER TABLE {tabla} VALIDATE CONSTRAINT "{RANGO_LEGACY}"'))
+    return True
+
+
+def migrar_tabla_sin_particiones(eng: Engine, schema: str, lock_timeout: str = "5s") -> bool:
+    """
+    Convierte una ``logs_envio`` sin particionar (creada por versiones
+    anteriores) en la partición ``logs_envio_legacy`` de la tabla nueva.
+
+    Tras ``preparar_tabla_sin_particiones``, con los índices y la
+    restricción de rango ya validados, la transacción solo cambia el
+    catálogo y mantiene el ACCESS EXCLUSIVE unos milisegundos. Si no
+    consigue el bloqueo en ``lock_timeout`` falla sin cambios y se puede
+    reintentar. Devuelve False si no había nada que migrar.
+    """
+    with eng.begin() as conn:
+        if _tipo(conn, schema, TABLA) != "r":
+            return False
+        conn.execute(text("SELECT pg_advisory_xact_lock(:clave)"), {"clave": _BLOQUEO})
+        conn.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+        conn.execute(text(f"ALTER TABLE {_tabla(schema, TABLA)} RENAME TO {LEGACY}"))
+        legacy = _tabla(schema, LEGACY)
+        # Los nombres de índices y secuencias son únicos por schema: liberar
+        # los que la tabla nueva va a crear
+        indices = conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE schemaname = :schema AND tablename = :tabla"),
+            {"schema": schema, "tabla": LEGACY},
+        ).scalars().all()
+        for indice in indices:
+            if LEGACY not in indice:
+                nuevo = indice.replace(TABLA, LEGACY, 1)
+                conn.execute(text(f'ALTER INDEX {_tabla(schema, indice)} RENAME TO "{nuevo}"'))
+        secuencia = conn.execute(
+            text("SELECT pg_get_serial_sequence(:tabla, 'id')"), {"tabla": legacy}
+        ).scalar()
+        if secuencia:
+            conn.execute(text(f'ALTER SEQUENCE {secuencia} RENAME TO "{LEGACY}_id_seq"'))
+        # Sin recorrer la tabla: la restricción de rango validada lo garantiza
+        conn.execute(text(f"ALTER TABLE {legacy} ALTER COLUMN id SET NOT NULL"))
+        conn.execute(text(f"ALTER TABLE {legacy} ALTER COLUMN fecha_envio SET NOT NULL"))
+        pk = conn.execute(
+            text("SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:tabla) AND contype = 'p'"),
+            {"tabla": legacy},
+        ).scalar()
+        if pk:
+            conn.execute(text(f'ALTER TABLE {legacy} DROP CONSTRAINT "{pk}"'))
+        conn.execute(text(f'ALTER TABLE {legacy} ADD PRIMARY KEY USING INDEX "{LEGACY}_id_fecha_envio"'))
+        # Crea la tabla particionada; el evento after_create adjunta la anterior
+        LogsEnvio.__table__.create(bind=conn)
+    return True
+
+
+class MantenimientoParticiones:
+    """Tarea periódica que crea particiones futuras y aplica la retención."""
+
+    def __init__(self, intervalo: float = 21600.0, meses_adelante: int = 3, retencion_meses: int = 0):
+        self.intervalo = intervalo
+        self.meses_adelante = meses_adelante
+        self.retencion_meses = retencion_meses
+        self._tarea: Optional[asyncio.Task] = None
+        self._detener = asyncio.Event()
+
+    def iniciar(self) -> None:
+        self._detener.clear()
+        self._tarea = asyncio.create_task(self._ejecutar(), name="logs-particiones")
+
+    async def detener(self) -> None:
+        self._detener.set()
+        if self._tarea:
+            await asyncio.gather(self._tarea, return_exceptions=True)
+            self._tarea = None
+
+    def mantener(self) -> dict:
+        """Una pasada de mantenimiento (síncrona, se ejecuta en un hilo)."""
+        schema = LogsEnvio.__table__.schema
+        with engine[0].begin() as conn:
+            if _tipo(conn, schema, TABLA) == "r":
+                print("⚠️ logs_envio no está particionada: ejecute python -m src.scripts.particionar_logs_envio")
+                return {"creadas": [], "eliminadas": [], "filas_default": 0}
+            creadas = asegurar_particiones(conn, schema, self.meses_adelante)
+        with engine[0].begin() as conn:
+            borradas = eliminar_particiones_vencidas(conn, schema, self.retencion_meses)
+        filas_default = purgar_default_vencida(engine[0], schema, self.retencion_meses)
+        if creadas or borradas:
+            print(f"🗂️ logs_envio: particiones creadas {creadas}, eliminadas {borradas}")
+        if filas_default:
+            print(f"🗂️ {DEFAULT}: {filas_default} filas vencidas eliminadas")
+        return {"creadas": creadas, "eliminadas": borradas, "filas_default": filas_default}
+
+    async def _ejecutar(self) -> None:
+        while not self._detener.is_set():
+            try:
+                await asyncio.to_thread(self.mantener)
+            except Exception as e:
+                print(f"❌ Mantenimiento de particiones de logs_envio: {e}")
+            try:
+                await asyncio.wait_for(self._detener.wait(), timeout=self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+
+
+mantenimiento_particiones = MantenimientoParticiones(
+    intervalo=settings.logs_mantenimiento_intervalo,
+    meses_adelante=settings.logs_particion_meses_adelante,
+    retencion_meses=settings.logs_retencion_meses,
+)
@@ -0,0 +1,124 @@
+"""
+Consultas sobre los logs de envío.
+
+- ``listar_logs``: filtros por estado, plantilla, destinatario y rango de
+  fechas con paginación keyset sobre ``(fecha_envio, id)`` descendente, el
+  orden del índice ``ix_<schema>_logs_envio_fecha_id``. El rango de fechas
+  limita además las particiones mensuales que se recorren.
+- ``estadisticas``: conteos por plantilla y estado leídos del resumen por
+  hora ``logs_envio_hora`` (lo mantiene ``log_writer`` en cada lote), sin
+  recorrer ``logs_envio``.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+
+from src.models.logs_envio import LogsEnvio
+from src.models.logs_envio_hora import LogsEnvioHora
+from src.utils.paginacion import codificar_cursor_datos, decodificar_cursor_datos
+
+
+def _utc(fecha: Optional[datetime]) -> Optional[datetime]:
+    """Las fechas de los logs se guardan en UTC sin zona horaria."""
+    if fecha is None or fecha.tzinfo is None:
+        return fecha
+    return fecha.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _posicion(cursor: str) -> Tuple[datetime, int]:
+    datos = decodificar_cursor_datos(cursor)
+    try:
+        return datetime.fromisoformat(datos["fecha"]), int(datos["id"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginación inválido")
+
+
+def listar_logs(
+    db: Session,
+    limit: int,
+    cursor: Optional[str] = None,
+    estado: Optional[str] = None,
+    identificador: Optional[str] = None,
+    destinatario: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    incluir_contenido: bool = False,
+) -> Tuple[List[dict], Optional[str]]:
+    """Devuelve ``(logs, next_cursor)``, del más reciente al más antiguo."""
+    desde, hasta = _utc(desde), _utc(hasta)
+    tabla = LogsEnvio.__table__
+    # El HTML renderizado es lo más pesado de cada fila: solo si se pide
+    columnas = [c for c in tabla.c if incluir_contenido or c.name != "contenido"]
+    consulta = select(*columnas)
+    if estado:
+        consulta = consulta.where(tabla.c.estado == estado)
+    if identificador:
+        consulta = consulta.where(tabla.c.identificador == identificador)
+    if destinatario:
+        consulta = consulta.where(tabla.c.destinatario == destinatario)
+    if desde:
+        consulta = consulta.where(tabla.c.fecha_envio >= desde)
+    if hasta:
+        consulta = consulta.where(tabla.c.fecha_envio < hasta)
+    if cursor:
+        consulta = consulta.where(tuple_(tabla.c.fecha_envio, tabla.c.id) < tuple_(*_posicion(cursor)))
+
+    # Una fila de más indica si hay otra página
+    filas = db.execute(
+        consulta.order_by(tabla.c.fecha_envio.desc(), tabla.c.id.desc()).limit(limit + 1)
+    ).mappings().all()
+    if len(filas) <= limit:
+        return [dict(f) for f in filas], None
+    filas = filas[:limit]
+    ultimo = filas[-1]
+    return [dict(f) for f in filas], codificar_cursor_datos(
+        {"fecha": ultimo["fecha_envio"].isoformat(), "id": ultimo["id"]}
+    )
+
+
+def estadisticas(
+    db: Session,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    identificador: Optional[str] = None,
+    estado: Optional[str] = None,
+    por_hora: bool = False,
+) -> dict:
+    """
+    Conteos de envíos por plantilla y estado entre ``desde`` y ``hasta``
+    (por defecto, las últimas 24 horas). La granularidad es la hora:
+    ``desde`` se redondea al inicio de su hora.
+    """
+    hasta = _utc(hasta) or datetime.utcnow()
+    desde = (_utc(desde) or hasta - timedelta(hours=24)).replace(minute=0, second=0, microsecond=0)
+    if desde >= hasta:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'desde' debe ser anterior a 'hasta'")
+
+    tabla = LogsEnvioHora.__table__
+    filtros = [tabla.c.hora >= desde, tabla.c.hora < hasta]
+    if identificador is not None:
+        filtros.append(tabla.c.identificador == identificador)
+    if estado:
+        filtros.append(tabla.c.estado == estado)
+
+    if por_hora:
+        consulta = (
+            select(tabla.c.hora, tabla.c.identificador, tabla.c.estado, tabla.c.total)
+            .where(*filtros)
+            .order_by(tabla.c.hora, tabla.c.identificador, tabla.c.estado)
+        )
+    else:
+        consulta = (
+            select(tabla.c.identificador, tabla.c.estado, func.sum(tabla.c.total).label("total"))
+            .where(*filtros)
+            .group_by(tabla.c.identificador, tabla.c.estado)
+            .order_by(tabla.c.identificador, tabla.c.estado)
+        )
+    return {
+        "desde": desde,
+        "hasta": hasta,
+        "items": [dict(f) for f in db.execute(consulta).mappings()],
+    }
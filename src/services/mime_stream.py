@@ -0,0 +1,185 @@
+"""
+Construcción de mensajes MIME en streaming para SMTP.
+
+``MIMEMultipart`` obliga a tener en memoria cada adjunto completo y, al
+serializar, el mensaje entero codificado en base64 (≈1,37 veces el tamaño de
+los adjuntos). ``MensajeStreaming`` genera el mensaje línea a línea y lee
+cada adjunto desde disco en bloques, codificándolo a base64 sobre la marcha;
+``enviar_por_smtp`` escribe esas líneas directamente en el comando DATA con
+el escapado de puntos (dot-stuffing) de RFC 5321.
+
+La memoria por envío queda acotada por el tamaño de bloque, no por el de
+los adjuntos.
+"""
+import base64
+import mimetypes
+import secrets
+import smtplib
+from dataclasses import dataclass
+from email import policy
+from email.charset import BASE64, Charset
+from email.utils import formatdate, make_msgid
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+CRLF = b"\r\n"
+# 57 bytes binarios = una línea base64 de 76 caracteres
+_BYTES_POR_LINEA = 57
+_LINEAS_POR_BLOQUE = 1024
+# Tamaño de los envíos al socket durante DATA
+_BUFFER_ENVIO = 64 * 1024
+_UTF8 = Charset("utf-8")
+_UTF8.header_encoding = BASE64
+
+
+@dataclass(frozen=True)
+class AdjuntoStreaming:
+    """Adjunto que se leerá desde disco al enviar."""
+    ruta: Path
+    nombre: str
+    content_type: Optional[str] = None
+
+
+def _param(nombre: str, valor: str) -> str:
+    """
+    Parámetro de cabecera MIME; los nombres no ASCII van como palabra
+    codificada RFC 2047 (igual que el asunto), la forma que leen todos los
+    clientes de correo.
+    """
+    if not valor.isascii():
+        valor = _UTF8.header_encode(valor)
+    escapado = valor.replace("\\", "\\\\").replace('"', '\\"')
+    return f'{nombre}="{escapado}"'
+
+
+def _cabecera(nombre: str, valor: str) -> bytes:
+    """Cabecera plegada para SMTP; los valores no ASCII se codifican con RFC 2047."""
+    return policy.SMTP.fold_binary(*policy.SMTP.header_store_parse(nombre, valor))
+
+
+def _base64_lineas(datos: bytes) -> Iterator[bytes]:
+    codificado = base64.b64encode(datos)
+    for i in range(0, len(codificado), 76):
+        yield codificado[i:i + 76] + CRLF
+
+
+class MensajeStreaming:
+    """Mensaje multipart/mixed (HTML + adjuntos) que se serializa por líneas."""
+
+    def __init__(
+        self,
+        remitente: str,
+        destinatario: str,
+        cc: List[str],
+        asunto: str,
+        contenido_html: str,
+        adjuntos: List[AdjuntoStreaming],
+    ):
+        self.cabeceras: Dict[str, str] = {
+            "From": remitente,
+            "To": destinatario,
+        }
+        if cc:
+            self.cabeceras["Cc"] = ", ".join(cc)
+        self.cabeceras["Subject"] = asunto or ""
+        self.cabeceras["Date"] = formatdate(localtime=True)
+        self.cabeceras["Message-ID"] = make_msgid()
+        self.contenido_html = contenido_html or ""
+        self.adjuntos = adjuntos
+        self.boundary = f"==============={secrets.token_hex(16)}=="
+
+    def __getitem__(self, nombre: str) -> Optional[str]:
+        return self.cabeceras.get(nombre)
+
+    def lineas(self) -> Iterator[bytes]:
+        """Produce el mensaje completo como líneas terminadas en CRLF."""
+        for nombre, valor in self.cabeceras.items():
+            yield _cabecera(nombre, valor)
+        yield b"MIME-Version: 1.0" + CRLF
+        yield f'Content-Type: multipart/mixed; boundary="{self.boundary}"'.encode() + CRLF
+        yield CRLF
+
+        separador = f"--{self.boundary}".encode() + CRLF
+
+        # Cuerpo HTML
+        yield separador
+        yield b'Content-Type: text/html; charset="utf-8"' + CRLF
+        yield b"MIME-Version: 1.0" + CRLF
+        yield b"Content-Transfer-Encoding: base64" + CRLF
+        yield CRLF
+        yield from _base64_lineas(self.contenido_html.encode("utf-8"))
+
+        # Adjuntos leídos en bloques desde disco
+        for adjunto in self.adjuntos:
+            tipo = (
+                adjunto.content_type
+                or mimetypes.guess_type(adjunto.nombre)[0]
+                or "application/octet-stream"
+            )
+            yield separador
+            yield f"Content-Type: {tipo}; {_param('name', adjunto.nombre)}".encode() + CRLF
+            yield b"MIME-Version: 1.0" + CRLF
+            yield b"Content-Transfer-Encoding: base64" + CRLF
+            yield f"Content-Disposition: attachment; {_param('filename', adjunto.nombre)}".encode() + CRLF
+            yield CRLF
+            with open(adjunto.ruta, "rb") as f:
+                while True:
+                    bloque = f.read(_BYTES_POR_LINEA * _LINEAS_POR_BLOQUE)
+                    if not bloque:
+                        break
+                    yield from _base64_lineas(bloque)
+
+        yield f"--{self.boundary}--".encode() + CRLF
+
+
+def enviar_por_smtp(
+    server: smtplib.SMTP, msg: MensajeStreaming, from_addr: str, to_addrs: List[str]
+) -> dict:
+    """
+    Equivalente a ``smtplib.SMTP.sendmail`` pero transmitiendo el cuerpo en
+    streaming durante DATA.
+
+    Returns:
+        dict: Destinatarios rechazados (igual que smtplib)
+    """
+    server.ehlo_or_helo_if_needed()
+    code, resp = server.mail(from_addr)
+    if code != 250:
+        if code == 421:
+            server.close()
+        else:
+            server.rset()
+        raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+
+    rechazados = {}
+    for destinatario in to_addrs:
+        code, resp = server.rcpt(destinatario)
+        if code not in (250, 251):
+            rechazados[destinatario] = (code, resp)
+        if code == 421:
+            server.close()
+            raise smtplib.SMTPRecipientsRefused(rechazados)
+    if len(rechazados) == len(to_addrs):
+        server.rset()
+        raise smtplib.SMTPRecipientsRefused(rechazados)
+
+    code, resp = server.docmd("data")
+    if code != 354:
+        raise smtplib.SMTPDataError(code, resp)
+
+    buffer = bytearray()
+    for linea in msg.lineas():
+        # Dot-stuffing: una línea que empieza por '.' se envía con '..'
+        if linea.startswith(b"."):
+            buffer += b"."
+        buffer += linea
+        if len(buffer) >= _BUFFER_ENVIO:
+            server.send(bytes(buffer))
+            buffer.clear()
+    buffer += b"." + CRLF
+    server.send(bytes(buffer))
+
+    code, resp = server.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+    return rechazados
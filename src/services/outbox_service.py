@@ -0,0 +1,101 @@
+"""
+Bandeja de salida (outbox) duradera para los envíos de correo.
+
+En modo encolado los endpoints de envío guardan el mensaje ya renderizado
+en la tabla ``outbox_envio`` y responden 202 con el id del trabajo; los
+workers de ``outbox_worker`` se encargan después de la entrega.
+"""
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from src.models.outbox_envio import OutboxEnvio
+
+# Evento para despertar a los workers locales en cuanto se encola un trabajo,
+# junto con el event loop al que pertenece (asyncio.Event no es thread-safe)
+_nuevo_trabajo: Optional[asyncio.Event] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def evento_nuevo_trabajo() -> asyncio.Event:
+    """Evento de los workers; se llama desde su event loop."""
+    global _nuevo_trabajo, _loop
+    loop = asyncio.get_running_loop()
+    if _nuevo_trabajo is None or _loop is not loop:
+        _nuevo_trabajo, _loop = asyncio.Event(), loop
+    return _nuevo_trabajo
+
+
+def despertar_workers() -> None:
+    """Despierta a los workers de este proceso (si los hay), desde cualquier hilo."""
+    if _nuevo_trabajo is not None and _loop is not None and not _loop.is_closed():
+        _loop.call_soon_threadsafe(_nuevo_trabajo.set)
+
+
+def _insertar_trabajo(
+    db: Session,
+    canal: str,
+    destinatario: str,
+    asunto: str,
+    contenido: str,
+    identificador: str,
+    remitente: Optional[str] = None,
+    credenciales_id: Optional[int] = None,
+    cc: Optional[List[str]] = None,
+    bcc: Optional[List[str]] = None,
+    adjuntos: Optional[List[str]] = None,
+) -> OutboxEnvio:
+    """Inserta el trabajo y confirma (síncrono; se ejecuta en un hilo)."""
+    try:
+        trabajo = OutboxEnvio(
+            canal=canal,
+            credenciales_id=credenciales_id,
+            remitente=remitente,
+            destinatario=destinatario,
+            cc=";".join(cc) if cc else None,
+            bcc=";".join(bcc) if bcc else None,
+            adjuntos=";".join(adjuntos) if adjuntos else None,
+            asunto=asunto,
+            contenido=contenido,
+            identificador=identificador,
+            estado="PENDIENTE",
+            intentos=0,
+            disponible_en=datetime.utcnow(),
+            fecha_creacion=datetime.utcnow(),
+        )
+        db.add(trabajo)
+        db.commit()
+        db.refresh(trabajo)
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500, detail=f"Error al encolar el envío: {str(e)}"
+        )
+
+    return trabajo
+
+
+async def encolar_envio(db: Session, **datos) -> OutboxEnvio:
+    """
+    Inserta un trabajo PENDIENTE en la bandeja de salida (el commit, fuera
+    del event loop) y despierta a los workers locales.
+
+    Returns:
+        OutboxEnvio: Trabajo creado (su id se devuelve al cliente)
+    """
+    trabajo = await asyncio.to_thread(_insertar_trabajo, db, **datos)
+    despertar_workers()
+    return trabajo
+
+
+def consultar_trabajo(db: Session, id: int) -> OutboxEnvio:
+    trabajo = db.query(OutboxEnvio).filter(OutboxEnvio.id == id).first()
+    if not trabajo:
+        raise HTTPException(
+            status_code=404, detail=f"No se encontró el trabajo de envío con ID '{id}'"
+        )
+    return trabajo
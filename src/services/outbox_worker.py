@@ -0,0 +1,245 @@
+"""
+Pool de workers asíncronos que vacía la bandeja de salida ``outbox_envio``.
+
+Cada worker reclama lotes de trabajos con ``SELECT ... FOR UPDATE SKIP
+LOCKED``, de modo que varias réplicas pueden compartir la carga sin tomar
+el mismo trabajo dos veces. Al reclamar un trabajo se marca PROCESANDO con
+un plazo de visibilidad: si la réplica muere a mitad del envío, el trabajo
+vuelve a estar disponible cuando vence ese plazo.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from src.config.config import sessions
+from src.config.settings import settings
+from src.models.credenciales_model import CredencialesCorreo
+from src.models.outbox_envio import OutboxEnvio
+from src.services.log_writer import log_writer
+from src.services.outbox_service import evento_nuevo_trabajo
+from src.services.send_dinamyc_services import construir_mensaje
+from src.services.send_services import enviar_por_relay
+from src.services.smtp_transport import enviar_mensaje
+
+
+def _separar(valor: Optional[str]) -> List[str]:
+    return [v for v in valor.split(";") if v] if valor else []
+
+
+class OutboxWorkerPool:
+    """Conjunto de tareas asyncio que entregan los trabajos encolados."""
+
+    def __init__(
+        self,
+        workers: int = 2,
+        lote: int = 10,
+        intervalo: float = 1.0,
+        max_intentos: int = 5,
+        reintento_base: float = 30.0,
+        visibilidad: float = 300.0,
+    ):
+        self.workers = workers
+        self.lote = lote
+        self.intervalo = intervalo
+        self.max_intentos = max_intentos
+        self.reintento_base = reintento_base
+        self.visibilidad = visibilidad
+        self._tareas: List[asyncio.Task] = []
+        self._detener = asyncio.Event()
+
+    # --------------------------
+    # CICLO DE VIDA
+    # --------------------------
+    def iniciar(self) -> None:
+        self._detener.clear()
+        self._tareas = [
+            asyncio.create_task(self._ejecutar(), name=f"outbox-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def detener(self) -> None:
+        """Deja terminar los trabajos en curso y detiene los workers."""
+        self._detener.set()
+        evento_nuevo_trabajo().set()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas = []
+
+    async def _ejecutar(self) -> None:
+        despertar = evento_nuevo_trabajo()
+        while not self._detener.is_set():
+            try:
+                trabajos = await asyncio.to_thread(self._reclamar)
+            except Exception as e:
+                print(f"❌ Outbox: error al reclamar trabajos: {e}")
+                trabajos = []
+
+            for trabajo in trabajos:
+                await self._procesar(trabajo)
+
+            if len(trabajos) < self.lote:
+                # Cola vacía: esperar un nuevo trabajo o el siguiente sondeo
+                despertar.clear()
+                try:
+                    await asyncio.wait_for(despertar.wait(), timeout=self.intervalo)
+                except asyncio.TimeoutError:
+                    pass
+
+    # --------------------------
+    # ACCESO A BASE DE DATOS (en hilos)
+    # --------------------------
+    def _reclamar(self) -> List[dict]:
+        """Reclama un lote de trabajos disponibles y los marca PROCESANDO."""
+        db = sessions[0]()
+        try:
+            ahora = datetime.utcnow()
+            filas = (
+                db.query(OutboxEnvio)
+                .filter(
+                    OutboxEnvio.estado.in_(("PENDIENTE", "PROCESANDO")),
+                    OutboxEnvio.disponible_en <= ahora,
+                )
+                .order_by(OutboxEnvio.id)
+                .limit(self.lote)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            trabajos = []
+            for fila in filas:
+                fila.estado = "PROCESANDO"
+                fila.intentos = (fila.intentos or 0) + 1
+                fila.disponible_en = ahora + timedelta(seconds=self.visibilidad)
+                fila.fecha_actualizacion = ahora
+                trabajos.append({
+                    c.name: getattr(fila, c.name) for c in OutboxEnvio.__table__.columns
+                })
+            db.commit()
+            return trabajos
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _credencial(self, credenciales_id: int) -> dict:
+        db = sessions[0]()
+        try:
+            creds = (
+                db.query(CredencialesCorreo)
+                .filter(CredencialesCorreo.id == credenciales_id)
+                .first()
+            )
+            if not creds:
+                raise ValueError(f"No se encontraron credenciales con ID '{credenciales_id}'")
+            return {
+                "host": creds.client_id,
+                "port": creds.client_secret,
+                "user": creds.username,
+                "password": creds.tenant_id,
+            }
+        finally:
+            db.close()
+
+    def _finalizar(self, trabajo: dict, error: Optional[Exception]) -> None:
+        """Actualiza el estado del trabajo y registra el log de envío."""
+        db = sessions[0]()
+        try:
+            ahora = datetime.utcnow()
+            adjuntos = _separar(trabajo["adjuntos"])
+            if error is None:
+                cambios = {"estado": "ENVIADO", "detalle": "Correo enviado correctamente"}
+            elif trabajo["intentos"] < self.max_intentos:
+                espera = min(self.reintento_base * 2 ** (trabajo["intentos"] - 1), 3600)
+                cambios = {
+                    "estado": "PENDIENTE",
+                    "disponible_en": ahora + timedelta(seconds=espera),
+                    "detalle": str(error),
+                }
+            else:
+                cambios = {"estado": "ERROR", "detalle": str(error)}
+            cambios["fecha_actualizacion"] = ahora
+
+            # intentos identifica el reclamo: si venció el plazo de visibilidad y
+            # otra réplica volvió a reclamar el trabajo, el resultado es suyo
+            actualizados = db.query(OutboxEnvio).filter(
+                OutboxEnvio.id == trabajo["id"],
+                OutboxEnvio.estado == "PROCESANDO",
+                OutboxEnvio.intentos == trabajo["intentos"],
+            ).update(cambios, synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        if not actualizados:
+            print(f"⚠️ Outbox: el trabajo {trabajo['id']} fue reclamado de nuevo; no se registra este intento")
+            return
+        # Solo los resultados definitivos quedan en logs_envio
+        if cambios["estado"] in ("ENVIADO", "ERROR"):
+            log_writer.encolar(
+                destinatario=trabajo["destinatario"],
+                cc=trabajo["cc"],
+                bcc=trabajo["bcc"],
+                adjuntos=trabajo["adjuntos"],
+                num_adjuntos=len(adjuntos),
+                asunto=trabajo["asunto"],
+                contenido=trabajo["contenido"],
+                estado=cambios["estado"],
+                fecha_envio=ahora,
+                identificador=trabajo["identificador"],
+                detalle=cambios["detalle"],
+            )
+
+    # --------------------------
+    # ENTREGA
+    # --------------------------
+    async def _procesar(self, trabajo: dict) -> None:
+        error = None
+        try:
+            if trabajo["canal"] == "SMTP":
+                await self._entregar_smtp(trabajo)
+            else:
+                await enviar_por_relay(
+                    trabajo["destinatario"],
+                    trabajo["asunto"],
+                    trabajo["contenido"],
+                    _separar(trabajo["adjuntos"]),
+                )
+        except Exception as e:
+            error = e
+
+        try:
+            await asyncio.to_thread(self._finalizar, trabajo, error)
+        except Exception as e:
+            print(f"❌ Outbox: error al finalizar el trabajo {trabajo['id']}: {e}")
+
+    async def _entregar_smtp(self, trabajo: dict) -> None:
+        creds = await asyncio.to_thread(self._credencial, trabajo["credenciales_id"])
+        cc = _separar(trabajo["cc"])
+        bcc = _separar(trabajo["bcc"])
+        msg = await asyncio.to_thread(
+            construir_mensaje,
+            trabajo["remitente"] or creds["user"],
+            trabajo["destinatario"],
+            cc,
+            trabajo["asunto"],
+            trabajo["contenido"],
+            _separar(trabajo["adjuntos"]),
+        )
+        await enviar_mensaje(
+            trabajo["credenciales_id"], creds["host"], creds["port"],
+            creds["user"], creds["password"], msg,
+            from_addr=creds["user"], to_addrs=[trabajo["destinatario"]] + cc + bcc,
+        )
+
+
+# Instancia global del pool de workers
+outbox_workers = OutboxWorkerPool(
+    workers=settings.outbox_workers,
+    lote=settings.outbox_lote,
+    intervalo=settings.outbox_intervalo,
+    max_intentos=settings.outbox_max_intentos,
+    reintento_base=settings.outbox_reintento_base,
+    visibilidad=settings.outbox_visibilidad,
+)
@@ -0,0 +1,51 @@
+"""
+Cliente HTTP asíncrono compartido para el servicio externo de correo
+(serviciostic.net).
+
+Un único ``httpx.AsyncClient`` por proceso mantiene las conexiones TLS
+abiertas (keep-alive) entre envíos, en lugar de abrir una conexión nueva
+por cada correo. Se crea bajo demanda y se cierra al apagar la aplicación.
+"""
+from typing import Optional
+
+import httpx
+
+from ..config.settings import settings
+
+_cliente: Optional[httpx.AsyncClient] = None
+
+
+def _http2_disponible() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def obtener_cliente_relay() -> httpx.AsyncClient:
+    """Devuelve el cliente compartido, creándolo en el primer uso."""
+    global _cliente
+    if _cliente is None or _cliente.is_closed:
+        http2 = settings.relay_http2 and _http2_disponible()
+        if settings.relay_http2 and not http2:
+            print("⚠️ RELAY_HTTP2 activo pero el paquete 'h2' no está instalado; se usa HTTP/1.1")
+        _cliente = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.relay_timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.relay_max_conexiones,
+                max_keepalive_connections=settings.relay_max_keepalive,
+                keepalive_expiry=settings.relay_keepalive_expiry,
+            ),
+            http2=http2,
+            verify=True,  # fuerza HTTPS válido
+        )
+    return _cliente
+
+
+async def cerrar_cliente_relay() -> None:
+    """Cierra el cliente compartido y sus conexiones (usado al apagar)."""
+    global _cliente
+    if _cliente is not None:
+        await _cliente.aclose()
+        _cliente = None
@@ -1,21 +1,56 @@
 import asyncio
 import re
-import shutil
-import smtplib
 from datetime import datetime
-from pathlib import Path
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
+from typing import List, Optional, Tuple
 import httpx
-from fastapi import HTTPException
+from fastapi import HTTPException, UploadFile
 from sqlalchemy.orm import Session
 
-from src.models.credenciales_model import CredencialesCorreo
-from src.models.logs_envio import LogsEnvio
-from src.models.plantilla_model import Plantillas
 from src.models.smtp_model import EmailRequest
 from src.config.config import URL_API_STORAGE
+from src.config.settings import settings
+from src.services.attachment_store import attachment_store
+from src.services.contexto_envio_cache import obtener_contexto_envio, obtener_contexto_envio_async
+from src.services.log_writer import log_writer
+from src.services.mime_stream import AdjuntoStreaming, MensajeStreaming
+from src.services.outbox_service import encolar_envio
+from src.services.smtp_transport import enviar_mensaje
+from src.services.storage_service import StorageService
+from src.services.template_engine import render_template, renderizar_plantilla
+from src.utils.exceptions import StorageError
+
+# Contenedor de Azure Storage donde se suben los adjuntos del formulario
+CONTENEDOR_ADJUNTOS = "files"
+
+
+def validar_email(email: str) -> bool:
+    """Valida sintaxis de email"""
+    patron = r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$"
+    return re.match(patron, email) is not None
+
+
+def construir_mensaje(
+    remitente: str,
+    destinatario: str,
+    cc: List[str],
+    asunto: str,
+    contenido_html: str,
+    rutas_adjuntos: List[str],
+) -> MensajeStreaming:
+    """
+    Construye el mensaje MIME adjuntando los adjuntos locales existentes.
+
+    Los adjuntos no se cargan en memoria: se leen desde el almacén local y
+    se codifican por bloques mientras se transmite el mensaje.
+    """
+    adjuntos = []
+    # 📎 Adjuntos del almacén local (referencias sha256 o rutas)
+    for ruta in rutas_adjuntos:
+        resuelto = attachment_store.resolver(ruta)
+        if resuelto:
+            ruta_path, nombre = resuelto
+            adjuntos.append(AdjuntoStreaming(ruta_path, nombre))
+    return MensajeStreaming(remitente, destinatario, cc, asunto, contenido_html, adjuntos)
 
 
 class SendDinamycO365Service:
@@ -23,60 +58,167 @@ class SendDinamycO365Service:
         self.db = db
         self.token  = tokenpayload
         # self.token = tokenpayload.get("token") if tokenpayload else None
+        self.identifying_name = req.identifying_name
+        self.plantilla = None
+
+    async def _cargar_contexto(self) -> None:
+        """Plantilla y credenciales (en caché; sin consultas en caliente)."""
+        if self.plantilla is not None:
+            return
+        if settings.db_async:
+            contexto = await obtener_contexto_envio_async(self.identifying_name)
+        else:
+            contexto = obtener_contexto_envio(self.db, self.identifying_name)
+        creds = contexto.credencial
 
-        # Buscar plantilla
-        plantilla = (
-            db.query(Plantillas)
-            .filter(Plantillas.identifying_name == req.identifying_name)
-            .first()
-        )
-        if not plantilla:
+        # Configuración SMTP
+        self.credencial_id = creds.id
+        self.host = creds.host
+        self.port = creds.port
+        self.user = creds.user
+        self.password = creds.password
+        self.plantilla = contexto.plantilla
+
+    def validar_email(self, email: str) -> bool:
+        """Valida sintaxis de email"""
+        return validar_email(email)
+
+    async def _subir_adjuntos(self, adjuntos: List[UploadFile]) -> Tuple[List[str], List[str]]:
+        """
+        Sube los adjuntos en paralelo (a lo sumo ``adjuntos_concurrencia`` a la
+        vez) y devuelve ``(referencias, urls)`` en el mismo orden en que
+        llegaron: las referencias del almacén local son las que se adjuntan al
+        mensaje y se guardan en la bandeja de salida; las URLs de Blob Storage
+        solo se registran. Si alguno falla se responde con el detalle de cada
+        archivo fallido.
+        """
+        semaforo = asyncio.Semaphore(max(1, settings.adjuntos_concurrencia))
+
+        async def con_limite(subir, adj: UploadFile, *args) -> Tuple[str, Optional[str]]:
+            async with semaforo:
+                return await subir(adj, *args)
+
+        if settings.adjuntos_subida == "remoto":
+            # Un solo cliente con keep-alive para todos los adjuntos del envío
+            timeout = httpx.Timeout(30.0, connect=10.0)
+            limits = httpx.Limits(max_connections=max(1, settings.adjuntos_concurrencia))
+            async with httpx.AsyncClient(
+                verify=settings.adjuntos_verificar_tls, timeout=timeout, limits=limits
+            ) as client:
+                resultados = await asyncio.gather(
+                    *(con_limite(self._subir_adjunto_remoto, adj, client) for adj in adjuntos),
+                    return_exceptions=True,
+                )
+        else:
+            resultados = await asyncio.gather(
+                *(con_limite(self._subir_adjunto_local, adj) for adj in adjuntos),
+                return_exceptions=True,
+            )
+
+        errores = []
+        for adj, resultado in zip(adjuntos, resultados):
+            if isinstance(resultado, HTTPException):
+                errores.append({
+                    "archivo": adj.filename,
+                    "status": resultado.status_code,
+                    "detalle": resultado.detail,
+                })
+            elif isinstance(resultado, BaseException):
+                errores.append({"archivo": adj.filename, "status": 500, "detalle": str(resultado)})
+        if errores:
+            codigos = {e["status"] for e in errores}
             raise HTTPException(
-                status_code=404,
-                detail=f"No se encontró la plantilla '{req.identifying_name}'",
+                status_code=codigos.pop() if len(codigos) == 1 else 500,
+                detail={
+                    "mensaje": f"Error al subir {len(errores)} de {len(adjuntos)} adjuntos",
+                    "errores": errores,
+                },
             )
 
-        # Buscar credenciales asociadas
-        creds = (
-            db.query(CredencialesCorreo)
-            .filter(CredencialesCorreo.id == plantilla.credenciales_id)
-            .first()
+        # El orden de los adjuntos se conserva (gather devuelve en orden)
+        referencias = [referencia for referencia, _ in resultados]
+        urls = [url for _, url in resultados if url]
+        return referencias, urls
+
+    async def _subir_adjunto_local(self, adj: UploadFile) -> Tuple[str, Optional[str]]:
+        """Sube un adjunto llamando a StorageService en el mismo proceso."""
+        # Copia local direccionada por contenido, leída por bloques del
+        # archivo temporal de la subida (sin cargarlo entero en memoria)
+        guardado = await asyncio.to_thread(
+            attachment_store.guardar_flujo, adj.file, adj.filename
         )
-        if not creds:
+
+        try:
+            with open(guardado.ruta, "rb") as contenido:
+                resultado = await StorageService.upload_stream(
+                    contenido,
+                    adj.filename,
+                    adj.content_type or "application/octet-stream",
+                    CONTENEDOR_ADJUNTOS,
+                )
+        except StorageError as e:
+            raise HTTPException(status_code=500, detail=f"Error al subir {adj.filename}: {e}")
+
+        # Referencia local (hash) y URL del blob
+        return guardado.referencia, resultado.url
+
+    async def _subir_adjunto_remoto(self, adj: UploadFile, client: httpx.AsyncClient) -> Tuple[str, Optional[str]]:
+        """Sube un adjunto por HTTP al servicio de archivos (URL_API_STORAGE)."""
+        # Copia local direccionada por contenido (se escribe solo si ese
+        # contenido no existe); la subida se hace en streaming desde ella
+        guardado = await asyncio.to_thread(
+            attachment_store.guardar_flujo, adj.file, adj.filename
+        )
+
+        try:
+            with open(guardado.ruta, "rb") as contenido:
+                # Armamos el payload para el servicio externo
+                files = {
+                    "file": (adj.filename, contenido, adj.content_type),
+                    "container": (None, CONTENEDOR_ADJUNTOS),
+                }
+
+                # Enviamos el archivo al servicio de almacenamiento externo
+                response = await client.post(
+                    URL_API_STORAGE,
+                    files=files,
+                    headers={"Authorization": f"Bearer {self.token}"} if self.token else {}
+                )
+        except httpx.TransportError as e:
+            # Captura cualquier error SSL o conexión caída
             raise HTTPException(
-                status_code=404,
-                detail=f"No se encontraron credenciales con ID '{plantilla.credenciales_id}'",
+                status_code=500,
+                detail=f"Error de conexión al subir {adj.filename}: {str(e)}"
             )
 
-        # Configuración SMTP
-        self.host = creds.client_id 
-        self.port = creds.client_secret 
-        self.user = creds.username
-        self.password = creds.tenant_id
-        self.plantilla = plantilla
+        # Verificamos el resultado
+        if response.status_code not in (200, 201, 202):
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Error al subir {adj.filename}: {response.text}",
+            )
 
-    def validar_email(self, email: str) -> bool:
-        """Valida sintaxis de email"""
-        patron = r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$"
-        return re.match(patron, email) is not None
+        data = response.json()
+        # /files/upload responde FileUploadResponse (url)
+        return guardado.referencia, data.get("ruta") or data.get("url")
+
+    async def send(self, req: EmailRequest, encolar: bool = False) -> dict:
+        """
+        Envía correo usando SMTP y registra log.
+
+        Si ``encolar`` es True el mensaje renderizado se guarda en la bandeja
+        de salida y la entrega la realiza un worker en segundo plano.
+        """
+        await self._cargar_contexto()
 
-    async def send(self, req: EmailRequest) -> dict:
-        """Envía correo usando SMTP y registra log"""
         async def build_and_send():
             try:
-                # Construcción del correo
-                msg = MIMEMultipart()
-                msg["From"] = self.user
-                msg["To"] = req.to
-                msg["Subject"] = req.subject
-
                 # Validación básica
                 if not self.validar_email(req.to):
                     raise HTTPException(status_code=400, detail=f"Correo inválido en TO: {req.to}")
 
                 if req.cc:
                     valid_cc = [c for c in req.cc if c and self.validar_email(c)]
-                    msg["Cc"] = ", ".join(valid_cc)
                 else:
                     valid_cc = []
 
@@ -89,114 +231,63 @@ class SendDinamycO365Service:
                 contenido_html = self.plantilla.content_html or req.body_html
 
                 if isinstance(req.body_html, dict):
-                    contenido_html = self.render_template(self.plantilla.content_html, req.body_html)
-
-                msg.attach(MIMEText(contenido_html, "html", "utf-8"))
+                    contenido_html = renderizar_plantilla(self.plantilla, req.body_html)
                 
                 
-                FILES_SERVICE_URL = URL_API_STORAGE
-
-                UPLOAD_DIR = Path("uploads/adjuntos")
-                today_dir = UPLOAD_DIR / datetime.today().strftime("%Y-%m-%d")
-                today_dir.mkdir(parents=True, exist_ok=True)
-
-                adjuntos_guardados = []
+                adjuntos_guardados, urls_adjuntos = [], []
 
                 if req.adjuntos:
-                    timeout = httpx.Timeout(30.0, connect=10.0)  # evita cierres abruptos
-                    limits = httpx.Limits(max_keepalive_connections=0, max_connections=10)
-                    try:
-                        async with httpx.AsyncClient(verify=False, timeout=timeout, limits=limits) as client:
-                            for adj in req.adjuntos:
-                                # Leemos los bytes del archivo adjunto
-                                file_bytes = await adj.read()
-
-                                # Armamos el payload para el servicio externo
-                                files = {
-                                    "file": (adj.filename, file_bytes, adj.content_type),
-                                    "container": (None, "files"),
-                                }
-                                
-
-                                # Enviamos el archivo al servicio de almacenamiento externo
-                                response = await client.post(
-                                    FILES_SERVICE_URL,
-                                    files=files,
-                                    headers={"Authorization": f"Bearer {self.token}"} if self.token else {}
-                                )
-
-                                # Verificamos el resultado
-                                if response.status_code not in (200, 201, 202):
-                                    raise HTTPException(
-                                        status_code=response.status_code,
-                                        detail=f"Error al subir {adj.filename}: {response.text}",
-                                    )
-
-
-                                data = response.json()
-                                ruta_remota = data.get("ruta")
-
-                                # Guardamos la ruta remota si la hay
-                                if ruta_remota:
-                                    adjuntos_guardados.append(ruta_remota)
-
-                                # Además, guardamos una copia local
-                                destino = today_dir / adj.filename
-                                with open(destino, "wb") as buffer:
-                                    buffer.write(file_bytes)
-
-                                # También registramos la ruta local
-                                adjuntos_guardados.append(str(destino))
-                            
-                            # 📎 Adjuntar archivos locales al correo
-                        for ruta in adjuntos_guardados:
-                            ruta_path = Path(ruta)
-                            if ruta_path.exists():
-                                with open(ruta_path, "rb") as f:
-                                    part = MIMEApplication(f.read(), Name=ruta_path.name)
-                                part["Content-Disposition"] = f'attachment; filename="{ruta_path.name}"'
-                                msg.attach(part)
-                    except httpx.TransportError as e:
-                        # Captura cualquier error SSL o conexión caída
-                        raise HTTPException(
-                            status_code=500,
-                            detail=f"Error de conexión al subir archivos: {str(e)}"
-                        )
-
-                    finally:
-                        #  Esperar pequeño retardo antes de cerrar el cliente HTTP
-                        await asyncio.sleep(0.1)
-
-
-                            
-                            
-                            
-
-                # Envío SMTP
-                with smtplib.SMTP(self.host, self.port) as server:
-                    server.starttls()
-                    server.login(self.user, self.password)
-                    server.send_message(msg, from_addr=self.user, to_addrs=[req.to] + valid_cc + valid_bcc)
+                    # Subida concurrente, en proceso o vía HTTP según ADJUNTOS_SUBIDA
+                    adjuntos_guardados, urls_adjuntos = await self._subir_adjuntos(req.adjuntos)
+
+
+                if encolar:
+                    # Guardar el mensaje renderizado en la bandeja de salida
+                    trabajo = await encolar_envio(
+                        self.db,
+                        canal="SMTP",
+                        credenciales_id=self.credencial_id,
+                        remitente=self.user,
+                        destinatario=req.to,
+                        cc=valid_cc,
+                        bcc=valid_bcc,
+                        adjuntos=adjuntos_guardados,
+                        asunto=req.subject,
+                        contenido=contenido_html,
+                        identificador=req.identifying_name,
+                    )
+                    return trabajo.id
+
+                msg = construir_mensaje(
+                    self.user, req.to, valid_cc, req.subject, contenido_html, adjuntos_guardados
+                )
+
+                # Envío SMTP fuera del event loop, con sesión reutilizada del pool
+                await enviar_mensaje(
+                    self.credencial_id, self.host, self.port, self.user, self.password,
+                    msg, from_addr=self.user, to_addrs=[req.to] + valid_cc + valid_bcc,
+                )
 
                 # Log de éxito
-                log = LogsEnvio(
+                log_writer.encolar(
                     destinatario=req.to,
                     cc=";".join(valid_cc) if valid_cc else None,
                     bcc=";".join(valid_bcc) if valid_bcc else None,
                     adjuntos=";".join(adjuntos_guardados) if adjuntos_guardados else None,
-                    num_adjuntos=len(adjuntos_guardados),
+                    num_adjuntos=len(req.adjuntos or []),
                     asunto=req.subject,
                     contenido=contenido_html,
                     estado="ENVIADO",
                     fecha_envio=datetime.utcnow(),
                     identificador=req.identifying_name,
-                    detalle="Correo enviado correctamente",
+                    detalle=(
+                        "Correo enviado correctamente"
+                        + (f". Adjuntos en Blob Storage: {'; '.join(urls_adjuntos)}" if urls_adjuntos else "")
+                    ),
                 )
-                self.db.add(log)
-                self.db.commit()
 
             except Exception as e:
-                log = LogsEnvio(
+                log_writer.encolar(
                     destinatario=req.to,
                     asunto=req.subject,
                     contenido=str(req.body_html),
@@ -205,29 +296,13 @@ class SendDinamycO365Service:
                     identificador=req.identifying_name,
                     detalle=str(e),
                 )
-                self.db.add(log)
-                self.db.commit()
                 raise
 
-        await build_and_send()
+        trabajo_id = await build_and_send()
+        if encolar:
+            return {"status": "Encolado", "to": req.to, "job_id": trabajo_id}
         return {"status": "Procesado", "to": req.to}
 
     def render_template(self, template: str, variables: dict) -> str:
         """Renderiza plantilla HTML reemplazando {{campo}} o {{etiqueta}}"""
-        def dict_to_html(data: dict) -> str:
-            html = "<ul>"
-            for k, v in data.items():
-                if isinstance(v, dict):
-                    html += f"<li><strong>{k}:</strong> {dict_to_html(v)}</li>"
-                else:
-                    html += f"<li><strong>{k}:</strong> {v}</li>"
-            html += "</ul>"
-            return html
-
-        def replace_var(match):
-            expr = match.group(1).strip()
-            if expr == "etiqueta":
-                return dict_to_html(variables)
-            return str(variables.get(expr, f"{{{{{expr}}}}}"))
-
-        return re.sub(r"{{\s*(.*?)\s*}}", replace_var, template)
+        return render_template(template, variables)
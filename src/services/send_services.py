@@ -225,54 +225,102 @@
 
 
 
+import asyncio
 import re
-import shutil
 from datetime import datetime
 from pathlib import Path
+from typing import List
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
 
-import requests
+import httpx
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
-from src.models.credenciales_model import CredencialesCorreo
-from src.models.logs_envio import LogsEnvio
-from src.models.plantilla_model import Plantillas
+from src.config.settings import settings
 from src.models.smtp_model_basic import EmailRequest
+from src.services.attachment_store import attachment_store
+from src.services.contexto_envio_cache import obtener_contexto_envio, obtener_contexto_envio_async
+from src.services.log_writer import log_writer
+from src.services.outbox_service import encolar_envio
+from src.services.relay_client import obtener_cliente_relay
+from src.services.template_engine import render_template, renderizar_plantilla
+
+
+def _leer_adjuntos(rutas_adjuntos: List[str]) -> dict:
+    """Lee los adjuntos del almacén (síncrono; se ejecuta en un hilo)."""
+    files = {}
+    for ruta in rutas_adjuntos or []:
+        resuelto = attachment_store.resolver(ruta)
+        if resuelto:
+            path, nombre = resuelto
+            files[nombre] = (nombre, path.read_bytes())
+    return files
+
+
+async def enviar_por_relay(para: str, asunto: str, mensaje: str, rutas_adjuntos: List[str]):
+    """
+    Envía el correo a través del servicio externo serviciostic.net usando el
+    cliente HTTP asíncrono compartido. Los adjuntos se leen de disco en un
+    hilo: httpx lee los archivos del multipart de forma síncrona, lo que
+    bloquearía el event loop.
+    """
+    data = {
+        "para": para,
+        "asunto": asunto,
+        "mensaje": mensaje,
+    }
+
+    files = await asyncio.to_thread(_leer_adjuntos, rutas_adjuntos)
+    try:
+        respuesta = await obtener_cliente_relay().post(
+            settings.relay_url,
+            data=data,
+            files=files if files else None,
+        )
 
+        if respuesta.status_code != 200:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error en servicio externo: {respuesta.text}",
+            )
 
-class SmtpEmailService:
-    def __init__(self, db: Session, req: EmailRequest):
-        self.db = db
+    except httpx.ConnectError:
+        raise HTTPException(
+            status_code=500,
+            detail="No se pudo conectar con el servicio externo (posible red bloqueada en Render).",
+        )
 
-        # Buscar plantilla
-        plantilla = (
-            self.db.query(Plantillas)
-            .filter(Plantillas.identifying_name == req.identifying_name)
-            .first()
+    except httpx.TimeoutException:
+        raise HTTPException(
+            status_code=500,
+            detail="Tiempo de espera excedido al contactar el servicio externo.",
         )
-        if not plantilla:
-            raise HTTPException(
-                status_code=404,
-                detail=f"No se encontró la plantilla '{req.identifying_name}'",
-            )
 
-        # Buscar credenciales (solo para log)
-        creds = (
-            self.db.query(CredencialesCorreo)
-            .filter(CredencialesCorreo.id == plantilla.credenciales_id)
-            .first()
+    except httpx.HTTPError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error de red al conectar con el servicio externo: {str(e)}",
         )
-        if not creds:
-            raise HTTPException(
-                status_code=404,
-                detail=f"No se encontraron credenciales con ID '{plantilla.credenciales_id}'",
-            )
 
-        self.user = creds.username
-        self.plantilla = plantilla
+
+class SmtpEmailService:
+    def __init__(self, db: Session, req: EmailRequest):
+        self.db = db
+        self.identifying_name = req.identifying_name
+        self.plantilla = None
+
+    async def _cargar_contexto(self) -> None:
+        """Plantilla y credenciales (en caché; las credenciales solo se usan para el log)."""
+        if self.plantilla is not None:
+            return
+        if settings.db_async:
+            contexto = await obtener_contexto_envio_async(self.identifying_name)
+        else:
+            contexto = obtener_contexto_envio(self.db, self.identifying_name)
+        self.user = contexto.credencial.user
+        self.plantilla = contexto.plantilla
 
     # --------------------------
     # MÉTODOS AUXILIARES
@@ -283,47 +331,18 @@ class SmtpEmailService:
 
     def render_template(self, template: str, variables: dict) -> str:
         """Reemplaza variables tipo {{campo}} o {{etiqueta.algo}}"""
-
-        def dict_to_html(data: dict) -> str:
-            html = "<ul>"
-            for k, v in data.items():
-                if isinstance(v, dict):
-                    html += f"<li><strong>{k}:</strong> {dict_to_html(v)}</li>"
-                else:
-                    html += f"<li><strong>{k}:</strong> {v}</li>"
-            html += "</ul>"
-            return html
-
-        def resolve_path(data: dict, path: str):
-            value = data
-            for part in path.split("."):
-                if isinstance(value, dict) and part in value:
-                    value = value[part]
-                else:
-                    return None
-            return value
-
-        def replace_var(match):
-            expr = match.group(1).strip()
-            if expr == "etiqueta":
-                return dict_to_html(variables)
-            if expr.startswith("etiqueta."):
-                path = expr.split(".", 1)[1]
-                val = resolve_path(variables, path)
-                return str(val) if val is not None else f"{{{{{expr}}}}}"
-            if expr in variables:
-                return str(variables[expr])
-            return f"{{{{{expr}}}}}"
-
-        return re.sub(r"{{\s*(.*?)\s*}}", replace_var, template)
+        return render_template(template, variables)
 
     # --------------------------
     # MÉTODO PRINCIPAL (Render-compatible)
     # --------------------------
-    async def send(self, req: EmailRequest) -> dict:
-        """Envía correo usando servicio externo, compatible con Render (sin asyncio.to_thread)."""
+    async def send(self, req: EmailRequest, encolar: bool = False) -> dict:
+        """Envía correo usando el servicio externo (HTTP asíncrono; el trabajo de disco, en hilos)."""
+        await self._cargar_contexto()
         try:
-            self.build_and_send(req)
+            trabajo_id = await self.build_and_send(req, encolar)
+            if encolar:
+                return {"status": "Encolado", "to": req.to, "job_id": trabajo_id}
             return {"status": "Procesado", "to": req.to}
         except HTTPException:
             raise
@@ -333,17 +352,20 @@ class SmtpEmailService:
     # --------------------------
     # ENVÍO REAL + LOGS
     # --------------------------
-    def build_and_send(self, req: EmailRequest):
-        """Ejecuta el envío y guarda logs. Maneja errores de red en Render."""
+    async def build_and_send(self, req: EmailRequest, encolar: bool = False):
+        """
+        Ejecuta el envío y guarda logs. Maneja errores de red en Render.
+
+        Con ``encolar`` guarda el mensaje en la bandeja de salida y devuelve
+        el id del trabajo en lugar de llamar al servicio externo.
+        """
         try:
             # Preparar contenido HTML
             contenido_html = (
                 self.plantilla.content_html if self.plantilla else req.body_html
             )
             if isinstance(req.body_html, dict):
-                contenido_html = self.render_template(
-                    self.plantilla.content_html, req.body_html
-                )
+                contenido_html = renderizar_plantilla(self.plantilla, req.body_html)
 
             # Validar correo destino
             if not self.validar_email(req.to):
@@ -360,13 +382,8 @@ class SmtpEmailService:
                 msg["Bcc"] = ", ".join(req.bcc)
             msg.attach(MIMEText(contenido_html, "html"))
 
-            # Procesar adjuntos
-            UPLOAD_DIR = Path("uploads/adjuntos")
-            today_dir = UPLOAD_DIR / datetime.today().strftime("%Y-%m-%d")
-            today_dir.mkdir(parents=True, exist_ok=True)
-
+            # Procesar adjuntos (almacén por contenido: cada archivo único se copia una vez)
             adjuntos_guardados = []
-            files = {}
 
             if req.adjuntos:
                 for adj in req.adjuntos:
@@ -374,54 +391,31 @@ class SmtpEmailService:
                     if not path.exists():
                         print(f"Adjunto no encontrado: {adj}")
                         continue
-                    destino = today_dir / path.name
-                    shutil.copy(path, destino)
-                    adjuntos_guardados.append(str(destino))
-                    files[path.name] = open(path, "rb")
-
-            # Enviar usando API externa
-            url = "https://email.serviciostic.net/"
-            data = {
-                "para": req.to,
-                "asunto": req.subject,
-                "mensaje": contenido_html,
-            }
-
-            try:
-                respuesta = requests.post(
-                    url,
-                    data=data,
-                    files=files if files else None,
-                    timeout=15,  # evita bloqueos
-                    verify=True,  # fuerza HTTPS válido
+                    # Hash SHA-256 + copia del archivo: fuera del event loop
+                    guardado = await asyncio.to_thread(attachment_store.guardar_archivo, str(path))
+                    adjuntos_guardados.append(guardado.referencia)
+
+            if encolar:
+                # Guardar el mensaje renderizado en la bandeja de salida
+                trabajo = await encolar_envio(
+                    self.db,
+                    canal="RELAY",
+                    remitente=self.user,
+                    destinatario=req.to,
+                    cc=req.cc,
+                    bcc=req.bcc,
+                    adjuntos=adjuntos_guardados,
+                    asunto=req.subject,
+                    contenido=contenido_html,
+                    identificador=req.identifying_name,
                 )
+                return trabajo.id
 
-                if respuesta.status_code != 200:
-                    raise HTTPException(
-                        status_code=500,
-                        detail=f"Error en servicio externo: {respuesta.text}",
-                    )
-
-            except requests.exceptions.ConnectionError:
-                raise HTTPException(
-                    status_code=500,
-                    detail="No se pudo conectar con el servicio externo (posible red bloqueada en Render).",
-                )
-
-            except requests.exceptions.Timeout:
-                raise HTTPException(
-                    status_code=500,
-                    detail="Tiempo de espera excedido al contactar el servicio externo.",
-                )
-
-            except requests.exceptions.RequestException as e:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Error de red al conectar con el servicio externo: {str(e)}",
-                )
+            # Enviar usando API externa
+            await enviar_por_relay(req.to, req.subject, contenido_html, adjuntos_guardados)
 
             # Guardar log exitoso
-            log = LogsEnvio(
+            log_writer.encolar(
                 destinatario=req.to,
                 cc=";".join(req.cc) if req.cc else None,
                 bcc=";".join(req.bcc) if req.bcc else None,
@@ -434,14 +428,12 @@ class SmtpEmailService:
                 identificador=req.identifying_name,
                 detalle=f"Correo enviado correctamente (serviciostic.net)",
             )
-            self.db.add(log)
-            self.db.commit()
 
         except HTTPException:
             raise
         except Exception as e:
             # Guardar log de error
-            log = LogsEnvio(
+            log_writer.encolar(
                 destinatario=req.to,
                 asunto=req.subject,
                 contenido=str(req.body_html),
@@ -450,6 +442,4 @@ class SmtpEmailService:
                 identificador=req.identifying_name,
                 detalle=str(e),
             )
-            self.db.add(log)
-            self.db.commit()
             raise HTTPException(status_code=500, detail=f"Error al enviar correo: {e}")
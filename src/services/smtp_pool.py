@@ -0,0 +1,230 @@
+"""
+Pool de sesiones SMTP autenticadas y reutilizables por credencial.
+
+Cada conexión SMTP contra Office 365 paga conexión TCP, STARTTLS y LOGIN,
+lo que supone varios cientos de milisegundos por envío. Este pool mantiene
+abiertas las sesiones ya autenticadas, agrupadas por credencial, y las
+entrega "en caliente" a cada envío.
+"""
+import smtplib
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Hashable, Iterator, Tuple
+
+from ..config.settings import settings
+
+
+class SmtpPoolError(Exception):
+    """
+    Excepción para errores del pool de sesiones SMTP (p. ej. tiempo de
+    espera agotado al solicitar una sesión).
+    """
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+
+class _SesionSmtp:
+    """Sesión SMTP autenticada junto con sus marcas de tiempo."""
+
+    __slots__ = ("smtp", "creada", "ultimo_uso")
+
+    def __init__(self, smtp: smtplib.SMTP):
+        ahora = time.monotonic()
+        self.smtp = smtp
+        self.creada = ahora
+        self.ultimo_uso = ahora
+
+
+class SmtpConnectionPool:
+    """
+    Pool de sesiones SMTP autenticadas agrupadas por credencial.
+
+    - Limita el número de sesiones simultáneas por credencial.
+    - Verifica las sesiones inactivas con NOOP antes de entregarlas.
+    - Descarta las sesiones inactivas demasiado tiempo o demasiado antiguas.
+
+    Es seguro para uso desde varios hilos.
+    """
+
+    def __init__(
+        self,
+        max_por_credencial: int = 4,
+        max_inactividad: float = 60.0,
+        max_vida: float = 600.0,
+        timeout_espera: float = 30.0,
+        timeout_conexion: float = 30.0,
+        usar_starttls: bool = True,
+    ):
+        self.max_por_credencial = max_por_credencial
+        self.max_inactividad = max_inactividad
+        self.max_vida = max_vida
+        self.timeout_espera = timeout_espera
+        self.timeout_conexion = timeout_conexion
+        self.usar_starttls = usar_starttls
+
+        self._cond = threading.Condition()
+        self._libres: Dict[Tuple, Deque[_SesionSmtp]] = defaultdict(deque)
+        self._abiertas: Dict[Tuple, int] = defaultdict(int)
+
+    # --------------------------
+    # API PÚBLICA
+    # --------------------------
+    @contextmanager
+    def sesion(
+        self, credencial_id: Hashable, host: str, port, user: str, password: str
+    ) -> Iterator[smtplib.SMTP]:
+        """
+        Entrega una sesión SMTP autenticada para la credencial indicada.
+
+        La sesión se devuelve al pool al salir del bloque; si ocurre un
+        error durante su uso se cierra y se descarta.
+        """
+        # El usuario y la contraseña forman parte de la clave para que una
+        # credencial actualizada no reutilice sesiones abiertas con la anterior
+        clave = (credencial_id, host, str(port), user, hash(password))
+        sesion = self._adquirir(clave, host, port, user, password)
+        try:
+            yield sesion.smtp
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+            # Rechazo del servidor: la conexión sigue siendo válida tras un RSET
+            if self._reiniciar(sesion):
+                self._liberar(clave, sesion)
+            else:
+                self._descartar(clave, sesion)
+            raise
+        except BaseException:
+            self._descartar(clave, sesion)
+            raise
+        else:
+            self._liberar(clave, sesion)
+
+    def cerrar_todas(self) -> None:
+        """Cierra todas las sesiones inactivas del pool (usado al apagar)."""
+        with self._cond:
+            pendientes = []
+            for clave, libres in self._libres.items():
+                self._abiertas[clave] -= len(libres)
+                pendientes.extend(libres)
+                libres.clear()
+            self._cond.notify_all()
+        for sesion in pendientes:
+            self._cerrar(sesion)
+
+    def estadisticas(self) -> dict:
+        """Devuelve el número de sesiones abiertas e inactivas por credencial."""
+        with self._cond:
+            return {
+                str(clave[0]): {
+                    "abiertas": self._abiertas[clave],
+                    "libres": len(self._libres[clave]),
+                }
+                for clave in self._abiertas
+                if self._abiertas[clave]
+            }
+
+    # --------------------------
+    # MÉTODOS AUXILIARES
+    # --------------------------
+    def _adquirir(self, clave, host, port, user, password) -> _SesionSmtp:
+        limite = time.monotonic() + self.timeout_espera
+        while True:
+            candidata = None
+            crear = False
+            with self._cond:
+                while True:
+                    libres = self._libres[clave]
+                    if libres:
+                        candidata = libres.pop()  # LIFO: la más reciente está más "caliente"
+                        break
+                    if self._abiertas[clave] < self.max_por_credencial:
+                        self._abiertas[clave] += 1
+                        crear = True
+                        break
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        raise SmtpPoolError(
+                            f"Tiempo de espera agotado para obtener una sesión SMTP ({host}:{port})"
+                        )
+                    self._cond.wait(restante)
+
+            if crear:
+                try:
+                    return _SesionSmtp(self._conectar(host, port, user, password))
+                except BaseException:
+                    with self._cond:
+                        self._abiertas[clave] -= 1
+                        self._cond.notify()
+                    raise
+
+            # Validar la sesión inactiva fuera del candado
+            if self._vigente(candidata):
+                return candidata
+            self._descartar(clave, candidata)
+
+    def _liberar(self, clave, sesion: _SesionSmtp) -> None:
+        sesion.ultimo_uso = time.monotonic()
+        with self._cond:
+            self._libres[clave].append(sesion)
+            self._cond.notify()
+
+    def _descartar(self, clave, sesion: _SesionSmtp) -> None:
+        with self._cond:
+            self._abiertas[clave] -= 1
+            self._cond.notify()
+        self._cerrar(sesion)
+
+    def _vigente(self, sesion: _SesionSmtp) -> bool:
+        """Evalúa antigüedad e inactividad y, si procede, hace un NOOP."""
+        ahora = time.monotonic()
+        if ahora - sesion.creada > self.max_vida:
+            return False
+        if ahora - sesion.ultimo_uso > self.max_inactividad:
+            return False
+        try:
+            codigo, _ = sesion.smtp.noop()
+            return codigo == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _reiniciar(sesion: _SesionSmtp) -> bool:
+        try:
+            codigo, _ = sesion.smtp.rset()
+            return codigo == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _conectar(self, host, port, user, password) -> smtplib.SMTP:
+        server = smtplib.SMTP(host, port, timeout=self.timeout_conexion)
+        try:
+            if self.usar_starttls:
+                server.starttls()
+            server.login(user, password)
+        except BaseException:
+            self._cerrar_smtp(server)
+            raise
+        return server
+
+    def _cerrar(self, sesion: _SesionSmtp) -> None:
+        self._cerrar_smtp(sesion.smtp)
+
+    @staticmethod
+    def _cerrar_smtp(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+
+# Instancia global del pool
+smtp_pool = SmtpConnectionPool(
+    max_por_credencial=settings.smtp_pool_max_por_credencial,
+    max_inactividad=settings.smtp_pool_max_inactividad,
+    max_vida=settings.smtp_pool_max_vida,
+    timeout_espera=settings.smtp_pool_timeout_espera,
+    timeout_conexion=settings.smtp_timeout,
+    usar_starttls=settings.smtp_starttls,
+)
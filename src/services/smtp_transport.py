@@ -0,0 +1,108 @@
+"""
+Transporte SMTP no bloqueante para los servicios de envío.
+
+smtplib es síncrono: ejecutar connect/starttls/login/send_message dentro de
+una corrutina bloquea el event loop y un servidor de correo lento detiene
+todas las peticiones del worker. Este módulo ejecuta el envío en un
+ThreadPoolExecutor dedicado y acotado, reutilizando las sesiones del pool.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from email.message import Message
+from typing import Dict, Hashable, List, Optional, Tuple, Union
+
+from ..config.settings import settings
+from .mime_stream import MensajeStreaming, enviar_por_smtp
+from .smtp_pool import SmtpConnectionPool, SmtpPoolError, smtp_pool
+
+# Executor dedicado: limita los hilos que pueden quedar bloqueados en SMTP.
+# Se crea en el primer envío y de nuevo tras ``cerrar_transporte`` (otro
+# lifespan en el mismo proceso, p. ej. en pruebas o con recarga)
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _obtener_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.smtp_max_workers, thread_name_prefix="smtp"
+        )
+    return _executor
+
+
+# Envíos en vuelo por credencial, como mucho las sesiones que admite el pool:
+# el resto espera su turno en el event loop en lugar de ocupar un hilo del
+# executor bloqueado en el pool (con una sola credencial, smtp_max_workers
+# menos smtp_pool_max_por_credencial hilos quedarían esperando)
+_en_vuelo: Dict[Tuple[SmtpConnectionPool, Hashable], asyncio.Semaphore] = {}
+
+
+def _enviar(
+    pool: SmtpConnectionPool,
+    credencial_id: Hashable,
+    host: str,
+    port,
+    user: str,
+    password: str,
+    msg: Union[Message, MensajeStreaming],
+    from_addr: str,
+    to_addrs: List[str],
+) -> dict:
+    with pool.sesion(credencial_id, host, port, user, password) as server:
+        if isinstance(msg, MensajeStreaming):
+            # El cuerpo se codifica y transmite por bloques durante DATA
+            return enviar_por_smtp(server, msg, from_addr, to_addrs)
+        return server.send_message(msg, from_addr=from_addr, to_addrs=to_addrs)
+
+
+async def enviar_mensaje(
+    credencial_id: Hashable,
+    host: str,
+    port,
+    user: str,
+    password: str,
+    msg: Union[Message, MensajeStreaming],
+    from_addr: str,
+    to_addrs: List[str],
+    pool: Optional[SmtpConnectionPool] = None,
+) -> dict:
+    """
+    Envía un mensaje MIME sin bloquear el event loop. Acepta un
+    ``email.message.Message`` o un ``MensajeStreaming`` (adjuntos leídos
+    desde disco por bloques).
+
+    Returns:
+        dict: Destinatarios rechazados (igual que smtplib.SMTP.send_message)
+    """
+    pool = pool or smtp_pool
+    turno = _en_vuelo.get((pool, credencial_id))
+    if turno is None:
+        turno = _en_vuelo[(pool, credencial_id)] = asyncio.Semaphore(pool.max_por_credencial)
+    try:
+        await asyncio.wait_for(turno.acquire(), timeout=pool.timeout_espera)
+    except asyncio.TimeoutError:
+        raise SmtpPoolError(f"Tiempo de espera agotado para obtener una sesión SMTP ({host}:{port})")
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _obtener_executor(),
+            functools.partial(
+                _enviar, pool, credencial_id, host, port,
+                user, password, msg, from_addr, to_addrs,
+            ),
+        )
+    finally:
+        turno.release()
+
+
+async def cerrar_transporte() -> None:
+    """Espera los envíos en curso y cierra las sesiones del pool."""
+    global _executor
+    executor, _executor = _executor, None
+    # Los semáforos pertenecen al event loop que termina
+    _en_vuelo.clear()
+    if executor is not None:
+        # shutdown(wait=True) bloquea hasta que terminan los envíos: fuera del loop
+        await asyncio.to_thread(executor.shutdown, wait=True)
+    await asyncio.to_thread(smtp_pool.cerrar_todas)
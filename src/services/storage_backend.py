@@ -0,0 +1,117 @@
+"""
+Interfaz común de los backends de almacenamiento de archivos.
+
+``StorageService`` delega en el backend elegido con ``STORAGE_BACKEND``:
+Azure Blob Storage en producción o el sistema de archivos local para
+desarrollo y pruebas de carga sin cuenta de Azure.
+"""
+import inspect
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, Iterable, List, Optional, Protocol, Tuple
+
+from ..models.schemas import BulkDeleteResponse, FileInfo, FileUploadResponse, SuccessResponse
+
+# Motivo de cada estado no exitoso en el borrado masivo
+MOTIVOS_BORRADO = {
+    404: "El archivo no existe",
+    412: "Modificado después de la fecha de corte",
+}
+
+
+class LectorBlob(Protocol):
+    """Contenido de una descarga, entregado por trozos."""
+
+    def chunks(self) -> AsyncIterator[bytes]:
+        ...
+
+
+@dataclass
+class DescargaBlob:
+    """
+    Resultado de ``StorageService.download_file``.
+
+    ``stream`` es None cuando el cliente ya tiene la versión actual
+    (``no_modificado``); ``inicio``/``fin`` indican el rango servido si la
+    descarga es parcial.
+    """
+    stream: Optional[LectorBlob]
+    content_type: str
+    size: int
+    total: int
+    etag: Optional[str] = None
+    last_modified: Optional[datetime] = None
+    inicio: Optional[int] = None
+    fin: Optional[int] = None
+    no_modificado: bool = False
+
+    @property
+    def parcial(self) -> bool:
+        return self.inicio is not None
+
+    async def cerrar(self) -> None:
+        """
+        Descarta el contenido sin leerlo. El ``StorageStreamDownloader`` de
+        Azure ya leyó la respuesta inicial y solo pide el resto al iterar; un
+        lector con la conexión abierta la libera con ``aclose``/``close``.
+        """
+        cerrar = getattr(self.stream, "aclose", None) or getattr(self.stream, "close", None)
+        if cerrar is not None:
+            resultado = cerrar()
+            if inspect.isawaitable(resultado):
+                await resultado
+        self.stream = None
+
+
+class StorageBackend(ABC):
+    """
+    Operaciones que debe implementar un backend de almacenamiento.
+
+    Todas lanzan ``StorageError`` ante fallos; un archivo inexistente se
+    indica con un mensaje que contiene "no existe" (los endpoints lo
+    traducen a 404).
+    """
+
+    @abstractmethod
+    async def upload_file(self, file_content: BinaryIO, file_name: str, content_type: str, container: str = None) -> FileUploadResponse:
+        """Guarda un contenido ya leído (bytes) con un nombre único."""
+
+    @abstractmethod
+    async def upload_stream(self, stream: BinaryIO, file_name: str, content_type: str, container: str = None) -> FileUploadResponse:
+        """Guarda un archivo abierto leyéndolo por bloques."""
+
+    @abstractmethod
+    async def download_file(
+        self,
+        file_name: str,
+        container: str = None,
+        inicio: Optional[int] = None,
+        fin: Optional[int] = None,
+        if_none_match: Optional[str] = None,
+    ) -> DescargaBlob:
+        """Descarga un archivo, un rango de bytes o solo lo revalida (ETag)."""
+
+    @abstractmethod
+    async def list_files_page(
+        self,
+        prefix: Optional[str] = None,
+        container: str = None,
+        page_size: int = 1000,
+        continuation_token: Optional[str] = None,
+    ) -> Tuple[List[FileInfo], Optional[str]]:
+        """Devuelve una página del listado y el token de la siguiente."""
+
+    @abstractmethod
+    async def delete_files(
+        self,
+        container: str = None,
+        names: Optional[Iterable[str]] = None,
+        prefix: Optional[str] = None,
+        older_than: Optional[datetime] = None,
+    ) -> BulkDeleteResponse:
+        """Elimina varios archivos y devuelve el resultado de cada uno."""
+
+    @abstractmethod
+    async def delete_file(self, file_name: str, container: str = None) -> SuccessResponse:
+        """Elimina un archivo."""
@@ -1,34 +1,58 @@
 """
-Servicio para gestionar operaciones con Azure Blob Storage.
+Servicio para gestionar operaciones con el almacenamiento de archivos.
+
+Delega en el backend elegido con ``STORAGE_BACKEND``: Azure Blob Storage
+(``azure``, por defecto) o el sistema de archivos local (``local``).
 
 @autor: Fabio Garcia
 @fecha: Septiembre 2025
 """
-from typing import List, Optional, BinaryIO
-import aiofiles
-import os
-import uuid
+from typing import AsyncIterator, Iterable, List, Optional, BinaryIO, Tuple
 from datetime import datetime
-from azure.storage.blob.aio import BlobServiceClient
-from azure.core.exceptions import ResourceNotFoundError, ResourceExistsError
 
-from ..config.azure_config import AzureStorageConfig
 from ..config.settings import settings
-from ..models.schemas import FileInfo, FileUploadResponse, SuccessResponse
-from ..utils.exceptions import StorageError
+from ..models.schemas import BulkDeleteResponse, FileInfo, FileUploadResponse, SuccessResponse
+from .azure_storage_backend import AzureStorageBackend
+from .local_storage_backend import LocalStorageBackend
+from .storage_backend import DescargaBlob, StorageBackend
+
+__all__ = ["DescargaBlob", "StorageService", "obtener_backend", "usar_backend"]
+
+_backend: Optional[StorageBackend] = None
+
+
+def obtener_backend() -> StorageBackend:
+    """Devuelve el backend configurado, creándolo en el primer uso."""
+    global _backend
+    if _backend is None:
+        if settings.storage_backend == "local":
+            _backend = LocalStorageBackend(
+                settings.storage_local_dir,
+                settings.storage_local_url_base or f"{settings.api_prefix}/v1/files/download",
+            )
+        else:
+            _backend = AzureStorageBackend()
+    return _backend
+
+
+def usar_backend(backend: Optional[StorageBackend]) -> None:
+    """Reemplaza el backend en uso (None vuelve al de la configuración)."""
+    global _backend
+    _backend = backend
+
 
 class StorageService:
     """
-    Servicio para gestionar operaciones con Azure Blob Storage.
+    Servicio para gestionar operaciones con el almacenamiento de archivos.
     
     Este servicio proporciona métodos asíncronos para cargar, descargar,
-    listar y eliminar archivos en Azure Blob Storage.
+    listar y eliminar archivos en el backend configurado.
     """
     
     @staticmethod
     async def upload_file(file_content: BinaryIO, file_name: str, content_type: str, container: str = None) -> FileUploadResponse:
         """
-        Carga un archivo a Azure Blob Storage.
+        Carga un archivo cuyo contenido ya está en memoria.
         
         Args:
             file_content: Contenido del archivo a cargar
@@ -42,101 +66,108 @@ class StorageService:
         Raises:
             StorageError: Si ocurre un error durante la carga
         """
-        try:
-            # Asegurar que el contenedor existe
-            container_name = await AzureStorageConfig.ensure_container_exists(container)
-            if not container_name:
-                raise StorageError("El contenedor especificado no existe o no se pudo crear.")
-            
-            # Generar un nombre único para evitar colisiones
-            unique_name = f"{uuid.uuid4().hex}_{file_name}"
-            
-            # Obtener cliente de servicio
-            blob_service_client = await AzureStorageConfig.get_blob_service_client()
-            
-            # Obtener cliente de contenedor
-            container_client = blob_service_client.get_container_client(container_name)
-            
-            # Obtener cliente de blob
-            blob_client = container_client.get_blob_client(unique_name)
-            
-            # Cargar el archivo
-            await blob_client.upload_blob(
-                file_content,
-                content_type=content_type,
-                overwrite=True
-            )
-            
-            # Obtener propiedades del blob
-            properties = await blob_client.get_blob_properties()
-            
-            # Construir URL del blob
-            blob_url = blob_client.url
-            
-            # Crear y devolver respuesta
-            return FileUploadResponse(
-                file_name=unique_name,
-                file_size=properties.size,
-                content_type=properties.content_settings.content_type,
-                url=blob_url
-            )
-            
-        except Exception as e:
-            raise StorageError(f"Error al cargar el archivo: {str(e)}")
-    
+        return await obtener_backend().upload_file(file_content, file_name, content_type, container)
+
     @staticmethod
-    async def download_file(file_name: str, container: str = None) -> tuple:
+    async def upload_stream(stream: BinaryIO, file_name: str, content_type: str, container: str = None) -> FileUploadResponse:
         """
-        Descarga un archivo desde Azure Blob Storage.
-        
+        Carga un archivo leyéndolo por bloques, sin tenerlo completo en memoria.
+
+        Args:
+            stream: Archivo abierto en modo binario, posicionado al inicio
+            file_name: Nombre del archivo
+            content_type: Tipo de contenido MIME del archivo
+            container: Nombre del contenedor donde se cargará el archivo
+
+        Returns:
+            FileUploadResponse: Información del archivo cargado
+
+        Raises:
+            StorageError: Si ocurre un error durante la carga
+        """
+        return await obtener_backend().upload_stream(stream, file_name, content_type, container)
+
+    @staticmethod
+    async def download_file(
+        file_name: str,
+        container: str = None,
+        inicio: Optional[int] = None,
+        fin: Optional[int] = None,
+        if_none_match: Optional[str] = None,
+    ) -> DescargaBlob:
+        """
+        Descarga un archivo (o un rango de bytes) con una sola petición.
+
         Args:
             file_name: Nombre del archivo a descargar
-            
+            container: Nombre del contenedor (por defecto el de la configuración)
+            inicio: Primer byte a descargar (cabecera Range); None = desde el inicio
+            fin: Último byte a descargar, inclusive; None = hasta el final
+            if_none_match: ETag que ya tiene el cliente; si coincide no se descarga
+
         Returns:
-            tuple: (stream de datos, tipo de contenido, tamaño)
-            
+            DescargaBlob: Stream de datos y metadatos de la descarga
+
         Raises:
+            RangoNoSatisfacibleError: Si ``inicio`` está más allá del final
             StorageError: Si el archivo no existe o hay un error durante la descarga
         """
-        try:
-            # Obtener cliente de servicio
-            blob_service_client = await AzureStorageConfig.get_blob_service_client()
-            
-            # Obtener cliente de contenedor
-            container_name = container or settings.azure_storage_container_name
-            container_client = blob_service_client.get_container_client(
-                container_name
-            )
-            
-            # Obtener cliente de blob
-            blob_client = container_client.get_blob_client(file_name)
-            
-            # Verificar si el blob existe
-            if not await blob_client.exists():
-                raise StorageError(f"El archivo \'{file_name}\' no existe")
-            
-            # Obtener propiedades del blob
-            properties = await blob_client.get_blob_properties()
-            
-            # Descargar el blob
-            download_stream = await blob_client.download_blob()
-            
-            # Devolver stream, tipo de contenido y tamaño
-            return (
-                download_stream,
-                properties.content_settings.content_type,
-                properties.size
-            )
-            
-        except ResourceNotFoundError:
-            raise StorageError(f"El archivo \'{file_name}\' no existe")
-        except Exception as e:
-            raise StorageError(f"Error al descargar el archivo: {str(e)}")
-    
+        return await obtener_backend().download_file(file_name, container, inicio, fin, if_none_match)
+
+    @staticmethod
+    async def list_files_page(
+        prefix: Optional[str] = None,
+        container: str = None,
+        page_size: int = 1000,
+        continuation_token: Optional[str] = None,
+    ) -> Tuple[List[FileInfo], Optional[str]]:
+        """
+        Lista una página de archivos.
+
+        Args:
+            prefix: Prefijo opcional para filtrar archivos
+            container: Nombre del contenedor (por defecto el de la configuración)
+            page_size: Número máximo de archivos de la página (Azure admite hasta 5000)
+            continuation_token: Token devuelto por la página anterior
+
+        Returns:
+            Tuple[List[FileInfo], Optional[str]]: Archivos de la página y token
+            de la siguiente (None si no hay más)
+
+        Raises:
+            StorageError: Si ocurre un error durante el listado
+        """
+        return await obtener_backend().list_files_page(prefix, container, page_size, continuation_token)
+
+    @staticmethod
+    async def iter_files(
+        prefix: Optional[str] = None,
+        container: str = None,
+        page_size: int = 1000,
+        continuation_token: Optional[str] = None,
+    ) -> AsyncIterator[FileInfo]:
+        """
+        Recorre los archivos del contenedor página a página sin acumularlos;
+        pensado para respuestas en streaming.
+
+        Raises:
+            StorageError: Si ocurre un error durante el listado
+        """
+        token = continuation_token
+        while True:
+            archivos, token = await StorageService.list_files_page(prefix, container, page_size, token)
+            for archivo in archivos:
+                yield archivo
+            if not token:
+                return
+
     @staticmethod
     async def list_files(prefix: Optional[str] = None, container: str = None) -> List[FileInfo]:
         """
-        Lista los archivos disponibles en Azure Blob Storage.
+        Lista todos los archivos disponibles.
+
+        Para contenedores grandes es preferible ``list_files_page`` o
+        ``iter_files``.
         
         Args:
             prefix: Prefijo opcional para filtrar archivos
@@ -147,44 +178,46 @@ class StorageService:
         Raises:
             StorageError: Si ocurre un error durante el listado
         """
-        try:
-            # Obtener cliente de servicio
-            blob_service_client = await AzureStorageConfig.get_blob_service_client()
-            
-            # Obtener cliente de contenedor
-            container_name = container or settings.azure_storage_container_name
-            container_client = blob_service_client.get_container_client(
-                container_name
+        return [
+            archivo
+            async for archivo in StorageService.iter_files(
+                prefix, container, settings.storage_listado_pagina
             )
-            
-            # Listar blobs
-            blob_list = []
-            async for blob in container_client.list_blobs(name_starts_with=prefix):
-                # Obtener cliente de blob para construir URL
-                blob_client = container_client.get_blob_client(blob.name)
-                
-                # Crear objeto FileInfo
-                blob_list.append(FileInfo(
-                    name=blob.name,
-                    size=blob.size,
-                    content_type=blob.content_settings.content_type or "application/octet-stream",
-                    url=blob_client.url,
-                    created_on=blob.creation_time.isoformat() if blob.creation_time else datetime.now().isoformat()
-                ))
-            
-            return blob_list
-            
-        except Exception as e:
-            raise StorageError(f"Error al listar archivos: {str(e)}")
+        ]
     
+    @staticmethod
+    async def delete_files(
+        container: str = None,
+        names: Optional[Iterable[str]] = None,
+        prefix: Optional[str] = None,
+        older_than: Optional[datetime] = None,
+    ) -> BulkDeleteResponse:
+        """
+        Elimina muchos archivos (por nombres o por prefijo) y devuelve el
+        resultado de cada uno.
+
+        Args:
+            container: Nombre del contenedor (por defecto el de la configuración)
+            names: Nombres de los archivos a eliminar
+            prefix: Prefijo de los archivos a eliminar (alternativa a ``names``)
+            older_than: Fecha de corte opcional
+
+        Returns:
+            BulkDeleteResponse: Resultado de cada archivo
+
+        Raises:
+            StorageError: Si falla el listado o la conexión con el almacenamiento
+        """
+        return await obtener_backend().delete_files(container, names, prefix, older_than)
+
     @staticmethod
     async def delete_file(file_name: str, container: str = None) -> SuccessResponse:
         """
-        Elimina un archivo de Azure Blob Storage.
+        Elimina un archivo.
         
         Args:
             file_name: Nombre del archivo a eliminar
-            container: Nombre del contenedor en Azure Storage (por defecto "files")
+            container: Nombre del contenedor (por defecto "files")
 
         Returns:
             SuccessResponse: Respuesta de éxito
@@ -192,37 +225,4 @@ class StorageService:
         Raises:
             StorageError: Si el archivo no existe o hay un error durante la eliminación
         """
-        try:
-            # Obtener cliente de servicio
-            blob_service_client = await AzureStorageConfig.get_blob_service_client()
-            
-            # Obtener cliente de contenedor
-            container_name = container or settings.azure_storage_container_name
-            container_client = blob_service_client.get_container_client(
-                container_name
-            )
-            
-            # Obtener cliente de blob
-            blob_client = container_client.get_blob_client(file_name)
-            
-            # Verificar si el blob existe
-            if not await blob_client.exists():
-                raise StorageError(f"El archivo \'{file_name}\' no existe")
-            
-            # Eliminar el blob
-            await blob_client.delete_blob()
-            
-            #Crear y devolver respuesta
-            return SuccessResponse(
-                message="Archivo eliminado exitosamente",
-                data={
-                    "file_name": file_name,
-                    "container": container_name
-                }
-            )
-
-        except ResourceNotFoundError:
-            raise StorageError(f"El archivo \'{file_name}\' no existe")
-        except Exception as e:
-            raise StorageError(f"Error al eliminar el archivo: {str(e)}")
-
+        return await obtener_backend().delete_file(file_name, container)
@@ -0,0 +1,153 @@
+"""
+Motor de plantillas compartido por los servicios de envío.
+
+Cada plantilla se analiza una sola vez y se convierte en una lista de
+segmentos (texto literal y marcadores ``{{ ... }}``). La versión compilada
+se guarda en una caché LRU indexada por ``(plantilla.id, updated_at)``, de
+modo que renderizar se reduce a resolver los marcadores y hacer un join.
+
+Marcadores soportados:
+    {{etiqueta}}        Todas las variables como lista HTML (<ul>)
+    {{etiqueta.a.b}}    Valor anidado variables["a"]["b"]
+    {{campo}}           variables["campo"]
+Un marcador sin valor se deja en el HTML como ``{{expr}}``.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple, Union
+
+from ..config.settings import settings
+
+_PATRON = re.compile(r"{{\s*(.*?)\s*}}")
+
+# Tipos de marcador
+_ETIQUETA = 0
+_RUTA = 1
+_CAMPO = 2
+
+
+def dict_to_html(data: dict) -> str:
+    """Convierte un diccionario (posiblemente anidado) en una lista HTML."""
+    partes = ["<ul>"]
+    for k, v in data.items():
+        if isinstance(v, dict):
+            partes.append(f"<li><strong>{k}:</strong> {dict_to_html(v)}</li>")
+        else:
+            partes.append(f"<li><strong>{k}:</strong> {v}</li>")
+    partes.append("</ul>")
+    return "".join(partes)
+
+
+def _resolver_ruta(data: dict, ruta: Tuple[str, ...]) -> Any:
+    valor = data
+    for parte in ruta:
+        if isinstance(valor, dict) and parte in valor:
+            valor = valor[parte]
+        else:
+            return None
+    return valor
+
+
+class PlantillaCompilada:
+    """Plantilla analizada: literales y marcadores en orden."""
+
+    __slots__ = ("segmentos", "_marcadores")
+
+    def __init__(self, segmentos: List[Union[str, tuple]]):
+        self.segmentos = segmentos
+        # Posiciones de los marcadores dentro de la lista de segmentos
+        self._marcadores = [i for i, s in enumerate(segmentos) if not isinstance(s, str)]
+
+    def render(self, variables: dict) -> str:
+        if not self._marcadores:
+            return "".join(self.segmentos)
+
+        partes = list(self.segmentos)
+        html_etiqueta = None
+        for i in self._marcadores:
+            tipo, clave, original = partes[i]
+            if tipo == _CAMPO:
+                partes[i] = str(variables[clave]) if clave in variables else original
+            elif tipo == _RUTA:
+                valor = _resolver_ruta(variables, clave)
+                if valor is None:
+                    valor = variables.get(original[2:-2])
+                partes[i] = str(valor) if valor is not None else original
+            else:
+                if html_etiqueta is None:
+                    html_etiqueta = dict_to_html(variables)
+                partes[i] = html_etiqueta
+        return "".join(partes)
+
+
+def compilar_plantilla(texto: str) -> PlantillaCompilada:
+    """Analiza el HTML de la plantilla en segmentos literales y marcadores."""
+    segmentos: List[Union[str, tuple]] = []
+    posicion = 0
+    for match in _PATRON.finditer(texto):
+        if match.start() > posicion:
+            segmentos.append(texto[posicion:match.start()])
+        expr = match.group(1).strip()
+        original = f"{{{{{expr}}}}}"
+        if expr == "etiqueta":
+            segmentos.append((_ETIQUETA, None, original))
+        elif expr.startswith("etiqueta."):
+            segmentos.append((_RUTA, tuple(expr.split(".", 1)[1].split(".")), original))
+        else:
+            segmentos.append((_CAMPO, expr, original))
+        posicion = match.end()
+    if posicion < len(texto):
+        segmentos.append(texto[posicion:])
+    return PlantillaCompilada(segmentos)
+
+
+class CacheCompiladas:
+    """Caché LRU acotada de plantillas compiladas, segura entre hilos."""
+
+    def __init__(self, maximo: int = 256):
+        self.maximo = maximo
+        self._datos: "OrderedDict[Hashable, PlantillaCompilada]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: Hashable, texto: str) -> PlantillaCompilada:
+        with self._lock:
+            compilada = self._datos.get(clave)
+            if compilada is not None:
+                self._datos.move_to_end(clave)
+                return compilada
+
+        compilada = compilar_plantilla(texto)
+        with self._lock:
+            self._datos[clave] = compilada
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+        return compilada
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+
+# Instancia global de la caché
+cache_compiladas = CacheCompiladas(maximo=settings.plantillas_cache_max)
+
+
+def obtener_compilada(plantilla) -> PlantillaCompilada:
+    """Devuelve la versión compilada de un registro de ``Plantillas``."""
+    plantilla_id: Optional[int] = getattr(plantilla, "id", None)
+    if plantilla_id is None:
+        return compilar_plantilla(plantilla.content_html or "")
+    clave = (plantilla_id, getattr(plantilla, "updated_at", None))
+    return cache_compiladas.obtener(clave, plantilla.content_html or "")
+
+
+def renderizar_plantilla(plantilla, variables: dict) -> str:
+    """Renderiza un registro de ``Plantillas`` con las variables recibidas."""
+    return obtener_compilada(plantilla).render(variables)
+
+
+def render_template(template: str, variables: dict) -> str:
+    """Renderiza un HTML arbitrario (sin caché) con las variables recibidas."""
+    return compilar_plantilla(template).render(variables)
@@ -16,3 +16,15 @@ class StorageError(Exception):
     def __init__(self, message: str):
         self.message = message
         super().__init__(self.message)
+
+
+class RangoNoSatisfacibleError(StorageError):
+    """
+    El rango de bytes solicitado empieza más allá del final del archivo.
+
+    Guarda el tamaño total del archivo para responder ``416`` con la
+    cabecera ``Content-Range: bytes */<total>``.
+    """
+    def __init__(self, message: str, total: int):
+        self.total = total
+        super().__init__(message)
@@ -0,0 +1,84 @@
+"""
+Paginación de los listados CRUD.
+
+Dos modos sobre la misma consulta ordenada por ``id``:
+
+- offset (``page``/``per_page``): la página y el total salen de una sola
+  sentencia con ``count(*) OVER ()``.
+- keyset (``cursor``): ``WHERE id > :ultimo ORDER BY id LIMIT n``; usa el
+  índice de la clave primaria y cuesta lo mismo en cualquier página. El
+  cursor es opaco para el cliente (base64 del último id devuelto).
+"""
+import base64
+import json
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.orm import Query
+
+
+def codificar_cursor_datos(datos: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor_datos(cursor: str) -> dict:
+    """
+    Raises:
+        HTTPException: 400 si el cursor no fue generado por esta API
+    """
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(datos, dict):
+            raise ValueError(datos)
+        return datos
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginación inválido")
+
+
+def codificar_cursor(ultimo_id: int) -> str:
+    return codificar_cursor_datos({"id": ultimo_id})
+
+
+def decodificar_cursor(cursor: str) -> int:
+    """
+    Raises:
+        HTTPException: 400 si el cursor no fue generado por esta API
+    """
+    ultimo_id = decodificar_cursor_datos(cursor).get("id")
+    if not isinstance(ultimo_id, int):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginación inválido")
+    return ultimo_id
+
+
+def pagina_offset(query: Query, columna_id, skip: int, limit: int) -> Tuple[List[Any], Optional[int]]:
+    """
+    Devuelve ``(items, total)`` en una sola consulta.
+
+    Si la página está más allá del final no hay filas de las que leer el
+    total y se devuelve ``None`` (el llamador decide si lo cuenta aparte).
+    """
+    filas = (
+        query.add_columns(func.count().over().label("total"))
+        .order_by(columna_id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    if not filas:
+        return [], None
+    return [fila[0] for fila in filas], filas[0].total
+
+
+def pagina_keyset(
+    query: Query, columna_id, cursor: Optional[str], limit: int
+) -> Tuple[List[Any], Optional[str]]:
+    """Devuelve ``(items, next_cursor)``; ``next_cursor`` es ``None`` en la última página."""
+    if cursor:
+        query = query.filter(columna_id > decodificar_cursor(cursor))
+    # Una fila de más indica si hay otra página sin contar el resto
+    items = query.order_by(columna_id).limit(limit + 1).all()
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, codificar_cursor(items[-1].id)
@@ -0,0 +1,10 @@
+import os
+
+# Valores ficticios para los campos obligatorios de Settings: las pruebas
+# no se conectan a la base de datos ni a servicios externos.
+for _variable in (
+    "POSTGRES_HOST", "POSTGRES_DB", "POSTGRES_USER",
+    "POSTGRES_PASSWORD", "SECRET_KEY", "ALGORITHM", "URL_API_STORAGE",
+):
+    os.environ.setdefault(_variable, "test")
+os.environ.setdefault("POSTGRES_PORT", "5432")
@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+from src.services import campaign_services
+from src.services.campaign_services import CampaignService
+
+
+class _Plantilla:
+    def render(self, variables):
+        if "falla" in variables:
+            raise ValueError("variable inválida")
+        return f"<p>{variables.get('nombre', '')}</p>"
+
+
+def _servicio(monkeypatch, enviados):
+    async def enviar_mensaje(*args, to_addrs, **kwargs):
+        enviados.append(to_addrs)
+        return {}
+
+    monkeypatch.setattr(campaign_services, "enviar_mensaje", enviar_mensaje)
+    monkeypatch.setattr(campaign_services.log_writer, "encolar", lambda **kw: None)
+    service = CampaignService(None, "pl", "Asunto")
+    service.credencial_id, service.host, service.port = 1, "127.0.0.1", 25
+    service.user, service.password = "noreply@example.com", ""
+    service.content_html = "<p>{{nombre}}</p>"
+    service.compilada = _Plantilla()
+    return service
+
+
+def test_fila_invalida_no_corta_la_campana(monkeypatch):
+    enviados = []
+    service = _servicio(monkeypatch, enviados)
+    filas = [
+        {"to": "a@example.com", "body_html": {"nombre": "Ana"}},
+        {"to": 123},
+        {"to": {"correo": "x"}},
+        {"to": "b@example.com", "cc": [1, None, "c@example.com"], "bcc": 7, "subject": 99},
+        {"to": "d@example.com", "body_html": {"falla": True}},
+        {"to": "e@example.com"},
+    ]
+
+    async def flujo():
+        for fila in filas:
+            yield fila
+
+    async def recoger():
+        return [json.loads(linea) async for linea in service.enviar(flujo())]
+
+    resultados = asyncio.run(recoger())
+
+    assert [r["estado"] for r in resultados[:-1]] == ["ENVIADO", "ERROR", "ERROR", "ENVIADO", "ERROR", "ENVIADO"]
+    assert resultados[4]["detalle"] == "variable inválida"
+    assert resultados[-1] == {"resumen": {"total": 6, "ENVIADO": 3, "ERROR": 3}}
+    assert enviados == [["a@example.com"], ["b@example.com", "c@example.com"], ["e@example.com"]]
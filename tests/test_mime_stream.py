@@ -0,0 +1,28 @@
+from email import message_from_bytes, policy
+
+from src.services.mime_stream import AdjuntoStreaming, MensajeStreaming
+
+
+def test_cabeceras_y_adjuntos_no_ascii(tmp_path):
+    ruta = tmp_path / "adjunto.pdf"
+    ruta.write_bytes(b"%PDF-1.4 contenido")
+    msg = MensajeStreaming(
+        remitente='"José Pérez" <jose@example.com>',
+        destinatario="ana@example.com",
+        cc=[],
+        asunto="Notificación de envío",
+        contenido_html="<p>Hola, señora</p>",
+        adjuntos=[AdjuntoStreaming(ruta=ruta, nombre="Informe técnico año 2025.pdf")],
+    )
+
+    crudo = b"".join(msg.lineas())
+    # Todo el mensaje debe viajar como ASCII en DATA
+    crudo.decode("ascii")
+
+    leido = message_from_bytes(crudo, policy=policy.default)
+    assert leido["Subject"] == "Notificación de envío"
+    assert leido["From"].addresses[0].display_name == "José Pérez"
+    html, adjunto = list(leido.iter_parts())
+    assert html.get_content() == "<p>Hola, señora</p>"
+    assert adjunto.get_filename() == "Informe técnico año 2025.pdf"
+    assert adjunto.get_content() == b"%PDF-1.4 contenido"